@@ -16,11 +16,32 @@ def create_app():
     app.config['UPLOAD_FOLDER'] = os.getenv('UPLOAD_FOLDER', 'static/uploads')
     app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # 16MB por defecto
     
+    # Serialización JSON con orjson y respuestas MessagePack con Accept: application/msgpack
+    from .utils.msgpack_support import init_msgpack
+    init_msgpack(app)
+    
     # Inicializar extensiones
     CORS(app)  # Habilitar CORS para todas las rutas
     
+    # Cabecera Age en las respuestas con estadísticas cacheadas
+    from .utils.cache import init_cache
+    init_cache(app)
+    
+    # Compresión gzip/brotli según Accept-Encoding (middleware WSGI, se aplica al final)
+    from .config import COMPRESSION_ENABLED
+    if COMPRESSION_ENABLED:
+        from .utils.compression import init_compression
+        init_compression(app)
+    
+    # IP real del cliente detrás de proxies de confianza (la usan las reglas de velocidad)
+    from .config import PROXY_FIX_X_FOR, PROXY_FIX_X_PROTO
+    if PROXY_FIX_X_FOR or PROXY_FIX_X_PROTO:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_FIX_X_FOR, x_proto=PROXY_FIX_X_PROTO)
+    
     # Configurar la base de datos
     from .database.db_config import init_db, shutdown_session
+    from .utils.change_tracking import init_change_tracking  # registra el modelo ChangeVersion antes de init_db
     
     # Registrar función para cerrar la sesión de BD después de cada solicitud
     @app.teardown_appcontext
@@ -30,6 +51,9 @@ def create_app():
     # Inicializar la base de datos
     with app.app_context():
         init_db()
+        
+        # Versiones por tabla para ETags/Last-Modified (GET condicionales)
+        init_change_tracking()
     
     # Registrar blueprints
     from .views.user_view import user_bp
@@ -55,6 +79,16 @@ def create_app():
             'status': 'online'
         })
     
+    # Estadísticas de la caché de servicios (solo admin)
+    from .controllers import token_required, role_required
+    from .utils.cache import get_cache
+    
+    @app.route('/api/cache/stats', methods=['GET'])
+    @token_required
+    @role_required(['admin'])
+    def cache_stats(current_user):
+        return jsonify(get_cache().stats())
+    
     # Manejador de errores 404
     @app.errorhandler(404)
     def not_found(error):
@@ -0,0 +1,97 @@
+"""Benchmark de búsquedas repetidas por clave primaria dentro de una petición
+
+Uso:
+    python -m backend.benchmarks.identity_lookups --ids 50 --repeat 20
+
+Simula una petición que pide los mismos usuarios, paquetes y reservas varias
+veces (como hacen los controladores al comprobar permisos y armar respuestas)
+y compara query.filter_by(id=...).first() con Model.get() (identity map) y
+Model.get_many(). Muestra el tiempo y las sentencias SQL ejecutadas.
+Requiere una base de datos configurada con datos.
+"""
+import argparse
+import time
+from sqlalchemy import event
+
+from ..database.db_config import db_session
+from ..models.user import User
+from ..models.package import Package
+from ..models.booking import Booking
+
+
+class StatementCounter:
+    """Cuenta las sentencias enviadas a la base de datos"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+
+def filter_by_lookups(model, ids, repeat):
+    found = []
+    for _ in range(repeat):
+        found = [model.query.filter_by(id=row_id).first() for row_id in ids]
+    return found
+
+
+def identity_map_lookups(model, ids, repeat):
+    # Las referencias se conservan entre repeticiones, como en una petición real:
+    # el identity map solo guarda referencias débiles y sin ellas los objetos se recolectan y se vuelven a consultar
+    found = []
+    for _ in range(repeat):
+        found = [model.get(row_id) for row_id in ids]
+    return found
+
+
+def multi_get_lookups(model, ids, repeat):
+    found = {}
+    for _ in range(repeat):
+        found = model.get_many(ids)
+    return found
+
+
+def run(id_count=50, repeat=20):
+    engine = db_session.get_bind()
+    strategies = [
+        ('filter_by().first()', filter_by_lookups),
+        ('Model.get()', identity_map_lookups),
+        ('Model.get_many()', multi_get_lookups)
+    ]
+
+    print(f"{'model':<10} {'strategy':<22} {'lookups':>8} {'queries':>8} {'ms':>10}")
+    for model in (User, Package, Booking):
+        ids = [row_id for (row_id,) in db_session.query(model.id).order_by(model.id).limit(id_count)]
+        if not ids:
+            print(f"{model.__name__:<10} (no rows)")
+            continue
+
+        for name, strategy in strategies:
+            # Cada estrategia empieza con una sesión vacía, como una petición nueva
+            db_session.remove()
+            with StatementCounter(engine) as counter:
+                start = time.perf_counter()
+                found = strategy(model, ids, repeat)
+                elapsed = (time.perf_counter() - start) * 1000
+            del found
+            print(f"{model.__name__:<10} {name:<22} {len(ids) * repeat:>8} {counter.count:>8} {elapsed:>10.1f}")
+
+    db_session.remove()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark repeated primary key lookups within a request')
+    parser.add_argument('--ids', type=int, default=50, help='distinct ids looked up per model')
+    parser.add_argument('--repeat', type=int, default=20, help='times each id is looked up')
+    args = parser.parse_args()
+    run(args.ids, args.repeat)
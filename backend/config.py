@@ -41,14 +41,85 @@ PDF_OUTPUT_DIR = os.getenv('PDF_OUTPUT_DIR', 'static/pdfs')
 API_VERSION = '1.0.0'
 API_PREFIX = '/api'
 ITEMS_PER_PAGE = int(os.getenv('ITEMS_PER_PAGE', 10))
+MAX_ITEMS_PER_PAGE = int(os.getenv('MAX_ITEMS_PER_PAGE', 100))
+STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', 1000))  # filas por lote en respuestas en streaming
 
 # Configuración de seguridad
 BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
 CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*').split(',')
 
 # Configuración de caché
-CACHE_TYPE = os.getenv('CACHE_TYPE', 'simple')
+CACHE_TYPE = os.getenv('CACHE_TYPE', 'simple')  # 'simple' (LRU en memoria), 'filesystem', 'redis' o 'null'
 CACHE_DEFAULT_TIMEOUT = int(os.getenv('CACHE_DEFAULT_TIMEOUT', 300))  # 5 minutos
+CACHE_THRESHOLD = int(os.getenv('CACHE_THRESHOLD', 500))  # entradas máximas antes de desalojar
+CACHE_DIR = os.getenv('CACHE_DIR', 'cache')  # backend 'filesystem'
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/1')
+CACHE_LOCAL_TIMEOUT = int(os.getenv('CACHE_LOCAL_TIMEOUT', 5))  # segundos en la copia local del backend compartido
+
+# Coalescencia de fallos de caché (una sola llamada calcula cada clave)
+SINGLEFLIGHT_CROSS_PROCESS = os.getenv('SINGLEFLIGHT_CROSS_PROCESS', 'False').lower() in ('true', '1', 't')  # bloqueo en la caché compartida
+SINGLEFLIGHT_LOCK_TIMEOUT = int(os.getenv('SINGLEFLIGHT_LOCK_TIMEOUT', 30))  # segundos; libera el bloqueo si el proceso muere
+SINGLEFLIGHT_WAIT_TIMEOUT = float(os.getenv('SINGLEFLIGHT_WAIT_TIMEOUT', 10.0))  # segundos esperando a otro antes de calcular
+SINGLEFLIGHT_POLL_INTERVAL = float(os.getenv('SINGLEFLIGHT_POLL_INTERVAL', 0.05))  # segundos entre consultas a la caché compartida
+
+# Tiempo de vida de las estadísticas del panel de administración (stale-while-revalidate)
+# Reservas y pagos no las invalidan (su frescura depende de estos dos límites); las de usuarios sí
+STATS_CACHE_TIMEOUT = int(os.getenv('STATS_CACHE_TIMEOUT', 30))  # segundos; después se recalculan en segundo plano
+STATS_CACHE_MAX_AGE = int(os.getenv('STATS_CACHE_MAX_AGE', 600))  # segundos; límite duro para servir datos viejos
+
+# Configuración de borrado en lotes (paquetes/usuarios con muchas reservas)
+PURGE_CHUNK_SIZE = int(os.getenv('PURGE_CHUNK_SIZE', 1000))  # filas por transacción
+PURGE_BACKGROUND_THRESHOLD = int(os.getenv('PURGE_BACKGROUND_THRESHOLD', 5000))  # reservas a partir de las cuales se borra en segundo plano
+
+# Configuración de la pasarela de pagos ('simulated' o 'http')
+PAYMENT_GATEWAY = os.getenv('PAYMENT_GATEWAY', 'simulated')
+PAYMENT_GATEWAY_URL = os.getenv('PAYMENT_GATEWAY_URL', 'http://127.0.0.1:8099')
+PAYMENT_GATEWAY_API_KEY = os.getenv('PAYMENT_GATEWAY_API_KEY', '')
+PAYMENT_GATEWAY_TIMEOUT = float(os.getenv('PAYMENT_GATEWAY_TIMEOUT', 5.0))  # segundos por llamada
+PAYMENT_GATEWAY_MAX_RETRIES = int(os.getenv('PAYMENT_GATEWAY_MAX_RETRIES', 2))
+PAYMENT_GATEWAY_POOL_SIZE = int(os.getenv('PAYMENT_GATEWAY_POOL_SIZE', 10))  # conexiones keep-alive por proceso
+PAYMENT_GATEWAY_BREAKER_THRESHOLD = int(os.getenv('PAYMENT_GATEWAY_BREAKER_THRESHOLD', 5))  # fallos seguidos para abrir el circuito
+PAYMENT_GATEWAY_BREAKER_RESET = float(os.getenv('PAYMENT_GATEWAY_BREAKER_RESET', 30.0))  # segundos con el circuito abierto
+
+# Reembolsos en lote: pagos procesados por transacción
+REFUND_CHUNK_SIZE = int(os.getenv('REFUND_CHUNK_SIZE', 200))
+
+# Reglas de velocidad de pagos (antifraude): "dimensión:límite/ventana_segundos:acción"
+VELOCITY_ENABLED = os.getenv('VELOCITY_ENABLED', 'True').lower() in ('true', '1', 't')
+VELOCITY_RULES = os.getenv('VELOCITY_RULES', 'card:5/300:block,user:10/600:block,ip:30/300:block,card:3/300:flag,user:5/600:flag')
+VELOCITY_STORE = os.getenv('VELOCITY_STORE', 'memory')  # 'memory' o 'redis' (compartido entre procesos)
+VELOCITY_REDIS_URL = os.getenv('VELOCITY_REDIS_URL', 'redis://localhost:6379/0')
+
+# Proxies inversos de confianza delante de la aplicación (0 = conexión directa)
+# Con N > 0 la IP del cliente se toma de X-Forwarded-For, confiando solo en los N últimos saltos
+PROXY_FIX_X_FOR = int(os.getenv('PROXY_FIX_X_FOR', 0))
+PROXY_FIX_X_PROTO = int(os.getenv('PROXY_FIX_X_PROTO', 0))
+
+# Conciliación con el archivo de liquidación de la pasarela
+RECONCILE_CHUNK_SIZE = int(os.getenv('RECONCILE_CHUNK_SIZE', 1000))  # líneas por consulta (SQL Server admite ~2100 parámetros)
+RECONCILE_MAX_ISSUES = int(os.getenv('RECONCILE_MAX_ISSUES', 1000))  # incidencias incluidas en el resumen
+RECONCILE_AMOUNT_TOLERANCE = float(os.getenv('RECONCILE_AMOUNT_TOLERANCE', 0.005))
+
+# Configuración de claves de idempotencia (cabecera Idempotency-Key)
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', 86400))  # 24 horas
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv('IDEMPOTENCY_WAIT_TIMEOUT', 10.0))  # espera máxima de un duplicado concurrente
+
+# Configuración de escrituras diferidas (last_login, contadores de vistas, etc.)
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL', 5.0))  # segundos
+WRITE_BEHIND_MAX_PENDING = int(os.getenv('WRITE_BEHIND_MAX_PENDING', 1000))  # filas antes de forzar el volcado
+
+# Compresión de respuestas (gzip y, si está instalado, brotli)
+COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'True').lower() in ('true', '1', 't')
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))  # bytes; las respuestas más pequeñas no se comprimen
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 5))
+COMPRESSION_CACHE_MAX_BYTES = int(os.getenv('COMPRESSION_CACHE_MAX_BYTES', 32 * 1024 * 1024))  # respuestas ya comprimidas en memoria
+
+# Cache-Control de las respuestas con GET condicional (ETag/Last-Modified)
+HTTP_CACHE_PACKAGES = os.getenv('HTTP_CACHE_PACKAGES', 'public, max-age=60')
+HTTP_CACHE_NEWS = os.getenv('HTTP_CACHE_NEWS', 'public, max-age=30')
+HTTP_CACHE_NEWS_DETAIL = os.getenv('HTTP_CACHE_NEWS_DETAIL', 'public, no-cache')  # se revalida siempre: cada visita cuenta
+HTTP_CACHE_REVIEWS = os.getenv('HTTP_CACHE_REVIEWS', 'public, max-age=30')
 
 # Configuración de sesiones
 SESSION_TYPE = os.getenv('SESSION_TYPE', 'filesystem')
@@ -1,201 +1,189 @@
 from flask import request, jsonify
-import os
-from werkzeug.utils import secure_filename
 from datetime import datetime
 
-from ..models.package import Package
+from ..models.booking import Booking
+from ..services.booking_service import BookingService
 from ..services.package_service import PackageService
-from ..config import UPLOAD_FOLDER
+from ..config import MAX_TRAVELERS_PER_BOOKING
+from ..utils.pagination import get_page_args, resolve_fields, serialize_fields
+from ..utils.streaming import is_stream_requested, json_stream_response
 from . import token_required, role_required
 
+booking_service = BookingService()
 package_service = PackageService()
 
-# Crear un nuevo paquete turístico (solo admin)
+# Campos del listado de reservas: campo -> (columnas necesarias, valor)
+BOOKING_LIST_FIELDS = {
+    'id': (['id'], lambda booking: booking.id),
+    'booking_number': (['booking_number'], lambda booking: booking.booking_number),
+    'user_id': (['user_id'], lambda booking: booking.user_id),
+    'package_id': (['package_id'], lambda booking: booking.package_id),
+    'travel_date': (['travel_date'], lambda booking: booking.travel_date.strftime('%Y-%m-%d')),
+    'status': (['status'], lambda booking: booking.status),
+    'number_of_travelers': (['number_of_travelers'], lambda booking: booking.number_of_travelers),
+    'total_price': (['total_price'], lambda booking: booking.total_price),
+    'priority': (['priority'], lambda booking: booking.priority),
+    'created_at': (['created_at'], lambda booking: booking.created_at.strftime('%Y-%m-%d %H:%M:%S'))
+}
+
+# Crear una nueva reserva
 @token_required
-@role_required(['admin'])
-def create_package(current_user):
-    data = request.form
+def create_booking(current_user):
+    data = request.get_json()
     
     # Validar datos de entrada
-    if not data or not data.get('destination') or not data.get('price') or not data.get('duration'):
+    if not data or not data.get('package_id') or not data.get('travel_date'):
         return jsonify({'message': 'Missing required fields!'}), 400
     
-    # Procesar imágenes
-    images = []
-    if 'images' in request.files:
-        files = request.files.getlist('images')
-        
-        for file in files:
-            if file and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                unique_filename = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{filename}"
-                file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
-                file.save(file_path)
-                images.append(unique_filename)
-    
-    # Crear el paquete
-    new_package = Package(
-        destination=data.get('destination'),
-        description=data.get('description'),
-        price=float(data.get('price')),
-        duration=int(data.get('duration')),
-        included_services=data.get('included_services'),
-        images=','.join(images),
-        availability=True
+    try:
+        travel_date = datetime.strptime(data.get('travel_date'), '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'message': 'Invalid date format! Use YYYY-MM-DD'}), 400
+    
+    number_of_travelers = int(data.get('number_of_travelers', 1))
+    if number_of_travelers < 1 or number_of_travelers > MAX_TRAVELERS_PER_BOOKING:
+        return jsonify({'message': f'Number of travelers must be between 1 and {MAX_TRAVELERS_PER_BOOKING}!'}), 400
+    
+    package = package_service.get_package_by_id(data.get('package_id'))
+    if not package:
+        return jsonify({'message': 'Package not found!'}), 404
+    
+    # Verificar disponibilidad para la fecha solicitada
+    if not booking_service.check_availability(package.id, travel_date):
+        return jsonify({'message': 'Package not available for the selected date!'}), 409
+    
+    new_booking = Booking(
+        user_id=current_user.id,
+        package_id=package.id,
+        travel_date=travel_date,
+        number_of_travelers=number_of_travelers,
+        special_requests=data.get('special_requests'),
+        priority=current_user.role == 'vip'
     )
+    new_booking.calculate_total_price(package.price)
     
-    package_id = package_service.create_package(new_package)
+    booking_id = booking_service.create_booking(new_booking)
     
-    return jsonify({'message': 'Package created successfully!', 'package_id': package_id}), 201
+    return jsonify({
+        'message': 'Booking created successfully!',
+        'booking_id': booking_id,
+        'booking_number': new_booking.booking_number,
+        'total_price': new_booking.total_price
+    }), 201
 
-# Obtener todos los paquetes
-def get_all_packages():
-    packages = package_service.get_all_packages()
-    output = []
+# Obtener todas las reservas (solo admin, paginado o en streaming con ?stream=true)
+@token_required
+@role_required(['admin'])
+def get_all_bookings(current_user):
+    try:
+        cursor, limit, fields = get_page_args(request.args)
+        fields, columns = resolve_fields(fields, BOOKING_LIST_FIELDS)
+        
+        # Modo streaming para exportaciones: memoria constante sin importar el número de filas
+        if is_stream_requested(request.args):
+            return json_stream_response(
+                'bookings', booking_service.iter_all_bookings(columns),
+                lambda booking: serialize_fields(booking, fields, BOOKING_LIST_FIELDS)
+            )
+        
+        bookings = booking_service.get_all_bookings(cursor, limit, columns)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     
-    for package in packages:
-        package_data = {
-            'id': package.id,
-            'destination': package.destination,
-            'description': package.description,
-            'price': package.price,
-            'duration': package.duration,
-            'included_services': package.included_services,
-            'images': package.images.split(',') if package.images else [],
-            'availability': package.availability
-        }
-        output.append(package_data)
+    output = []
+    for booking in bookings:
+        output.append(serialize_fields(booking, fields, BOOKING_LIST_FIELDS))
     
-    return jsonify({'packages': output})
+    return jsonify({'bookings': output, 'pagination': bookings.to_dict()})
 
-# Obtener un paquete por ID
-def get_package(package_id):
-    package = package_service.get_package_by_id(package_id)
+# Obtener las reservas del usuario actual
+@token_required
+def get_user_bookings(current_user):
+    bookings = booking_service.get_user_bookings(current_user.id, profile='list')
+    output = []
     
-    if not package:
-        return jsonify({'message': 'Package not found!'}), 404
+    for booking in bookings:
+        booking_data = {
+            'id': booking.id,
+            'booking_number': booking.booking_number,
+            'package_id': booking.package_id,
+            'destination': booking.package.destination,
+            'travel_date': booking.travel_date.strftime('%Y-%m-%d'),
+            'status': booking.status,
+            'number_of_travelers': booking.number_of_travelers,
+            'total_price': booking.total_price
+        }
+        output.append(booking_data)
     
-    # Preparar datos del paquete
-    package_data = {
-        'id': package.id,
-        'destination': package.destination,
-        'description': package.description,
-        'price': package.price,
-        'duration': package.duration,
-        'included_services': package.included_services,
-        'images': package.images.split(',') if package.images else [],
-        'availability': package.availability
-    }
-    
-    # Obtener reseñas relacionadas
-    reviews = package_service.get_package_reviews(package_id)
-    review_data = []
-    
-    for review in reviews:
-        review_data.append({
-            'id': review.id,
-            'user_name': review.user.name,
-            'comment': review.comment,
-            'rating': review.rating,
-            'date': review.date.strftime('%Y-%m-%d')
-        })
-    
-    package_data['reviews'] = review_data
-    
-    # Calcular calificación promedio
-    if review_data:
-        avg_rating = sum(r['rating'] for r in review_data) / len(review_data)
-        package_data['average_rating'] = round(avg_rating, 1)
-    else:
-        package_data['average_rating'] = 0
-    
-    return jsonify({'package': package_data})
+    return jsonify({'bookings': output})
 
-# Actualizar un paquete (solo admin)
+# Obtener una reserva específica
 @token_required
-@role_required(['admin'])
-def update_package(current_user, package_id):
-    data = request.form
+def get_booking(current_user, booking_id):
+    # to_dict usa usuario, paquete y pagos: se cargan junto con la reserva
+    booking = booking_service.get_booking_by_id(booking_id, profile='detail')
     
-    package = package_service.get_package_by_id(package_id)
+    if not booking:
+        return jsonify({'message': 'Booking not found!'}), 404
     
-    if not package:
-        return jsonify({'message': 'Package not found!'}), 404
+    # Solo el propietario o admin puede ver la reserva
+    if booking.user_id != current_user.id and current_user.role != 'admin':
+        return jsonify({'message': 'Unauthorized access!'}), 403
     
-    # Actualizar campos
-    if data.get('destination'):
-        package.destination = data.get('destination')
+    return jsonify({'booking': booking.to_dict()})
+
+# Actualizar el estado de una reserva
+@token_required
+def update_booking_status(current_user, booking_id):
+    data = request.get_json()
     
-    if data.get('description'):
-        package.description = data.get('description')
+    if not data or not data.get('status'):
+        return jsonify({'message': 'Missing required fields!'}), 400
     
-    if data.get('price'):
-        package.price = float(data.get('price'))
+    booking = booking_service.get_booking_by_id(booking_id)
     
-    if data.get('duration'):
-        package.duration = int(data.get('duration'))
+    if not booking:
+        return jsonify({'message': 'Booking not found!'}), 404
     
-    if data.get('included_services'):
-        package.included_services = data.get('included_services')
+    # El cliente solo puede cancelar sus propias reservas; el admin puede cambiar cualquier estado
+    if current_user.role != 'admin':
+        if booking.user_id != current_user.id or data.get('status') != 'cancelled':
+            return jsonify({'message': 'Unauthorized access!'}), 403
     
-    if data.get('availability') is not None:
-        package.availability = bool(data.get('availability'))
+    if not booking_service.update_booking_status(booking_id, data.get('status')):
+        return jsonify({'message': 'Invalid status!'}), 400
     
-    # Procesar nuevas imágenes
-    if 'images' in request.files:
-        files = request.files.getlist('images')
-        
-        if files and files[0].filename:
-            # Eliminar imágenes antiguas (opcional)
-            # delete_old_images(package.images)
-            
-            images = []
-            for file in files:
-                if file and allowed_file(file.filename):
-                    filename = secure_filename(file.filename)
-                    unique_filename = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{filename}"
-                    file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
-                    file.save(file_path)
-                    images.append(unique_filename)
-            
-            package.images = ','.join(images)
-    
-    package_service.update_package(package)
-    
-    return jsonify({'message': 'Package updated successfully!'})
+    return jsonify({'message': 'Booking status updated successfully!'})
 
-# Eliminar un paquete (solo admin)
+# Eliminar una reserva (solo admin)
 @token_required
 @role_required(['admin'])
-def delete_package(current_user, package_id):
-    package = package_service.get_package_by_id(package_id)
+def delete_booking(current_user, booking_id):
+    booking = booking_service.get_booking_by_id(booking_id)
     
-    if not package:
-        return jsonify({'message': 'Package not found!'}), 404
-    
-    # Eliminar imágenes asociadas (opcional)
-    # delete_old_images(package.images)
+    if not booking:
+        return jsonify({'message': 'Booking not found!'}), 404
     
-    package_service.delete_package(package_id)
+    booking_service.delete_booking(booking_id)
     
-    return jsonify({'message': 'Package deleted successfully!'})
+    return jsonify({'message': 'Booking deleted successfully!'})
 
-# Función auxiliar para validar extensiones de archivo
-def allowed_file(filename):
-    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
-# Función auxiliar para eliminar imágenes (opcional)
-def delete_old_images(images_string):
-    if not images_string:
-        return
-    
-    images = images_string.split(',')
-    for image in images:
-        try:
-            file_path = os.path.join(UPLOAD_FOLDER, image)
-            if os.path.exists(file_path):
-                os.remove(file_path)
-        except Exception as e:
-            print(f"Error deleting image {image}: {str(e)}")
\ No newline at end of file
+# Verificar disponibilidad de un paquete en una fecha
+def check_availability():
+    data = request.get_json()
+    
+    if not data or not data.get('package_id') or not data.get('travel_date'):
+        return jsonify({'message': 'Missing required fields!'}), 400
+    
+    try:
+        travel_date = datetime.strptime(data.get('travel_date'), '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'message': 'Invalid date format! Use YYYY-MM-DD'}), 400
+    
+    available = booking_service.check_availability(data.get('package_id'), travel_date)
+    
+    return jsonify({
+        'package_id': data.get('package_id'),
+        'travel_date': travel_date.strftime('%Y-%m-%d'),
+        'available': available
+    })
@@ -2,11 +2,28 @@ from flask import request, jsonify
 from datetime import datetime
 
 from ..models.news import News
+from ..models.user import User
 from ..services.news_service import NewsService
+from ..utils.pagination import get_page_args
+from ..utils.serializers import ModelSerializer
+from ..utils.dataloader import get_loader, load_related
+from ..utils.conditional import conditional_get
+from ..config import HTTP_CACHE_NEWS, HTTP_CACHE_NEWS_DETAIL
 from . import token_required, role_required
 
 news_service = NewsService()
 
+# Serializador del listado de noticias (compilado una vez a partir de las columnas)
+NEWS_LIST_SERIALIZER = ModelSerializer(
+    News,
+    columns=['id', 'title', 'publish_date', 'image_url', 'is_featured', 'category'],
+    formats={'publish_date': '%Y-%m-%d'},
+    computed={
+        'content_preview': (['content'], lambda news: news.content[:150] + '...' if len(news.content) > 150 else news.content),
+        'author_name': (['author_id'], lambda news: get_loader(User).load(news.author_id).name)
+    }
+)
+
 # Crear una nueva noticia (solo admin)
 @token_required
 @role_required(['admin'])
@@ -32,31 +49,30 @@ def create_news(current_user):
     
     return jsonify({'message': 'News created successfully!', 'news_id': news_id}), 201
 
-# Obtener todas las noticias
+# Obtener todas las noticias (paginado, con selección de campos)
+@conditional_get(['news', 'users'], HTTP_CACHE_NEWS)
 def get_all_news():
-    news_list = news_service.get_all_news()
-    output = []
-    
-    for news in news_list:
-        news_data = {
-            'id': news.id,
-            'title': news.title,
-            'content_preview': news.content[:150] + '...' if len(news.content) > 150 else news.content,
-            'publish_date': news.publish_date.strftime('%Y-%m-%d'),
-            'image_url': news.image_url,
-            'author_name': news.author.name,
-            'is_featured': news.is_featured,
-            'category': news.category
-        }
-        output.append(news_data)
-    
-    return jsonify({'news': output})
+    try:
+        cursor, limit, fields = get_page_args(request.args)
+        serializer = NEWS_LIST_SERIALIZER.only(fields)
+        # Solo las columnas pedidas, como filas: sin construir instancias de News
+        news_list = news_service.get_all_news(cursor, limit, serializer.column_names, as_rows=True)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    # Autores de toda la página en una sola consulta
+    if 'author_name' in serializer.fields:
+        get_loader(User).prime(news.author_id for news in news_list)
+    
+    return jsonify({'news': serializer.rows(news_list), 'pagination': news_list.to_dict()})
 
 # Obtener noticias destacadas
 def get_featured_news():
     news_list = news_service.get_featured_news()
     output = []
     
+    authors = load_related(User, news_list, 'author_id')
+    
     for news in news_list:
         news_data = {
             'id': news.id,
@@ -64,7 +80,7 @@ def get_featured_news():
             'content_preview': news.content[:150] + '...' if len(news.content) > 150 else news.content,
             'publish_date': news.publish_date.strftime('%Y-%m-%d'),
             'image_url': news.image_url,
-            'author_name': news.author.name,
+            'author_name': authors[news.author_id].name,
             'category': news.category
         }
         output.append(news_data)
@@ -76,6 +92,8 @@ def get_news_by_category(category):
     news_list = news_service.get_news_by_category(category)
     output = []
     
+    authors = load_related(User, news_list, 'author_id')
+    
     for news in news_list:
         news_data = {
             'id': news.id,
@@ -83,7 +101,7 @@ def get_news_by_category(category):
             'content_preview': news.content[:150] + '...' if len(news.content) > 150 else news.content,
             'publish_date': news.publish_date.strftime('%Y-%m-%d'),
             'image_url': news.image_url,
-            'author_name': news.author.name,
+            'author_name': authors[news.author_id].name,
             'is_featured': news.is_featured
         }
         output.append(news_data)
@@ -91,6 +109,7 @@ def get_news_by_category(category):
     return jsonify({'category': category, 'news': output})
 
 # Obtener una noticia por ID
+@conditional_get(['news', 'users'], HTTP_CACHE_NEWS_DETAIL)
 def get_news(news_id):
     news = news_service.get_news_by_id(news_id)
     
@@ -176,6 +195,8 @@ def get_exclusive_news(current_user):
     news_list = news_service.get_exclusive_news()
     output = []
     
+    authors = load_related(User, news_list, 'author_id')
+    
     for news in news_list:
         news_data = {
             'id': news.id,
@@ -183,7 +204,7 @@ def get_exclusive_news(current_user):
             'content_preview': news.content[:150] + '...' if len(news.content) > 150 else news.content,
             'publish_date': news.publish_date.strftime('%Y-%m-%d'),
             'image_url': news.image_url,
-            'author_name': news.author.name,
+            'author_name': authors[news.author_id].name,
             'category': news.category
         }
         output.append(news_data)
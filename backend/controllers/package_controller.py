@@ -4,12 +4,24 @@ from werkzeug.utils import secure_filename
 from datetime import datetime
 
 from ..models.package import Package
+from ..models.user import User
 from ..services.package_service import PackageService
-from ..config import UPLOAD_FOLDER
+from ..config import UPLOAD_FOLDER, HTTP_CACHE_PACKAGES
+from ..utils.pagination import get_page_args
+from ..utils.serializers import ModelSerializer
+from ..utils.dataloader import load_related
+from ..utils.conditional import conditional_get
 from . import token_required, role_required
 
 package_service = PackageService()
 
+# Serializador del listado de paquetes (compilado una vez a partir de las columnas)
+PACKAGE_LIST_SERIALIZER = ModelSerializer(
+    Package,
+    columns=['id', 'destination', 'description', 'price', 'duration', 'included_services', 'images', 'availability'],
+    list_columns=['images']
+)
+
 # Crear un nuevo paquete turístico (solo admin)
 @token_required
 @role_required(['admin'])
@@ -48,27 +60,21 @@ def create_package(current_user):
     
     return jsonify({'message': 'Package created successfully!', 'package_id': package_id}), 201
 
-# Obtener todos los paquetes
+# Obtener todos los paquetes (paginado, con selección de campos)
+@conditional_get(['packages'], HTTP_CACHE_PACKAGES)
 def get_all_packages():
-    packages = package_service.get_all_packages()
-    output = []
-    
-    for package in packages:
-        package_data = {
-            'id': package.id,
-            'destination': package.destination,
-            'description': package.description,
-            'price': package.price,
-            'duration': package.duration,
-            'included_services': package.included_services,
-            'images': package.images.split(',') if package.images else [],
-            'availability': package.availability
-        }
-        output.append(package_data)
-    
-    return jsonify({'packages': output})
+    try:
+        cursor, limit, fields = get_page_args(request.args)
+        serializer = PACKAGE_LIST_SERIALIZER.only(fields)
+        # Solo las columnas pedidas, como filas: sin construir instancias de Package
+        packages = package_service.get_all_packages(cursor, limit, serializer.column_names, as_rows=True)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    return jsonify({'packages': serializer.rows(packages), 'pagination': packages.to_dict()})
 
 # Obtener un paquete por ID
+@conditional_get(['packages', 'reviews', 'users'], HTTP_CACHE_PACKAGES)
 def get_package(package_id):
     package = package_service.get_package_by_id(package_id)
     
@@ -91,10 +97,13 @@ def get_package(package_id):
     reviews = package_service.get_package_reviews(package_id)
     review_data = []
     
+    # Autores de todas las reseñas en una sola consulta
+    users = load_related(User, reviews, 'user_id')
+    
     for review in reviews:
         review_data.append({
             'id': review.id,
-            'user_name': review.user.name,
+            'user_name': users[review.user_id].name,
             'comment': review.comment,
             'rating': review.rating,
             'date': review.date.strftime('%Y-%m-%d')
@@ -2,20 +2,19 @@ from flask import request, jsonify, send_file
 from datetime import datetime
 import uuid
 import os
-from io import BytesIO
 
 from ..models.payment import Payment
 from ..services.payment_service import PaymentService
 from ..services.booking_service import BookingService
 from ..services.package_service import PackageService
-from ..services.user_service import UserService
-from ..utils.pdf_generator import generate_receipt_pdf
+from ..utils.pdf_generator import generate_payment_receipt
+from ..utils.idempotency import idempotent
+from ..utils.velocity import velocity_check
 from . import token_required, role_required
 
 payment_service = PaymentService()
 booking_service = BookingService()
 package_service = PackageService()
-user_service = UserService()
 
 # Procesar pago de una reserva
 @token_required
@@ -89,53 +88,31 @@ def process_payment(current_user):
 # Obtener recibo de pago en PDF
 @token_required
 def get_payment_receipt(current_user, payment_id):
-    payment = payment_service.get_payment_by_id(payment_id)
+    # Pago, reserva, paquete, usuario y totales en una sola consulta
+    receipt = payment_service.get_receipt_data(payment_id)
     
-    if not payment:
+    if not receipt:
         return jsonify({'message': 'Payment not found!'}), 404
     
     # Solo el propietario o admin puede ver/descargar el recibo
-    if payment.user_id != current_user.id and current_user.role != 'admin':
+    if receipt['user_id'] != current_user.id and current_user.role != 'admin':
         return jsonify({'message': 'Unauthorized access!'}), 403
     
-    # Obtener datos necesarios para el recibo
-    booking = booking_service.get_booking_by_id(payment.booking_id)
-    package = package_service.get_package_by_id(booking.package_id)
-    user = user_service.get_user_by_id(payment.user_id)
-    
-    # Datos para el PDF
-    receipt_data = {
-        'receipt_number': f"REC-{payment.id}",
-        'transaction_id': payment.transaction_id,
-        'date': payment.payment_date.strftime('%Y-%m-%d %H:%M:%S'),
-        'customer_name': user.name,
-        'customer_email': user.email,
-        'package_name': package.destination,
-        'travel_date': booking.travel_date.strftime('%Y-%m-%d'),
-        'number_of_travelers': booking.number_of_travelers,
-        'base_amount': payment.amount + payment.discount_applied,
-        'discount': payment.discount_applied,
-        'total_amount': payment.amount,
-        'payment_method': payment.payment_method,
-        'status': payment.status
-    }
-    
-    # Generar PDF
-    pdf_buffer = generate_receipt_pdf(receipt_data)
-    pdf_buffer.seek(0)
+    # Generar PDF a partir de los datos ya cargados
+    filepath = generate_payment_receipt(receipt)
     
     return send_file(
-        BytesIO(pdf_buffer.read()),
+        filepath,
         mimetype='application/pdf',
         as_attachment=True,
-        download_name=f"receipt_{payment.id}.pdf"
+        download_name=f"receipt_{payment_id}.pdf"
     )
 
 # Obtener todos los pagos (admin)
 @token_required
 @role_required(['admin'])
 def get_all_payments(current_user):
-    payments = payment_service.get_all_payments()
+    payments = payment_service.get_all_payments(profile='list')
     output = []
     
     for payment in payments:
@@ -158,13 +135,13 @@ def get_all_payments(current_user):
 # Obtener pagos de un usuario
 @token_required
 def get_user_payments(current_user):
-    payments = payment_service.get_user_payments(current_user.id)
+    # Reserva y paquete llegan en la misma consulta: el número de consultas no crece con el historial
+    payments = payment_service.get_user_payments(current_user.id, profile='detail')
     output = []
     
     for payment in payments:
-        # Obtener información adicional
-        booking = booking_service.get_booking_by_id(payment.booking_id)
-        package = package_service.get_package_by_id(booking.package_id)
+        booking = payment.booking
+        package = booking.package
         
         payment_data = {
             'id': payment.id,
@@ -184,7 +161,7 @@ def get_user_payments(current_user):
 # Obtener un pago específico
 @token_required
 def get_payment(current_user, payment_id):
-    payment = payment_service.get_payment_by_id(payment_id)
+    payment = payment_service.get_payment_by_id(payment_id, profile='detail')
     
     if not payment:
         return jsonify({'message': 'Payment not found!'}), 404
@@ -193,9 +170,9 @@ def get_payment(current_user, payment_id):
     if payment.user_id != current_user.id and current_user.role != 'admin':
         return jsonify({'message': 'Unauthorized access!'}), 403
     
-    # Obtener información adicional
-    booking = booking_service.get_booking_by_id(payment.booking_id)
-    package = package_service.get_package_by_id(booking.package_id)
+    # Reserva y paquete ya cargados junto con el pago
+    booking = payment.booking
+    package = booking.package
     
     payment_data = {
         'id': payment.id,
@@ -258,8 +235,10 @@ def check_payment_status(current_user, payment_id):
         'payment_date': payment.payment_date.strftime('%Y-%m-%d %H:%M:%S')
     })
 
-# Procesar pago con tarjeta de crédito (simulado)
+# Procesar pago con tarjeta de crédito (simulado, admite cabecera Idempotency-Key)
 @token_required
+@idempotent('process_card_payment')
+@velocity_check
 def process_card_payment(current_user):
     data = request.get_json()
     
@@ -2,8 +2,13 @@ from flask import request, jsonify
 from datetime import datetime
 
 from ..models.review import Review
+from ..models.user import User
+from ..models.package import Package
 from ..services.review_service import ReviewService
 from ..services.booking_service import BookingService
+from ..utils.dataloader import load_related
+from ..utils.conditional import conditional_get
+from ..config import HTTP_CACHE_REVIEWS
 from . import token_required
 
 review_service = ReviewService()
@@ -50,15 +55,19 @@ def create_review(current_user):
     return jsonify({'message': 'Review created successfully!', 'review_id': review_id}), 201
 
 # Obtener todas las reseñas de un paquete
+@conditional_get(['reviews', 'users'], HTTP_CACHE_REVIEWS)
 def get_package_reviews(package_id):
     reviews = review_service.get_package_reviews(package_id)
     output = []
     
+    # Autores de todas las reseñas en una sola consulta
+    users = load_related(User, reviews, 'user_id')
+    
     for review in reviews:
         review_data = {
             'id': review.id,
             'user_id': review.user_id,
-            'user_name': review.user.name,
+            'user_name': users[review.user_id].name,
             'comment': review.comment,
             'rating': review.rating,
             'date': review.date.strftime('%Y-%m-%d')
@@ -86,11 +95,14 @@ def get_user_reviews(current_user):
     reviews = review_service.get_user_reviews(user_id)
     output = []
     
+    # Paquetes de todas las reseñas en una sola consulta
+    packages = load_related(Package, reviews, 'package_id')
+    
     for review in reviews:
         review_data = {
             'id': review.id,
             'package_id': review.package_id,
-            'package_destination': review.package.destination,
+            'package_destination': packages[review.package_id].destination,
             'comment': review.comment,
             'rating': review.rating,
             'date': review.date.strftime('%Y-%m-%d')
@@ -168,11 +180,15 @@ def get_recent_reviews(limit=5):
     reviews = review_service.get_recent_reviews(limit)
     output = []
     
+    # Usuarios y paquetes de todas las reseñas: una consulta por tipo
+    users = load_related(User, reviews, 'user_id')
+    packages = load_related(Package, reviews, 'package_id')
+    
     for review in reviews:
         review_data = {
             'id': review.id,
-            'user_name': review.user.name,
-            'package_destination': review.package.destination,
+            'user_name': users[review.user_id].name,
+            'package_destination': packages[review.package_id].destination,
             'comment': review.comment[:100] + '...' if len(review.comment) > 100 else review.comment,
             'rating': review.rating,
             'date': review.date.strftime('%Y-%m-%d')
@@ -186,11 +202,15 @@ def get_top_rated_reviews(limit=5):
     reviews = review_service.get_top_rated_reviews(limit)
     output = []
     
+    # Usuarios y paquetes de todas las reseñas: una consulta por tipo
+    users = load_related(User, reviews, 'user_id')
+    packages = load_related(Package, reviews, 'package_id')
+    
     for review in reviews:
         review_data = {
             'id': review.id,
-            'user_name': review.user.name,
-            'package_destination': review.package.destination,
+            'user_name': users[review.user_id].name,
+            'package_destination': packages[review.package_id].destination,
             'comment': review.comment[:100] + '...' if len(review.comment) > 100 else review.comment,
             'rating': review.rating,
             'date': review.date.strftime('%Y-%m-%d')
@@ -89,6 +89,9 @@ def login_user():
             'exp': datetime.utcnow() + timedelta(hours=24)
         }, SECRET_KEY, algorithm="HS256")
         
+        # Registrar el acceso sin bloquear la respuesta (se vuelca en lote)
+        user_service.update_last_login(user.id)
+        
         return jsonify({
             'token': token,
             'user_id': user.id,
@@ -0,0 +1,72 @@
+-- Recrea las claves foráneas con ON DELETE CASCADE y crea sus índices (SQL Server)
+--
+-- create_all() solo crea tablas nuevas: las bases de datos existentes conservan
+-- las claves foráneas sin cascada y, con passive_deletes=True en los modelos,
+-- borrar un paquete o un usuario fallaría por violación de clave foránea.
+-- Ejecutar una vez, antes de desplegar la versión con passive_deletes:
+--
+--     sqlcmd -S <servidor> -d <base de datos> -i backend/database/migrations/001_on_delete_cascade.sql
+--
+-- Es idempotente: se puede volver a ejecutar sin efectos.
+
+SET XACT_ABORT ON;
+BEGIN TRANSACTION;
+
+DECLARE @fks TABLE (
+    table_name SYSNAME, column_name SYSNAME, ref_table SYSNAME, on_delete NVARCHAR(20)
+);
+
+-- payments.user_id se queda en NO ACTION: SQL Server no admite un segundo
+-- camino de cascada desde users (users -> bookings -> payments)
+INSERT INTO @fks VALUES
+    ('bookings', 'user_id', 'users', 'CASCADE'),
+    ('bookings', 'package_id', 'packages', 'CASCADE'),
+    ('payments', 'booking_id', 'bookings', 'CASCADE'),
+    ('payments', 'user_id', 'users', 'NO ACTION'),
+    ('reviews', 'user_id', 'users', 'CASCADE'),
+    ('reviews', 'package_id', 'packages', 'CASCADE'),
+    ('news', 'author_id', 'users', 'CASCADE');
+
+DECLARE @table SYSNAME, @column SYSNAME, @ref SYSNAME, @on_delete NVARCHAR(20), @fk SYSNAME, @sql NVARCHAR(MAX);
+
+DECLARE fk_cursor CURSOR LOCAL FAST_FORWARD FOR SELECT table_name, column_name, ref_table, on_delete FROM @fks;
+OPEN fk_cursor;
+FETCH NEXT FROM fk_cursor INTO @table, @column, @ref, @on_delete;
+
+WHILE @@FETCH_STATUS = 0
+BEGIN
+    -- Las claves creadas por create_all tienen nombres generados (FK__bookings__user_i__1A2B3C4D)
+    SET @fk = NULL;
+    SELECT @fk = fk.name
+    FROM sys.foreign_keys fk
+    JOIN sys.foreign_key_columns fkc ON fkc.constraint_object_id = fk.object_id
+    JOIN sys.columns c ON c.object_id = fkc.parent_object_id AND c.column_id = fkc.parent_column_id
+    WHERE fk.parent_object_id = OBJECT_ID(@table) AND c.name = @column;
+
+    IF @fk IS NOT NULL
+    BEGIN
+        SET @sql = N'ALTER TABLE ' + QUOTENAME(@table) + N' DROP CONSTRAINT ' + QUOTENAME(@fk);
+        EXEC sp_executesql @sql;
+    END
+
+    SET @sql = N'ALTER TABLE ' + QUOTENAME(@table)
+        + N' ADD CONSTRAINT ' + QUOTENAME('fk_' + @table + '_' + @column)
+        + N' FOREIGN KEY (' + QUOTENAME(@column) + N') REFERENCES ' + QUOTENAME(@ref) + N' (id)'
+        + N' ON DELETE ' + @on_delete;
+    EXEC sp_executesql @sql;
+
+    -- Índice de la clave foránea (mismo nombre que genera SQLAlchemy con index=True)
+    IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE object_id = OBJECT_ID(@table) AND name = 'ix_' + @table + '_' + @column)
+    BEGIN
+        SET @sql = N'CREATE INDEX ' + QUOTENAME('ix_' + @table + '_' + @column)
+            + N' ON ' + QUOTENAME(@table) + N' (' + QUOTENAME(@column) + N')';
+        EXEC sp_executesql @sql;
+    END
+
+    FETCH NEXT FROM fk_cursor INTO @table, @column, @ref, @on_delete;
+END
+
+CLOSE fk_cursor;
+DEALLOCATE fk_cursor;
+
+COMMIT TRANSACTION;
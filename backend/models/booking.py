@@ -1,15 +1,16 @@
 from sqlalchemy import Column, Integer, String, Float, Boolean, Text, ForeignKey, DateTime, Date
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, joinedload, selectinload
 from datetime import datetime
 
 from ..database.db_config import Base
+from .loader_profiles import LoaderProfileMixin
 
-class Booking(Base):
+class Booking(Base, LoaderProfileMixin):
     __tablename__ = 'bookings'
     
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
-    package_id = Column(Integer, ForeignKey('packages.id'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    package_id = Column(Integer, ForeignKey('packages.id', ondelete='CASCADE'), nullable=False, index=True)
     travel_date = Column(Date, nullable=False)
     status = Column(String(20), default='pending')  # pending, confirmed, cancelled
     booking_number = Column(String(20), unique=True, nullable=True)
@@ -23,7 +24,8 @@ class Booking(Base):
     # Relaciones
     user = relationship("User", back_populates="bookings")
     package = relationship("Package", back_populates="bookings")
-    payments = relationship("Payment", back_populates="booking", cascade="all, delete-orphan")
+    # passive_deletes: los pagos se eliminan con ON DELETE CASCADE, sin cargarlos en la sesión
+    payments = relationship("Payment", back_populates="booking", cascade="all, delete-orphan", passive_deletes=True)
     
     def __init__(self, user_id, package_id, travel_date, status='pending', 
                  number_of_travelers=1, special_requests=None, priority=False):
@@ -54,6 +56,27 @@ class Booking(Base):
         total_paid = sum(payment.amount for payment in self.payments if payment.status == 'completed')
         return total_paid >= self.total_price
     
+    @classmethod
+    def for_list(cls):
+        """Opciones de carga para listados: to_dict en 2 consultas para toda la página"""
+        from .user import User
+        from .package import Package
+        from .payment import Payment
+        return [
+            joinedload(cls.user).load_only(User.name),
+            joinedload(cls.package).load_only(Package.destination),
+            selectinload(cls.payments).load_only(Payment.amount, Payment.status)
+        ]
+    
+    @classmethod
+    def for_detail(cls):
+        """Opciones de carga para el detalle: usuario, paquete y pagos completos"""
+        return [
+            joinedload(cls.user),
+            joinedload(cls.package),
+            selectinload(cls.payments)
+        ]
+    
     def to_dict(self):
         return {
             'id': self.id,
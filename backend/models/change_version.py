@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, BigInteger, DateTime
+from datetime import datetime
+
+from ..database.db_config import Base
+
+class ChangeVersion(Base):
+    __tablename__ = 'change_versions'
+
+    table_name = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)  # se incrementa en cada cambio de la tabla
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # fecha del último cambio
+
+    def __init__(self, table_name, version=0, changed_at=None):
+        self.table_name = table_name
+        self.version = version
+        self.changed_at = changed_at or datetime.utcnow()
+
+    def __repr__(self):
+        return f"<ChangeVersion(table_name='{self.table_name}', version={self.version})>"
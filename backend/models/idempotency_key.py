@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, UniqueConstraint
+from datetime import datetime, timedelta
+
+from ..database.db_config import Base
+
+class IdempotencyKey(Base):
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (
+        UniqueConstraint('user_id', 'endpoint', 'key', name='uq_idempotency_user_endpoint_key'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    key = Column(String(255), nullable=False)
+    user_id = Column(Integer, nullable=False)
+    endpoint = Column(String(100), nullable=False)
+    request_hash = Column(String(64), nullable=False)  # sha256 del cuerpo de la petición
+    status = Column(String(20), default='processing')  # processing, completed
+    response_status = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    response_mimetype = Column(String(100), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    
+    def __init__(self, key, user_id, endpoint, request_hash, ttl):
+        self.key = key
+        self.user_id = user_id
+        self.endpoint = endpoint
+        self.request_hash = request_hash
+        self.status = 'processing'
+        self.created_at = datetime.utcnow()
+        self.expires_at = self.created_at + timedelta(seconds=ttl)
+    
+    def is_expired(self):
+        return self.expires_at <= datetime.utcnow()
+    
+    def __repr__(self):
+        return f"<IdempotencyKey(id={self.id}, key='{self.key}', endpoint='{self.endpoint}', status='{self.status}')>"
@@ -0,0 +1,84 @@
+from sqlalchemy import inspect
+from sqlalchemy.orm.util import identity_key
+
+from ..database.db_config import db_session
+
+# SQL Server admite unos 2100 parámetros por consulta
+MAX_IN_PARAMS = 1000
+
+class LoaderProfileMixin:
+    """Perfiles de carga con nombre y búsquedas por clave primaria para los modelos
+
+    Cada modelo define sus perfiles como métodos de clase for_<perfil>() que
+    retornan las opciones de carga (joinedload/selectinload/load_only) que
+    necesita su serialización, por ejemplo Booking.for_list() o
+    Booking.for_detail(). Los servicios reciben el nombre del perfil.
+    """
+
+    @classmethod
+    def for_profile(cls, profile=None):
+        """Retorna las opciones de carga del perfil indicado (ninguna si profile es None)"""
+        if not profile:
+            return []
+
+        loader = getattr(cls, f'for_{profile}', None)
+        if loader is None:
+            raise ValueError(f"Unknown loader profile '{profile}' for {cls.__name__}")
+        return loader()
+
+    @classmethod
+    def with_profile(cls, query, profile=None):
+        """Aplica un perfil de carga a una consulta"""
+        options = cls.for_profile(profile)
+        return query.options(*options) if options else query
+
+    @classmethod
+    def get(cls, row_id, profile=None):
+        """Obtiene un objeto por clave primaria usando el identity map de la sesión
+
+        Si el objeto ya está en la sesión no se consulta la base de datos (en ese
+        caso el perfil no se vuelve a aplicar). Retorna None si el id no es válido
+        o no existe.
+        """
+        row_id = cls._coerce_id(row_id)
+        if row_id is None:
+            return None
+        return db_session.get(cls, row_id, options=cls.for_profile(profile))
+
+    @classmethod
+    def get_many(cls, ids, profile=None):
+        """Obtiene varios objetos por clave primaria
+
+        Los que ya están cargados en la sesión se toman del identity map y el
+        resto se lee con una consulta IN (...) por cada MAX_IN_PARAMS ids.
+
+        Returns:
+            dict: {id: objeto} solo con los ids encontrados
+        """
+        found = {}
+        missing = []
+        for row_id in {cls._coerce_id(row_id) for row_id in ids}:
+            if row_id is None:
+                continue
+            obj = db_session.identity_map.get(identity_key(cls, row_id))
+            # Un objeto expirado (p. ej. tras un commit) se recargaría uno a uno al leerlo
+            if obj is not None and not inspect(obj).expired_attributes:
+                found[row_id] = obj
+            else:
+                missing.append(row_id)
+
+        for start in range(0, len(missing), MAX_IN_PARAMS):
+            chunk = missing[start:start + MAX_IN_PARAMS]
+            query = cls.with_profile(cls.query, profile).filter(cls.id.in_(chunk))
+            for obj in query.populate_existing():
+                found[obj.id] = obj
+
+        return found
+
+    @staticmethod
+    def _coerce_id(row_id):
+        # Los ids llegan a veces como texto (JSON, formularios): la clave del identity map es int
+        try:
+            return int(row_id)
+        except (TypeError, ValueError):
+            return None
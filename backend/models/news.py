@@ -1,10 +1,11 @@
 from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, joinedload
 from datetime import datetime
 
 from ..database.db_config import Base
+from .loader_profiles import LoaderProfileMixin
 
-class News(Base):
+class News(Base, LoaderProfileMixin):
     __tablename__ = 'news'
     
     id = Column(Integer, primary_key=True)
@@ -12,7 +13,7 @@ class News(Base):
     content = Column(Text, nullable=False)
     publish_date = Column(DateTime, default=datetime.utcnow)
     image_url = Column(String(255), nullable=True)
-    author_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    author_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     is_featured = Column(Boolean, default=False)
     is_exclusive = Column(Boolean, default=False)  # Para contenido exclusivo para VIP
     category = Column(String(50), default='general')  # general, destination, events, tips, etc.
@@ -39,6 +40,17 @@ class News(Base):
     def increment_views(self):
         self.views_count += 1
     
+    @classmethod
+    def for_list(cls):
+        """Opciones de carga para listados: nombre del autor en la misma consulta"""
+        from .user import User
+        return [joinedload(cls.author).load_only(User.name)]
+    
+    @classmethod
+    def for_detail(cls):
+        """Opciones de carga para el detalle: autor completo"""
+        return [joinedload(cls.author)]
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -3,8 +3,9 @@ from sqlalchemy.orm import relationship
 from datetime import datetime
 
 from ..database.db_config import Base
+from .loader_profiles import LoaderProfileMixin
 
-class Package(Base):
+class Package(Base, LoaderProfileMixin):
     __tablename__ = 'packages'
     
     id = Column(Integer, primary_key=True)
@@ -26,8 +27,9 @@ class Package(Base):
     season = Column(String(50), nullable=True)  # temporada recomendada
     
     # Relaciones
-    bookings = relationship("Booking", back_populates="package", cascade="all, delete-orphan")
-    reviews = relationship("Review", back_populates="package", cascade="all, delete-orphan")
+    # passive_deletes: las filas hijas se eliminan con ON DELETE CASCADE, sin cargarlas en la sesión
+    bookings = relationship("Booking", back_populates="package", cascade="all, delete-orphan", passive_deletes=True)
+    reviews = relationship("Review", back_populates="package", cascade="all, delete-orphan", passive_deletes=True)
     
     def __init__(self, destination, description, price, duration, included_services=None, 
                  images=None, availability=True, max_travelers=20):
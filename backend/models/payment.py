@@ -1,18 +1,21 @@
 from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, joinedload
 from datetime import datetime
 
 from ..database.db_config import Base
+from .loader_profiles import LoaderProfileMixin
 
-class Payment(Base):
+class Payment(Base, LoaderProfileMixin):
     __tablename__ = 'payments'
     
     id = Column(Integer, primary_key=True)
-    booking_id = Column(Integer, ForeignKey('bookings.id'), nullable=False)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    booking_id = Column(Integer, ForeignKey('bookings.id', ondelete='CASCADE'), nullable=False, index=True)
+    # Sin ON DELETE CASCADE: SQL Server no admite dos rutas de cascada desde users
+    # (users -> bookings -> payments); estos pagos se borran explícitamente en delete_user
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
     amount = Column(Float, nullable=False)
     payment_method = Column(String(50), nullable=False)  # credit_card, paypal, bank_transfer, etc.
-    transaction_id = Column(String(100), nullable=True)
+    transaction_id = Column(String(100), nullable=True, index=True)  # indexado para la conciliación
     status = Column(String(20), default='pending')  # pending, completed, failed, refunded
     payment_date = Column(DateTime, default=datetime.utcnow)
     card_last_digits = Column(String(4), nullable=True)
@@ -45,6 +48,25 @@ class Payment(Base):
             return True
         return False
     
+    @classmethod
+    def for_list(cls):
+        """Opciones de carga para listados: nombre del usuario y número de reserva en la misma consulta"""
+        from .user import User
+        from .booking import Booking
+        return [
+            joinedload(cls.user).load_only(User.name),
+            joinedload(cls.booking).load_only(Booking.booking_number)
+        ]
+    
+    @classmethod
+    def for_detail(cls):
+        """Opciones de carga para el detalle: usuario y reserva con su paquete"""
+        from .booking import Booking
+        return [
+            joinedload(cls.user),
+            joinedload(cls.booking).joinedload(Booking.package)
+        ]
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -1,15 +1,16 @@
 from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, joinedload
 from datetime import datetime
 
 from ..database.db_config import Base
+from .loader_profiles import LoaderProfileMixin
 
-class Review(Base):
+class Review(Base, LoaderProfileMixin):
     __tablename__ = 'reviews'
     
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
-    package_id = Column(Integer, ForeignKey('packages.id'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    package_id = Column(Integer, ForeignKey('packages.id', ondelete='CASCADE'), nullable=False, index=True)
     comment = Column(Text, nullable=False)
     rating = Column(Integer, nullable=False)  # 1-5 estrellas
     date = Column(DateTime, default=datetime.utcnow)
@@ -27,6 +28,24 @@ class Review(Base):
         self.date = date or datetime.utcnow()
         self.is_approved = is_approved
     
+    @classmethod
+    def for_list(cls):
+        """Opciones de carga para listados: nombre del usuario y destino en la misma consulta"""
+        from .user import User
+        from .package import Package
+        return [
+            joinedload(cls.user).load_only(User.name),
+            joinedload(cls.package).load_only(Package.destination)
+        ]
+    
+    @classmethod
+    def for_detail(cls):
+        """Opciones de carga para el detalle: usuario y paquete completos"""
+        return [
+            joinedload(cls.user),
+            joinedload(cls.package)
+        ]
+    
     def to_dict(self):
         return {
             'id': self.id,
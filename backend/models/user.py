@@ -3,8 +3,9 @@ from sqlalchemy.orm import relationship
 from datetime import datetime
 
 from ..database.db_config import Base
+from .loader_profiles import LoaderProfileMixin
 
-class User(Base):
+class User(Base, LoaderProfileMixin):
     __tablename__ = 'users'
     
     id = Column(Integer, primary_key=True)
@@ -18,9 +19,10 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     
     # Relaciones
-    bookings = relationship("Booking", back_populates="user", cascade="all, delete-orphan")
-    reviews = relationship("Review", back_populates="user", cascade="all, delete-orphan")
-    news = relationship("News", back_populates="author", cascade="all, delete-orphan")
+    # passive_deletes: las filas hijas se eliminan con ON DELETE CASCADE, sin cargarlas en la sesión
+    bookings = relationship("Booking", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    reviews = relationship("Review", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    news = relationship("News", back_populates="author", cascade="all, delete-orphan", passive_deletes=True)
     
     def __init__(self, name, email, password, role='client', profile_image=None):
         self.name = name
@@ -5,42 +5,69 @@ from datetime import datetime, timedelta
 from ..models.booking import Booking
 from ..models.package import Package
 from ..database.db_config import db_session
+from ..utils.pagination import paginate
+from ..utils.streaming import iterate_query
+from ..utils.cache import cached
+from ..config import ITEMS_PER_PAGE, STATS_CACHE_TIMEOUT, STATS_CACHE_MAX_AGE
 
 class BookingService:
     """Servicio para gestionar operaciones relacionadas con reservas de viajes"""
 
-    def get_all_bookings(self):
-        """Obtiene todas las reservas"""
+    def get_all_bookings(self, cursor=None, limit=ITEMS_PER_PAGE, columns=None, profile=None):
+        """Obtiene una página de reservas (más recientes primero)
+
+        Args:
+            profile (str, optional): Perfil de carga de relaciones ('list' o 'detail')
+        """
         try:
-            return Booking.query.order_by(desc(Booking.created_at)).all()
+            query = Booking.with_profile(Booking.query, profile)
+            return paginate(query, Booking, 'created_at', cursor, limit, columns)
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener reservas: {str(e)}")
 
-    def get_booking_by_id(self, booking_id):
+    def iter_all_bookings(self, columns=None, profile=None):
+        """Recorre todas las reservas por lotes, sin cargarlas todas en memoria"""
+        try:
+            query = Booking.with_profile(Booking.query, profile).order_by(desc(Booking.created_at), desc(Booking.id))
+            return iterate_query(query, Booking, columns)
+        except SQLAlchemyError as e:
+            raise Exception(f"Error al recorrer reservas: {str(e)}")
+
+    def get_booking_by_id(self, booking_id, profile=None):
         """Obtiene una reserva por su ID"""
         try:
-            return Booking.query.filter_by(id=booking_id).first()
+            # Sin consulta si ya está cargada en la sesión (identity map)
+            return Booking.get(booking_id, profile)
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener reserva: {str(e)}")
 
-    def get_booking_by_number(self, booking_number):
+    def get_bookings_by_ids(self, ids, profile=None):
+        """Obtiene varias reservas por ID ({id: reserva}) con una sola consulta para las que faltan en la sesión"""
+        try:
+            return Booking.get_many(ids, profile)
+        except SQLAlchemyError as e:
+            raise Exception(f"Error al obtener reservas: {str(e)}")
+
+    def get_booking_by_number(self, booking_number, profile=None):
         """Obtiene una reserva por su número de reserva"""
         try:
-            return Booking.query.filter_by(booking_number=booking_number).first()
+            return Booking.with_profile(Booking.query, profile).filter_by(booking_number=booking_number).first()
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener reserva por número: {str(e)}")
 
-    def get_user_bookings(self, user_id):
+    def get_user_bookings(self, user_id, profile=None):
         """Obtiene todas las reservas de un usuario específico"""
         try:
-            return Booking.query.filter_by(user_id=user_id).order_by(desc(Booking.created_at)).all()
+            query = Booking.with_profile(Booking.query, profile)
+            return query.filter_by(user_id=user_id).order_by(desc(Booking.created_at)).all()
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener reservas del usuario: {str(e)}")
 
-    def get_package_bookings(self, package_id):
+    def get_package_bookings(self, package_id, profile=None):
         """Obtiene todas las reservas para un paquete específico"""
         try:
-            return Booking.query.filter_by(package_id=package_id).order_by(desc(Booking.created_at)).all()
+            query = Booking.with_profile(Booking.query, profile)
+            return query.filter_by(package_id=package_id).order_by(desc(Booking.created_at)).all()
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener reservas del paquete: {str(e)}")
 
@@ -49,7 +76,7 @@ class BookingService:
         try:
             # Calculamos el precio total si no está establecido
             if not booking.total_price:
-                package = Package.query.filter_by(id=booking.package_id).first()
+                package = Package.get(booking.package_id)
                 if package:
                     booking.calculate_total_price(package.price)
             
@@ -99,7 +126,7 @@ class BookingService:
         """Verifica disponibilidad para un paquete en una fecha específica"""
         try:
             # Obtenemos el paquete para verificar max_travelers
-            package = Package.query.filter_by(id=package_id).first()
+            package = Package.get(package_id)
             if not package or not package.availability:
                 return False
             
@@ -119,7 +146,7 @@ class BookingService:
         """Obtiene fechas disponibles para un paquete en un rango determinado"""
         try:
             # Obtenemos el paquete
-            package = Package.query.filter_by(id=package_id).first()
+            package = Package.get(package_id)
             if not package or not package.availability:
                 return []
             
@@ -136,10 +163,10 @@ class BookingService:
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener fechas disponibles: {str(e)}")
 
-    def get_upcoming_bookings(self, user_id=None):
+    def get_upcoming_bookings(self, user_id=None, profile=None):
         """Obtiene reservas próximas (para un usuario específico o todas)"""
         try:
-            query = Booking.query.filter(
+            query = Booking.with_profile(Booking.query, profile).filter(
                 Booking.travel_date >= datetime.utcnow().date(),
                 Booking.status != 'cancelled'
             ).order_by(Booking.travel_date)
@@ -151,6 +178,7 @@ class BookingService:
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener reservas próximas: {str(e)}")
 
+    @cached(timeout=STATS_CACHE_MAX_AGE, stale_after=STATS_CACHE_TIMEOUT)
     def get_booking_stats(self, start_date=None, end_date=None):
         """Obtiene estadísticas de reservas en un período"""
         try:
@@ -195,8 +223,13 @@ class BookingService:
         except SQLAlchemyError as e:
             raise Exception(f"Error al verificar si el usuario ha viajado: {str(e)}")
 
+    @cached(timeout=STATS_CACHE_MAX_AGE, stale_after=STATS_CACHE_TIMEOUT)
     def get_most_active_users(self, limit=5):
-        """Obtiene los usuarios con más reservas"""
+        """Obtiene los usuarios con más reservas
+
+        Retorna diccionarios (id, name, email, booking_count) en lugar de
+        instancias de User para poder guardarlos en la caché.
+        """
         try:
             from ..models.user import User
             
@@ -206,9 +239,11 @@ class BookingService:
                 func.count(Booking.id).label('booking_count')
             ).group_by(Booking.user_id).subquery()
             
-            # Unimos con la tabla de usuarios
-            users = db_session.query(
-                User, 
+            # Unimos con la tabla de usuarios (solo las columnas necesarias)
+            rows = db_session.query(
+                User.id,
+                User.name,
+                User.email,
                 booking_counts.c.booking_count
             ).join(
                 booking_counts,
@@ -217,6 +252,6 @@ class BookingService:
                 desc(booking_counts.c.booking_count)
             ).limit(limit).all()
             
-            return users
+            return [dict(row._mapping) for row in rows]
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener usuarios más activos: {str(e)}")
\ No newline at end of file
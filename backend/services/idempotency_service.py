@@ -0,0 +1,95 @@
+import time
+from datetime import datetime
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+
+from ..models.idempotency_key import IdempotencyKey
+from ..database.db_config import db_session
+from ..config import IDEMPOTENCY_KEY_TTL, IDEMPOTENCY_WAIT_TIMEOUT
+
+class IdempotencyService:
+    """Servicio para registrar claves de idempotencia y las respuestas asociadas"""
+
+    def reserve(self, key, user_id, endpoint, request_hash):
+        """Reserva una clave para procesar la petición
+
+        Returns:
+            tuple: (registro, creado) donde creado indica si esta petición debe ejecutarse
+        """
+        try:
+            existing = self._find(key, user_id, endpoint)
+            if existing and existing.is_expired():
+                db_session.delete(existing)
+                db_session.commit()
+                existing = None
+            if existing:
+                return existing, False
+
+            record = IdempotencyKey(key, user_id, endpoint, request_hash, IDEMPOTENCY_KEY_TTL)
+            db_session.add(record)
+            db_session.commit()
+            return record, True
+        except IntegrityError:
+            # Otra petición con la misma clave la reservó primero
+            db_session.rollback()
+            return self._find(key, user_id, endpoint), False
+        except SQLAlchemyError as e:
+            db_session.rollback()
+            raise Exception(f"Error al reservar clave de idempotencia: {str(e)}")
+
+    def wait_for_completion(self, record_id, timeout=IDEMPOTENCY_WAIT_TIMEOUT, poll_interval=0.1):
+        """Espera a que la petición original termine; retorna None si no termina a tiempo"""
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                # Terminar la transacción para ver los cambios confirmados por la otra petición
+                db_session.rollback()
+                record = db_session.get(IdempotencyKey, record_id)
+                if record is None or record.status == 'completed':
+                    return record
+                if time.monotonic() >= deadline:
+                    return None
+                time.sleep(poll_interval)
+        except SQLAlchemyError as e:
+            db_session.rollback()
+            raise Exception(f"Error al esperar clave de idempotencia: {str(e)}")
+
+    def complete(self, record_id, status_code, body, mimetype):
+        """Guarda la respuesta de la petición original"""
+        try:
+            record = db_session.get(IdempotencyKey, record_id)
+            if record:
+                record.status = 'completed'
+                record.response_status = status_code
+                record.response_body = body
+                record.response_mimetype = mimetype
+                db_session.commit()
+        except SQLAlchemyError as e:
+            db_session.rollback()
+            raise Exception(f"Error al guardar respuesta idempotente: {str(e)}")
+
+    def release(self, record_id):
+        """Libera una clave cuya petición falló, para que un reintento pueda ejecutarse"""
+        try:
+            db_session.rollback()
+            db_session.query(IdempotencyKey).filter(
+                IdempotencyKey.id == record_id
+            ).delete(synchronize_session=False)
+            db_session.commit()
+        except SQLAlchemyError as e:
+            db_session.rollback()
+            raise Exception(f"Error al liberar clave de idempotencia: {str(e)}")
+
+    def purge_expired(self):
+        """Elimina las claves expiradas"""
+        try:
+            deleted = db_session.query(IdempotencyKey).filter(
+                IdempotencyKey.expires_at <= datetime.utcnow()
+            ).delete(synchronize_session=False)
+            db_session.commit()
+            return deleted
+        except SQLAlchemyError as e:
+            db_session.rollback()
+            raise Exception(f"Error al eliminar claves de idempotencia expiradas: {str(e)}")
+
+    def _find(self, key, user_id, endpoint):
+        return IdempotencyKey.query.filter_by(key=key, user_id=user_id, endpoint=endpoint).first()
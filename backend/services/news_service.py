@@ -3,45 +3,64 @@ from sqlalchemy import desc, and_, or_
 
 from ..models.news import News
 from ..database.db_config import db_session
+from ..utils.write_behind import write_behind
+from ..utils.pagination import paginate, paginate_rows
+from ..utils.cache import cached, invalidates
+from ..config import ITEMS_PER_PAGE
 
 class NewsService:
     """Servicio para gestionar operaciones relacionadas con noticias"""
 
-    def get_all_news(self):
-        """Obtiene todas las noticias"""
+    def get_all_news(self, cursor=None, limit=ITEMS_PER_PAGE, columns=None, profile=None, as_rows=False):
+        """Obtiene una página de noticias (más recientes primero)
+
+        Args:
+            as_rows (bool): Retornar filas con las columnas pedidas en lugar de instancias
+        """
         try:
-            return News.query.order_by(desc(News.publish_date)).all()
+            if as_rows:
+                return paginate_rows(News, 'publish_date', columns or [], cursor, limit)
+            return paginate(News.with_profile(News.query, profile), News, 'publish_date', cursor, limit, columns)
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener noticias: {str(e)}")
 
-    def get_news_by_id(self, news_id):
+    def get_news_by_id(self, news_id, profile=None):
         """Obtiene una noticia por su ID"""
         try:
-            return News.query.filter_by(id=news_id).first()
+            # Sin consulta si ya está cargada en la sesión (identity map)
+            return News.get(news_id, profile)
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener noticia: {str(e)}")
 
-    def get_news_by_category(self, category):
+    def get_news_by_ids(self, ids, profile=None):
+        """Obtiene varias noticias por ID ({id: noticia}) con una sola consulta para las que faltan en la sesión"""
+        try:
+            return News.get_many(ids, profile)
+        except SQLAlchemyError as e:
+            raise Exception(f"Error al obtener noticias: {str(e)}")
+
+    def get_news_by_category(self, category, profile=None):
         """Obtiene noticias por categoría"""
         try:
-            return News.query.filter_by(category=category).order_by(desc(News.publish_date)).all()
+            return News.with_profile(News.query, profile).filter_by(category=category).order_by(desc(News.publish_date)).all()
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener noticias por categoría: {str(e)}")
 
-    def get_featured_news(self):
+    def get_featured_news(self, profile=None):
         """Obtiene noticias destacadas"""
         try:
-            return News.query.filter_by(is_featured=True).order_by(desc(News.publish_date)).all()
+            return News.with_profile(News.query, profile).filter_by(is_featured=True).order_by(desc(News.publish_date)).all()
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener noticias destacadas: {str(e)}")
 
-    def get_exclusive_news(self):
+    def get_exclusive_news(self, profile=None):
         """Obtiene noticias exclusivas para clientes VIP"""
         try:
-            return News.query.filter_by(is_exclusive=True).order_by(desc(News.publish_date)).all()
+            return News.with_profile(News.query, profile).filter_by(is_exclusive=True).order_by(desc(News.publish_date)).all()
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener noticias exclusivas: {str(e)}")
 
+    @invalidates('news')
     def create_news(self, news):
         """Crea una nueva noticia"""
         try:
@@ -52,6 +71,7 @@ class NewsService:
             db_session.rollback()
             raise Exception(f"Error al crear noticia: {str(e)}")
 
+    @invalidates('news')
     def update_news(self, news):
         """Actualiza una noticia existente"""
         try:
@@ -61,6 +81,7 @@ class NewsService:
             db_session.rollback()
             raise Exception(f"Error al actualizar noticia: {str(e)}")
 
+    @invalidates('news')
     def delete_news(self, news_id):
         """Elimina una noticia"""
         try:
@@ -74,11 +95,11 @@ class NewsService:
             db_session.rollback()
             raise Exception(f"Error al eliminar noticia: {str(e)}")
 
-    def search_news(self, query):
+    def search_news(self, query, profile=None):
         """Busca noticias por título o contenido"""
         try:
             search_query = f"%{query}%"
-            return News.query.filter(
+            return News.with_profile(News.query, profile).filter(
                 or_(
                     News.title.ilike(search_query),
                     News.content.ilike(search_query),
@@ -89,29 +110,23 @@ class NewsService:
             raise Exception(f"Error al buscar noticias: {str(e)}")
 
     def increment_views(self, news_id):
-        """Incrementa el contador de vistas de una noticia"""
-        try:
-            news = self.get_news_by_id(news_id)
-            if news:
-                news.views_count += 1
-                db_session.commit()
-                return True
-            return False
-        except SQLAlchemyError as e:
-            db_session.rollback()
-            raise Exception(f"Error al incrementar vistas: {str(e)}")
+        """Incrementa el contador de vistas de una noticia (escritura diferida)"""
+        # Las vistas se acumulan en memoria y se vuelcan en lote con un único UPDATE
+        write_behind.increment(News, 'views_count', int(news_id))
+        return True
 
-    def get_popular_news(self, limit=5):
+    @cached(tags=('news',), model=News)
+    def get_popular_news(self, limit=5, profile=None):
         """Obtiene las noticias más populares basadas en vistas"""
         try:
-            return News.query.order_by(desc(News.views_count)).limit(limit).all()
+            return News.with_profile(News.query, profile).order_by(desc(News.views_count)).limit(limit).all()
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener noticias populares: {str(e)}")
 
-    def get_recent_news(self, limit=5, exclude_exclusive=True):
+    def get_recent_news(self, limit=5, exclude_exclusive=True, profile=None):
         """Obtiene las noticias más recientes"""
         try:
-            query = News.query
+            query = News.with_profile(News.query, profile)
             if exclude_exclusive:
                 query = query.filter_by(is_exclusive=False)
             
@@ -119,10 +134,10 @@ class NewsService:
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener noticias recientes: {str(e)}")
 
-    def get_related_news(self, news_id, category, limit=3):
+    def get_related_news(self, news_id, category, limit=3, profile=None):
         """Obtiene noticias relacionadas basadas en la categoría"""
         try:
-            return News.query.filter(
+            return News.with_profile(News.query, profile).filter(
                 and_(
                     News.category == category,
                     News.id != news_id
@@ -131,14 +146,15 @@ class NewsService:
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener noticias relacionadas: {str(e)}")
 
-    def get_news_by_tag(self, tag, limit=10):
+    def get_news_by_tag(self, tag, limit=10, profile=None):
         """Obtiene noticias por etiqueta"""
         try:
             search_tag = f"%{tag}%"
-            return News.query.filter(News.tags.ilike(search_tag)).order_by(desc(News.publish_date)).limit(limit).all()
+            return News.with_profile(News.query, profile).filter(News.tags.ilike(search_tag)).order_by(desc(News.publish_date)).limit(limit).all()
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener noticias por etiqueta: {str(e)}")
 
+    @invalidates('news')
     def toggle_featured(self, news_id):
         """Cambia el estado de destacada de una noticia"""
         try:
@@ -152,6 +168,7 @@ class NewsService:
             db_session.rollback()
             raise Exception(f"Error al cambiar estado de destacada: {str(e)}")
 
+    @invalidates('news')
     def toggle_exclusive(self, news_id):
         """Cambia el estado de exclusiva de una noticia"""
         try:
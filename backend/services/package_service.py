@@ -3,15 +3,28 @@ from sqlalchemy import desc, func
 
 from ..models.package import Package
 from ..models.review import Review
+from ..models.booking import Booking
 from ..database.db_config import db_session
+from ..utils.pagination import paginate, paginate_rows
+from ..utils.cache import cached, invalidates
+from ..services.purge_service import PurgeService
+from ..config import PURGE_BACKGROUND_THRESHOLD, ITEMS_PER_PAGE
+
+purge_service = PurgeService()
 
 class PackageService:
     """Servicio para gestionar operaciones relacionadas con paquetes turísticos"""
 
-    def get_all_packages(self):
-        """Obtiene todos los paquetes turísticos"""
+    def get_all_packages(self, cursor=None, limit=ITEMS_PER_PAGE, columns=None, as_rows=False):
+        """Obtiene una página de paquetes turísticos (más recientes primero)
+
+        Args:
+            as_rows (bool): Retornar filas con las columnas pedidas en lugar de instancias
+        """
         try:
-            return Package.query.all()
+            if as_rows:
+                return paginate_rows(Package, 'created_at', columns or [], cursor, limit)
+            return paginate(Package.query, Package, 'created_at', cursor, limit, columns)
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener paquetes: {str(e)}")
 
@@ -25,10 +38,19 @@ class PackageService:
     def get_package_by_id(self, package_id):
         """Obtiene un paquete por su ID"""
         try:
-            return Package.query.filter_by(id=package_id).first()
+            # Sin consulta si ya está cargado en la sesión (identity map)
+            return Package.get(package_id)
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener paquete: {str(e)}")
 
+    def get_packages_by_ids(self, ids):
+        """Obtiene varios paquetes por ID ({id: paquete}) con una sola consulta para los que faltan en la sesión"""
+        try:
+            return Package.get_many(ids)
+        except SQLAlchemyError as e:
+            raise Exception(f"Error al obtener paquetes: {str(e)}")
+
+    @invalidates('packages')
     def create_package(self, package):
         """Crea un nuevo paquete turístico"""
         try:
@@ -39,6 +61,7 @@ class PackageService:
             db_session.rollback()
             raise Exception(f"Error al crear paquete: {str(e)}")
 
+    @invalidates('packages')
     def update_package(self, package):
         """Actualiza la información de un paquete existente"""
         try:
@@ -48,11 +71,24 @@ class PackageService:
             db_session.rollback()
             raise Exception(f"Error al actualizar paquete: {str(e)}")
 
+    @invalidates('packages', 'reviews')
     def delete_package(self, package_id):
         """Elimina un paquete turístico"""
         try:
+            # Paquetes con muchas reservas: se ocultan y se purgan por lotes en segundo plano
+            bookings_count = Booking.query.filter_by(package_id=package_id).count()
+            if bookings_count >= PURGE_BACKGROUND_THRESHOLD:
+                updated = Package.query.filter_by(id=package_id).update(
+                    {'availability': False}, synchronize_session=False
+                )
+                db_session.commit()
+                if updated:
+                    purge_service.start_background_purge(purge_service.purge_package, package_id)
+                return bool(updated)
+            
             package = self.get_package_by_id(package_id)
             if package:
+                # Reservas, pagos y reseñas se eliminan con ON DELETE CASCADE (passive_deletes)
                 db_session.delete(package)
                 db_session.commit()
                 return True
@@ -61,6 +97,7 @@ class PackageService:
             db_session.rollback()
             raise Exception(f"Error al eliminar paquete: {str(e)}")
 
+    @invalidates('packages')
     def toggle_availability(self, package_id):
         """Cambia el estado de disponibilidad de un paquete"""
         try:
@@ -123,6 +160,7 @@ class PackageService:
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener paquetes por duración: {str(e)}")
 
+    @cached(tags=('packages', 'reviews'), model=Package)
     def get_top_rated_packages(self, limit=5):
         """Obtiene los paquetes mejor calificados"""
         try:
@@ -149,8 +187,6 @@ class PackageService:
     def get_most_booked_packages(self, limit=5):
         """Obtiene los paquetes más reservados"""
         try:
-            from ..models.booking import Booking
-            
             # Contamos las reservas por paquete
             booking_counts = db_session.query(
                 Booking.package_id,
@@ -1,40 +1,142 @@
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import desc, func
-import uuid
-from datetime import datetime
+from sqlalchemy import desc, func, select, cast, Date
+from sqlalchemy.orm import aliased
+from datetime import datetime, date, timedelta
 
 from ..models.payment import Payment
 from ..models.booking import Booking
+from ..models.user import User
+from ..models.package import Package
 from ..database.db_config import db_session
+from ..config import STREAM_BATCH_SIZE, ITEMS_PER_PAGE, STATS_CACHE_TIMEOUT, STATS_CACHE_MAX_AGE, REFUND_CHUNK_SIZE
+from ..utils.pagination import paginate
+from ..utils.streaming import iterate_query
+from ..utils.cache import cached
+from ..utils.payment_gateway import get_payment_gateway, GatewayError, GatewayDeclinedError, GatewayUnavailableError
+
+# SQL Server no genera nada para FOR UPDATE: el bloqueo de fila se pide con una sugerencia de tabla
+ROW_LOCK_HINT = 'WITH (UPDLOCK, ROWLOCK)'
+
+class PaymentProcessingError(Exception):
+    """Error al registrar un pago; charged indica si el cobro pudo llegar a realizarse"""
+
+    def __init__(self, message, charged):
+        super().__init__(message)
+        self.charged = charged
+
+
+def _for_update(query, model):
+    """Bloquea las filas leídas de model hasta el final de la transacción
+
+    FOR UPDATE en los motores que lo admiten y UPDLOCK/ROWLOCK en SQL Server.
+    """
+    return query.with_for_update().with_hint(model, ROW_LOCK_HINT, 'mssql')
+
 
 class PaymentService:
     """Servicio para gestionar operaciones relacionadas con pagos"""
 
-    def get_all_payments(self):
-        """Obtiene todos los pagos"""
+    def get_all_payments(self, cursor=None, limit=ITEMS_PER_PAGE, columns=None, profile=None):
+        """Obtiene una página de pagos (más recientes primero)
+
+        Args:
+            profile (str, optional): Perfil de carga de relaciones ('list' o 'detail')
+        """
         try:
-            return Payment.query.order_by(desc(Payment.payment_date)).all()
+            query = Payment.with_profile(Payment.query, profile)
+            return paginate(query, Payment, 'payment_date', cursor, limit, columns)
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener pagos: {str(e)}")
 
-    def get_payment_by_id(self, payment_id):
+    def iter_all_payments(self, columns=None, profile=None):
+        """Recorre todos los pagos por lotes, sin cargarlos todos en memoria"""
+        try:
+            query = Payment.with_profile(Payment.query, profile).order_by(desc(Payment.payment_date), desc(Payment.id))
+            return iterate_query(query, Payment, columns)
+        except SQLAlchemyError as e:
+            raise Exception(f"Error al recorrer pagos: {str(e)}")
+
+    # Columnas de la exportación de pagos para conciliación, en orden
+    EXPORT_COLUMNS = [
+        'payment_id', 'transaction_id', 'payment_date', 'amount', 'payment_method', 'status',
+        'card_last_digits', 'user_id', 'user_name', 'user_email', 'booking_id', 'booking_number',
+        'booking_status', 'travel_date', 'booking_total_price', 'package_id', 'package_destination'
+    ]
+
+    def iter_payment_export_rows(self, start_date=None, end_date=None):
+        """Recorre los pagos unidos a usuario, reserva y paquete en una sola consulta
+
+        No se construyen objetos ORM: se leen filas planas con un cursor del
+        lado del servidor, por lotes de STREAM_BATCH_SIZE.
+        """
+        try:
+            stmt = select(
+                Payment.id.label('payment_id'),
+                Payment.transaction_id,
+                Payment.payment_date,
+                Payment.amount,
+                Payment.payment_method,
+                Payment.status,
+                Payment.card_last_digits,
+                Payment.user_id,
+                User.name.label('user_name'),
+                User.email.label('user_email'),
+                Payment.booking_id,
+                Booking.booking_number,
+                Booking.status.label('booking_status'),
+                Booking.travel_date,
+                Booking.total_price.label('booking_total_price'),
+                Booking.package_id,
+                Package.destination.label('package_destination')
+            ).select_from(Payment).join(
+                User, User.id == Payment.user_id
+            ).join(
+                Booking, Booking.id == Payment.booking_id
+            ).join(
+                Package, Package.id == Booking.package_id
+            )
+            
+            if start_date:
+                stmt = stmt.where(Payment.payment_date >= start_date)
+            if end_date:
+                stmt = stmt.where(Payment.payment_date < end_date)
+            
+            stmt = stmt.order_by(Payment.payment_date, Payment.id).execution_options(
+                stream_results=True, yield_per=STREAM_BATCH_SIZE
+            )
+            
+            for row in db_session.execute(stmt).mappings():
+                yield row
+        except SQLAlchemyError as e:
+            raise Exception(f"Error al exportar pagos: {str(e)}")
+
+    def get_payment_by_id(self, payment_id, profile=None):
         """Obtiene un pago por su ID"""
         try:
-            return Payment.query.filter_by(id=payment_id).first()
+            # Sin consulta si ya está cargado en la sesión (identity map)
+            return Payment.get(payment_id, profile)
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener pago: {str(e)}")
 
-    def get_booking_payments(self, booking_id):
+    def get_payments_by_ids(self, ids, profile=None):
+        """Obtiene varios pagos por ID ({id: pago}) con una sola consulta para los que faltan en la sesión"""
+        try:
+            return Payment.get_many(ids, profile)
+        except SQLAlchemyError as e:
+            raise Exception(f"Error al obtener pagos: {str(e)}")
+
+    def get_booking_payments(self, booking_id, profile=None):
         """Obtiene todos los pagos de una reserva específica"""
         try:
-            return Payment.query.filter_by(booking_id=booking_id).order_by(desc(Payment.payment_date)).all()
+            return Payment.with_profile(Payment.query, profile).filter_by(booking_id=booking_id).order_by(desc(Payment.payment_date)).all()
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener pagos de la reserva: {str(e)}")
 
-    def get_user_payments(self, user_id):
+    def get_user_payments(self, user_id, profile=None):
         """Obtiene todos los pagos de un usuario específico"""
         try:
-            return Payment.query.filter_by(user_id=user_id).order_by(desc(Payment.payment_date)).all()
+            query = Payment.with_profile(Payment.query, profile)
+            return query.filter_by(user_id=user_id).order_by(desc(Payment.payment_date)).all()
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener pagos del usuario: {str(e)}")
 
@@ -71,36 +173,60 @@ class PaymentService:
             raise Exception(f"Error al eliminar pago: {str(e)}")
 
     def process_payment(self, booking_id, user_id, amount, payment_method, card_last_digits=None, billing_address=None):
-        """Procesa un nuevo pago y actualiza el estado si corresponde"""
+        """Procesa un nuevo pago y actualiza el estado si corresponde
+
+        El pago se registra como pendiente antes de cobrar, y el cobro usa una
+        referencia fija derivada de ese registro, de modo que los reintentos
+        hacia la pasarela nunca cobran dos veces. Tras el cobro, el pago se
+        completa en la misma transacción que el estado de la reserva; si esa
+        transacción falla, el cobro se anula en la pasarela.
+
+        La fila de la reserva se bloquea (FOR UPDATE, UPDLOCK en SQL Server) durante toda la
+        transacción, de modo que dos pagos concurrentes de la misma reserva se
+        serializan y la suma de lo pagado siempre incluye el pago anterior.
+
+        Raises:
+            GatewayError: Error de la pasarela al cobrar (el pago queda como failed,
+                o pending si no se sabe si se cobró)
+            PaymentProcessingError: Error de base de datos; su atributo charged indica
+                si el cobro pudo llegar a realizarse
+        """
         try:
-            # Simulación de procesamiento con pasarela de pagos
-            # En un caso real, aquí se integraría con la API de la pasarela
-            transaction_id = str(uuid.uuid4())
-            
-            # Crear el registro de pago
             payment = Payment(
                 booking_id=booking_id,
                 user_id=user_id,
                 amount=amount,
                 payment_method=payment_method,
-                transaction_id=transaction_id,
-                status='completed',  # Asumimos que el pago es exitoso
+                status='pending',
                 card_last_digits=card_last_digits,
                 billing_address=billing_address
             )
-            
             db_session.add(payment)
+            db_session.commit()
+            payment_id = payment.id
+        except SQLAlchemyError as e:
+            db_session.rollback()
+            raise PaymentProcessingError(f"Error al registrar pago: {str(e)}", charged=False)
+        
+        # El cobro se hace antes de bloquear la reserva: una pasarela lenta no retiene el bloqueo
+        gateway = get_payment_gateway()
+        try:
+            transaction_id = gateway.charge(amount, card_last_digits=card_last_digits, reference=f"payment-{payment_id}")
+        except (GatewayDeclinedError, GatewayUnavailableError):
+            # Rechazo o pasarela no disponible: seguro que no se cobró
+            self._mark_payment_failed(payment_id)
+            raise
+        
+        try:
+            # Bloquear la reserva antes de leer lo pagado hasta ahora
+            booking = self._lock_booking(booking_id)
+            payment = db_session.get(Payment, payment_id, populate_existing=True)
+            payment.complete_payment(transaction_id)
             
-            # Verificar si con este pago se completa el total de la reserva
-            booking = Booking.query.filter_by(id=booking_id).first()
             if booking:
-                # Calcular el total pagado hasta ahora
-                total_paid = db_session.query(func.sum(Payment.amount)).filter(
-                    Payment.booking_id == booking_id,
-                    Payment.status == 'completed'
-                ).scalar() or 0
-                
-                total_paid += amount
+                # La sesión no hace autoflush: el pago completado se escribe antes de sumar
+                db_session.flush()
+                total_paid = self._completed_total(booking_id)
                 
                 # Si el total pagado cubre el precio total, confirmar la reserva
                 if total_paid >= booking.total_price and booking.status == 'pending':
@@ -109,14 +235,33 @@ class PaymentService:
             db_session.commit()
             
             return {
-                'payment_id': payment.id,
+                'payment_id': payment_id,
                 'transaction_id': transaction_id,
                 'status': 'completed',
                 'booking_status': booking.status if booking else None
             }
         except SQLAlchemyError as e:
             db_session.rollback()
-            raise Exception(f"Error al procesar pago: {str(e)}")
+            self._void_charge(gateway, payment_id, transaction_id, amount)
+            raise PaymentProcessingError(f"Error al procesar pago: {str(e)}", charged=True)
+
+    def _mark_payment_failed(self, payment_id):
+        """Marca como fallido un pago pendiente cuyo cobro no se realizó"""
+        try:
+            Payment.query.filter_by(id=payment_id, status='pending').update({'status': 'failed'})
+            db_session.commit()
+        except SQLAlchemyError:
+            # Queda pendiente y la conciliación lo detecta
+            db_session.rollback()
+
+    def _void_charge(self, gateway, payment_id, transaction_id, amount):
+        """Anula un cobro que no se pudo registrar como completado"""
+        try:
+            gateway.refund(transaction_id, amount, reference=f"void-{payment_id}")
+        except GatewayError:
+            # El cobro sigue en la pasarela con la referencia payment-<id>: lo resuelve la conciliación
+            return
+        self._mark_payment_failed(payment_id)
 
     def refund_payment(self, payment_id):
         """Procesa un reembolso de pago"""
@@ -125,20 +270,24 @@ class PaymentService:
             if not payment or payment.status != 'completed':
                 return False
             
-            # Simular procesamiento de reembolso
-            # En un caso real, aquí se integraría con la API de la pasarela
+            # Reembolso en la pasarela fuera del bloqueo; la referencia fija por pago
+            # hace que la pasarela ignore un segundo reembolso del mismo pago
+            get_payment_gateway().refund(payment.transaction_id, payment.amount, reference=f"refund-{payment.id}")
+            
+            # Bloquear la reserva y releer el pago para no reembolsarlo dos veces en paralelo
+            booking = self._lock_booking(payment.booking_id)
+            db_session.refresh(payment)
+            if payment.status != 'completed':
+                db_session.rollback()
+                return False
+            
             payment.status = 'refunded'
             
             # Verificar si hay que actualizar el estado de la reserva
-            booking = Booking.query.filter_by(id=payment.booking_id).first()
             if booking and booking.status == 'confirmed':
-                # Verificar si después del reembolso los pagos no alcanzan para cubrir el total
-                total_paid = db_session.query(func.sum(Payment.amount)).filter(
-                    Payment.booking_id == booking.id,
-                    Payment.status == 'completed'
-                ).scalar() or 0
-                
-                total_paid -= payment.amount
+                # La sesión no hace autoflush: el reembolso se escribe antes de sumar
+                db_session.flush()
+                total_paid = self._completed_total(booking.id)
                 
                 if total_paid < booking.total_price:
                     booking.status = 'pending'
@@ -150,51 +299,229 @@ class PaymentService:
             db_session.rollback()
             raise Exception(f"Error al procesar reembolso: {str(e)}")
 
-    def get_payment_stats(self, start_date=None, end_date=None):
-        """Obtiene estadísticas de pagos en un período"""
+    def refund_payments(self, payment_ids=None, package_id=None, travel_date=None,
+                        cancel_bookings=False, chunk_size=REFUND_CHUNK_SIZE):
+        """Reembolsa muchos pagos, por ids o por salida (paquete + fecha de viaje)
+
+        Los pagos se procesan por lotes, con una transacción por lote. El estado
+        de cada reserva afectada se actualiza una sola vez por lote, a partir de
+        una única suma agrupada de lo que sigue pagado.
+
+        Returns:
+            list: Resultado por pago ({'payment_id', 'status', 'message'})
+        """
+        try:
+            if payment_ids is None:
+                # Todos los pagos completados de la salida cancelada
+                payment_ids = [row.id for row in db_session.query(Payment.id).join(
+                    Booking, Booking.id == Payment.booking_id
+                ).filter(
+                    Booking.package_id == package_id,
+                    Booking.travel_date == travel_date,
+                    Payment.status == 'completed'
+                ).all()]
+            payment_ids = list(dict.fromkeys(int(payment_id) for payment_id in payment_ids))
+        except SQLAlchemyError as e:
+            raise Exception(f"Error al obtener pagos a reembolsar: {str(e)}")
+        
+        results = []
+        for i in range(0, len(payment_ids), chunk_size):
+            results.extend(self._refund_chunk(payment_ids[i:i + chunk_size], cancel_bookings))
+        return results
+
+    def _refund_chunk(self, payment_ids, cancel_bookings):
+        """Reembolsa un lote de pagos en una sola transacción"""
+        results = {}
+        try:
+            payments = {p.id: p for p in Payment.query.filter(Payment.id.in_(payment_ids)).all()}
+            
+            # Reembolsos en la pasarela fuera del bloqueo (referencia fija por pago)
+            gateway = get_payment_gateway()
+            to_refund = []
+            for payment_id in payment_ids:
+                payment = payments.get(payment_id)
+                if not payment:
+                    results[payment_id] = {'payment_id': payment_id, 'status': 'not_found'}
+                elif payment.status != 'completed':
+                    results[payment_id] = {'payment_id': payment_id, 'status': 'not_refundable',
+                                           'message': f"Payment is {payment.status}"}
+                else:
+                    try:
+                        gateway.refund(payment.transaction_id, payment.amount, reference=f"refund-{payment.id}")
+                        to_refund.append(payment_id)
+                    except GatewayError as e:
+                        results[payment_id] = {'payment_id': payment_id, 'status': 'error', 'message': str(e)}
+            
+            if to_refund:
+                # Bloquear las reservas afectadas y releer los pagos bajo el bloqueo
+                booking_ids = {payments[payment_id].booking_id for payment_id in to_refund}
+                bookings = _for_update(
+                    Booking.query.filter(Booking.id.in_(booking_ids)).order_by(Booking.id), Booking
+                ).populate_existing().all()
+                locked = Payment.query.filter(Payment.id.in_(to_refund)).populate_existing().all()
+                
+                for payment in locked:
+                    if payment.status == 'completed':
+                        payment.status = 'refunded'
+                        results[payment.id] = {'payment_id': payment.id, 'status': 'refunded'}
+                    else:
+                        results[payment.id] = {'payment_id': payment.id, 'status': 'not_refundable',
+                                               'message': f"Payment is {payment.status}"}
+                
+                # La sesión no hace autoflush: los reembolsos se escriben antes de la suma
+                db_session.flush()
+                
+                # Lo que sigue pagado por reserva, en una sola consulta
+                paid = dict(db_session.query(
+                    Payment.booking_id, func.sum(Payment.amount)
+                ).filter(
+                    Payment.booking_id.in_(booking_ids),
+                    Payment.status == 'completed'
+                ).group_by(Payment.booking_id).all())
+                
+                for booking in bookings:
+                    if cancel_bookings:
+                        booking.status = 'cancelled'
+                    elif booking.status == 'confirmed' and (paid.get(booking.id) or 0) < booking.total_price:
+                        booking.status = 'pending'
+            
+            db_session.commit()
+        except SQLAlchemyError as e:
+            db_session.rollback()
+            # Los reembolsos de la pasarela ya hechos se pueden reintentar: la referencia es la misma
+            for payment_id in payment_ids:
+                if payment_id not in results or results[payment_id]['status'] == 'refunded':
+                    results[payment_id] = {'payment_id': payment_id, 'status': 'error',
+                                           'message': f"Error al procesar reembolso: {str(e)}"}
+        
+        return [results[payment_id] for payment_id in payment_ids]
+
+    def _lock_booking(self, booking_id):
+        """Obtiene la reserva bloqueando su fila hasta el final de la transacción"""
+        # populate_existing: si la reserva ya estaba en la sesión, se refresca con los datos bloqueados
+        return _for_update(Booking.query.filter_by(id=booking_id), Booking).populate_existing().first()
+
+    def _completed_total(self, booking_id):
+        """Suma de los pagos completados de una reserva"""
+        return db_session.query(func.sum(Payment.amount)).filter(
+            Payment.booking_id == booking_id,
+            Payment.status == 'completed'
+        ).scalar() or 0
+
+    @cached(timeout=STATS_CACHE_MAX_AGE, stale_after=STATS_CACHE_TIMEOUT)
+    def get_payment_stats(self, start_date=None, end_date=None, interval='day'):
+        """Obtiene estadísticas de pagos en un período en una sola consulta agrupada
+
+        Retorna totales, desglose por método y por estado, y una serie temporal
+        de ingresos (pagos completados) agrupada por día, semana o mes.
+        end_date es exclusiva (inicio del día siguiente al último del período).
+        """
+        if interval not in ('day', 'week', 'month'):
+            raise ValueError('Invalid interval! Use day, week or month')
+        
         try:
+            day = cast(Payment.payment_date, Date)
             query = db_session.query(
-                func.count(Payment.id).label('total_payments'),
-                func.sum(Payment.amount).label('total_amount')
-            ).filter(Payment.status == 'completed')
+                day.label('day'),
+                Payment.status,
+                Payment.payment_method,
+                func.count(Payment.id).label('count'),
+                func.sum(Payment.amount).label('amount')
+            )
             
             if start_date:
                 query = query.filter(Payment.payment_date >= start_date)
             if end_date:
-                query = query.filter(Payment.payment_date <= end_date)
+                query = query.filter(Payment.payment_date < end_date)
             
-            result = query.first()
+            rows = query.group_by(day, Payment.status, Payment.payment_method).all()
             
-            # Pagos por método de pago
+            total_payments = 0
+            total_amount = 0.0
             payment_methods = {}
-            methods = db_session.query(
-                Payment.payment_method,
-                func.count(Payment.id).label('count'),
-                func.sum(Payment.amount).label('amount')
-            ).filter(
-                Payment.status == 'completed'
-            ).group_by(
-                Payment.payment_method
-            ).all()
+            payment_statuses = {}
+            series = {}
             
-            for method in methods:
-                payment_methods[method.payment_method] = {
-                    'count': method.count,
-                    'amount': float(method.amount) if method.amount else 0
-                }
+            for row in rows:
+                amount = float(row.amount or 0)
+                
+                status = payment_statuses.setdefault(row.status, {'count': 0, 'amount': 0.0})
+                status['count'] += row.count
+                status['amount'] += amount
+                
+                # Los totales, métodos y la serie de ingresos solo cuentan pagos completados
+                if row.status != 'completed':
+                    continue
+                
+                total_payments += row.count
+                total_amount += amount
+                
+                method = payment_methods.setdefault(row.payment_method, {'count': 0, 'amount': 0.0})
+                method['count'] += row.count
+                method['amount'] += amount
+                
+                bucket = series.setdefault(self._bucket_start(row.day, interval), {'count': 0, 'amount': 0.0})
+                bucket['count'] += row.count
+                bucket['amount'] += amount
             
-            return {
-                'total_payments': result.total_payments or 0,
-                'total_amount': float(result.total_amount or 0),
-                'payment_methods': payment_methods
+            stats = {
+                'total_payments': total_payments,
+                'total_amount': total_amount,
+                'payment_methods': payment_methods,
+                'payment_statuses': payment_statuses,
+                'interval': interval,
+                'revenue_series': self._fill_series(series, start_date, end_date, interval)
             }
+            
+            return stats
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener estadísticas de pagos: {str(e)}")
 
+    def _bucket_start(self, day, interval):
+        """Retorna el primer día del intervalo (día, semana ISO o mes) que contiene la fecha"""
+        if isinstance(day, str):
+            day = date.fromisoformat(day[:10])
+        elif isinstance(day, datetime):
+            day = day.date()
+        
+        if interval == 'week':
+            return day - timedelta(days=day.weekday())
+        if interval == 'month':
+            return day.replace(day=1)
+        return day
+
+    def _next_bucket(self, bucket, interval):
+        if interval == 'week':
+            return bucket + timedelta(days=7)
+        if interval == 'month':
+            return (bucket.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return bucket + timedelta(days=1)
+
+    def _fill_series(self, series, start_date, end_date, interval):
+        """Ordena la serie e incluye los intervalos sin pagos dentro del rango"""
+        if not series and not (start_date and end_date):
+            return []
+        
+        first = self._bucket_start(start_date, interval) if start_date else min(series)
+        # end_date es exclusiva: el último intervalo es el que contiene el día anterior
+        last = self._bucket_start(end_date - timedelta(days=1), interval) if end_date else max(series)
+        
+        result = []
+        bucket = first
+        while bucket <= last:
+            values = series.get(bucket, {'count': 0, 'amount': 0.0})
+            result.append({
+                'period': bucket.isoformat(),
+                'count': values['count'],
+                'amount': values['amount']
+            })
+            bucket = self._next_bucket(bucket, interval)
+        return result
+
     def check_booking_payment_status(self, booking_id):
         """Verifica el estado de pago de una reserva"""
         try:
-            booking = Booking.query.filter_by(id=booking_id).first()
+            booking = Booking.get(booking_id)
             if not booking:
                 return None
             
@@ -216,29 +543,86 @@ class PaymentService:
         except SQLAlchemyError as e:
             raise Exception(f"Error al verificar estado de pago: {str(e)}")
 
-    def generate_payment_receipt(self, payment_id):
-        """Genera datos para un recibo de pago"""
+    def get_receipt_data(self, payment_id):
+        """Obtiene en una sola consulta todos los datos de un recibo de pago
+
+        Une pago, reserva, paquete y usuario y calcula lo pagado de la reserva
+        con una subconsulta, de modo que el recibo se arma en un único viaje a
+        la base de datos.
+
+        Returns:
+            dict: Datos planos del recibo o None si el pago no existe
+        """
+        paid = aliased(Payment)
+        total_paid = select(func.coalesce(func.sum(paid.amount), 0)).where(
+            paid.booking_id == Payment.booking_id,
+            paid.status == 'completed'
+        ).scalar_subquery()
+
+        stmt = select(
+            Payment.id.label('payment_id'),
+            Payment.user_id,
+            Payment.booking_id,
+            Payment.amount,
+            Payment.payment_method,
+            Payment.transaction_id,
+            Payment.status,
+            Payment.payment_date,
+            Payment.card_last_digits,
+            User.name.label('user_name'),
+            User.email.label('user_email'),
+            Booking.booking_number,
+            Booking.travel_date,
+            Booking.number_of_travelers,
+            Booking.total_price,
+            Package.destination,
+            total_paid.label('total_paid')
+        ).select_from(Payment).outerjoin(
+            User, User.id == Payment.user_id
+        ).outerjoin(
+            Booking, Booking.id == Payment.booking_id
+        ).outerjoin(
+            Package, Package.id == Booking.package_id
+        ).where(Payment.id == payment_id)
+
         try:
-            payment = self.get_payment_by_id(payment_id)
-            if not payment:
+            row = db_session.execute(stmt).mappings().first()
+            if not row:
                 return None
-            
-            booking = Booking.query.filter_by(id=payment.booking_id).first()
-            
-            receipt_data = {
-                'receipt_number': f"RCP-{payment.id}",
-                'transaction_id': payment.transaction_id,
-                'payment_date': payment.payment_date.strftime('%Y-%m-%d %H:%M:%S'),
-                'payment_method': payment.payment_method,
-                'amount': payment.amount,
-                'status': payment.status,
-                'user_name': payment.user.name if payment.user else 'N/A',
-                'booking_number': booking.booking_number if booking else 'N/A',
-                'destination': booking.package.destination if booking and booking.package else 'N/A',
-                'travel_date': booking.travel_date.strftime('%Y-%m-%d') if booking else 'N/A',
-                'generated_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
-            }
-            
-            return receipt_data
+
+            receipt = dict(row)
+            receipt['receipt_number'] = f"RCP-{receipt['payment_id']}"
+            receipt['total_paid'] = float(receipt['total_paid'] or 0)
+            total_price = receipt['total_price'] or 0
+            receipt['pending_amount'] = max(total_price - receipt['total_paid'], 0)
+            receipt['is_fully_paid'] = receipt['total_paid'] >= total_price
+            return receipt
         except SQLAlchemyError as e:
-            raise Exception(f"Error al generar recibo de pago: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error al obtener datos del recibo: {str(e)}")
+
+    def generate_payment_receipt(self, payment_id, receipt=None):
+        """Genera datos para un recibo de pago
+
+        Args:
+            payment_id (int): ID del pago
+            receipt (dict, optional): Datos ya obtenidos con get_receipt_data
+        """
+        receipt = receipt or self.get_receipt_data(payment_id)
+        if not receipt:
+            return None
+
+        return {
+            'receipt_number': receipt['receipt_number'],
+            'transaction_id': receipt['transaction_id'],
+            'payment_date': receipt['payment_date'].strftime('%Y-%m-%d %H:%M:%S') if receipt['payment_date'] else None,
+            'payment_method': receipt['payment_method'],
+            'amount': receipt['amount'],
+            'status': receipt['status'],
+            'user_name': receipt['user_name'] or 'N/A',
+            'booking_number': receipt['booking_number'] or 'N/A',
+            'destination': receipt['destination'] or 'N/A',
+            'travel_date': receipt['travel_date'].strftime('%Y-%m-%d') if receipt['travel_date'] else 'N/A',
+            'total_paid': receipt['total_paid'],
+            'pending_amount': receipt['pending_amount'],
+            'generated_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        }
\ No newline at end of file
@@ -0,0 +1,102 @@
+import logging
+import threading
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..models.booking import Booking
+from ..models.news import News
+from ..models.package import Package
+from ..models.payment import Payment
+from ..models.review import Review
+from ..models.user import User
+from ..database.db_config import db_session
+from ..utils.cache import invalidates
+from ..config import PURGE_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+class PurgeService:
+    """Servicio para eliminar en lotes paquetes y usuarios con muchos registros asociados
+
+    Cada lote se borra y confirma en su propia transacción, de modo que los
+    bloqueos se mantienen poco tiempo aunque el grafo tenga decenas de miles
+    de reservas.
+    """
+
+    def __init__(self, chunk_size=PURGE_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+
+    @invalidates('packages', 'reviews')
+    def purge_package(self, package_id):
+        """Elimina un paquete junto con sus reservas, pagos y reseñas, por lotes"""
+        try:
+            deleted = self._purge_bookings(Booking.package_id == package_id)
+            deleted += self._delete_in_chunks(Review, Review.package_id == package_id)
+            deleted += db_session.query(Package).filter(
+                Package.id == package_id
+            ).delete(synchronize_session=False)
+            db_session.commit()
+            return deleted
+        except SQLAlchemyError as e:
+            db_session.rollback()
+            raise Exception(f"Error al purgar paquete: {str(e)}")
+
+    @invalidates('reviews', 'news')
+    def purge_user(self, user_id):
+        """Elimina un usuario junto con sus reservas, pagos, reseñas y noticias, por lotes"""
+        try:
+            deleted = self._purge_bookings(Booking.user_id == user_id)
+            deleted += self._delete_in_chunks(Payment, Payment.user_id == user_id)
+            deleted += self._delete_in_chunks(Review, Review.user_id == user_id)
+            deleted += self._delete_in_chunks(News, News.author_id == user_id)
+            deleted += db_session.query(User).filter(
+                User.id == user_id
+            ).delete(synchronize_session=False)
+            db_session.commit()
+            return deleted
+        except SQLAlchemyError as e:
+            db_session.rollback()
+            raise Exception(f"Error al purgar usuario: {str(e)}")
+
+    def start_background_purge(self, purge, entity_id):
+        """Lanza una purga en un hilo aparte y retorna el hilo"""
+        def run():
+            try:
+                purge(entity_id)
+            except Exception as e:
+                logger.exception(f"Error in background purge of {entity_id}: {str(e)}")
+            finally:
+                db_session.remove()
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def _purge_bookings(self, condition):
+        """Elimina por lotes las reservas que cumplen la condición y sus pagos"""
+        deleted = 0
+        while True:
+            ids = [row.id for row in db_session.query(Booking.id).filter(condition).limit(self.chunk_size).all()]
+            if not ids:
+                return deleted
+
+            # Los pagos se borran explícitamente por si la base de datos aún no tiene ON DELETE CASCADE
+            deleted += db_session.query(Payment).filter(
+                Payment.booking_id.in_(ids)
+            ).delete(synchronize_session=False)
+            deleted += db_session.query(Booking).filter(
+                Booking.id.in_(ids)
+            ).delete(synchronize_session=False)
+            db_session.commit()
+
+    def _delete_in_chunks(self, model, condition):
+        """Elimina por lotes las filas de un modelo que cumplen la condición"""
+        deleted = 0
+        while True:
+            ids = [row.id for row in db_session.query(model.id).filter(condition).limit(self.chunk_size).all()]
+            if not ids:
+                return deleted
+
+            deleted += db_session.query(model).filter(
+                model.id.in_(ids)
+            ).delete(synchronize_session=False)
+            db_session.commit()
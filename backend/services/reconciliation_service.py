@@ -0,0 +1,222 @@
+import csv
+import io
+import json
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..models.payment import Payment
+from ..database.db_config import db_session
+from ..config import (
+    RECONCILE_CHUNK_SIZE, RECONCILE_MAX_ISSUES, RECONCILE_AMOUNT_TOLERANCE, STREAM_BATCH_SIZE
+)
+
+class ReconciliationService:
+    """Servicio para conciliar el archivo de liquidación de la pasarela con los pagos
+
+    El archivo se lee línea a línea y se cruza por lotes con Payment.transaction_id
+    (columna indexada). La memoria no depende del tamaño del archivo: solo se
+    mantiene un lote de líneas, un mapa de bits con los ids de pago ya
+    conciliados y las transacciones sin pago (que son incidencias).
+    """
+
+    def __init__(self, chunk_size=RECONCILE_CHUNK_SIZE, max_issues=RECONCILE_MAX_ISSUES,
+                 tolerance=RECONCILE_AMOUNT_TOLERANCE):
+        self.chunk_size = chunk_size
+        self.max_issues = max_issues
+        self.tolerance = tolerance
+
+    def reconcile(self, stream, file_format='csv', start_date=None, end_date=None, issue_writer=None):
+        """Concilia un archivo de liquidación
+
+        Args:
+            stream: Archivo abierto en modo texto (CSV con cabecera o JSONL)
+            file_format (str): 'csv' o 'jsonl'
+            start_date, end_date (datetime, optional): Período liquidado; si se indican,
+                también se reportan los pagos completados del período que no aparecen en el archivo
+            issue_writer (callable, optional): Recibe cada incidencia (para volcarlas a un archivo)
+
+        Returns:
+            dict: Resumen con contadores y las primeras incidencias
+        """
+        self._summary = {
+            'lines': 0,
+            'matched': 0,
+            'missing': 0,
+            'duplicates': 0,
+            'amount_mismatches': 0,
+            'status_mismatches': 0,
+            'duplicate_payments': 0,
+            'unsettled': 0,
+            'invalid_lines': 0,
+            'issues': []
+        }
+        self._issue_writer = issue_writer
+        self._matched_ids = bytearray()  # mapa de bits por Payment.id
+        self._unmatched = set()  # transaction_id del archivo sin pago en la base de datos
+
+        try:
+            chunk = []
+            for line_number, record in self._read(stream, file_format):
+                self._summary['lines'] += 1
+                if record is None:
+                    self._summary['invalid_lines'] += 1
+                    self._issue('invalid_line', line=line_number)
+                    continue
+                chunk.append((line_number, record))
+                if len(chunk) >= self.chunk_size:
+                    self._match_chunk(chunk)
+                    chunk = []
+            if chunk:
+                self._match_chunk(chunk)
+
+            if start_date and end_date:
+                self._find_unsettled(start_date, end_date)
+
+            return self._summary
+        except SQLAlchemyError as e:
+            raise Exception(f"Error al conciliar pagos: {str(e)}")
+
+    def _read(self, stream, file_format):
+        """Genera (número de línea, {'transaction_id', 'amount'}) o None si la línea no es válida"""
+        if file_format == 'jsonl':
+            for line_number, line in enumerate(stream, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, self._normalize(json.loads(line))
+                except (ValueError, TypeError, KeyError):
+                    yield line_number, None
+        else:
+            for line_number, row in enumerate(csv.DictReader(stream), start=2):
+                try:
+                    yield line_number, self._normalize(row)
+                except (ValueError, TypeError, KeyError):
+                    yield line_number, None
+
+    def _normalize(self, row):
+        transaction_id = str(row['transaction_id']).strip()
+        if not transaction_id:
+            raise ValueError('empty transaction_id')
+        return {'transaction_id': transaction_id, 'amount': float(row['amount'])}
+
+    def _match_chunk(self, chunk):
+        """Cruza un lote de líneas con los pagos mediante una consulta por el índice"""
+        transaction_ids = list({record['transaction_id'] for _, record in chunk})
+        rows = db_session.execute(
+            select(Payment.id, Payment.transaction_id, Payment.amount, Payment.status)
+            .where(Payment.transaction_id.in_(transaction_ids))
+        ).all()
+
+        payments = {}
+        for row in rows:
+            payments.setdefault(row.transaction_id, []).append(row)
+
+        for transaction_id, matches in payments.items():
+            if len(matches) > 1:
+                self._summary['duplicate_payments'] += 1
+                self._issue('duplicate_payment', transaction_id=transaction_id,
+                            payment_ids=[match.id for match in matches])
+
+        for line_number, record in chunk:
+            transaction_id = record['transaction_id']
+            matches = payments.get(transaction_id)
+
+            if not matches:
+                if transaction_id in self._unmatched:
+                    self._summary['duplicates'] += 1
+                    self._issue('duplicate_line', line=line_number, transaction_id=transaction_id)
+                else:
+                    self._unmatched.add(transaction_id)
+                    self._summary['missing'] += 1
+                    self._issue('missing_payment', line=line_number, transaction_id=transaction_id,
+                                settled_amount=record['amount'])
+                continue
+
+            payment = matches[0]
+            if self._is_matched(payment.id):
+                self._summary['duplicates'] += 1
+                self._issue('duplicate_line', line=line_number, transaction_id=transaction_id,
+                            payment_id=payment.id)
+                continue
+
+            self._mark_matched(payment.id)
+            self._summary['matched'] += 1
+            if abs((payment.amount or 0) - record['amount']) > self.tolerance:
+                self._summary['amount_mismatches'] += 1
+                self._issue('amount_mismatch', line=line_number, transaction_id=transaction_id,
+                            payment_id=payment.id, amount=payment.amount, settled_amount=record['amount'])
+            # La pasarela liquidó el cobro pero el pago no figura como completado (pendiente, fallido, reembolsado)
+            if payment.status != 'completed':
+                self._summary['status_mismatches'] += 1
+                self._issue('status_mismatch', line=line_number, transaction_id=transaction_id,
+                            payment_id=payment.id, status=payment.status)
+
+    def _find_unsettled(self, start_date, end_date):
+        """Reporta los pagos completados del período que no aparecen en el archivo"""
+        stmt = select(Payment.id, Payment.transaction_id, Payment.amount).where(
+            Payment.status == 'completed',
+            Payment.payment_date >= start_date,
+            Payment.payment_date < end_date
+        ).execution_options(stream_results=True, yield_per=STREAM_BATCH_SIZE)
+
+        for row in db_session.execute(stmt):
+            if not self._is_matched(row.id):
+                self._summary['unsettled'] += 1
+                self._issue('unsettled_payment', payment_id=row.id, transaction_id=row.transaction_id,
+                            amount=row.amount)
+
+    def _is_matched(self, payment_id):
+        index, bit = divmod(payment_id, 8)
+        return index < len(self._matched_ids) and bool(self._matched_ids[index] & (1 << bit))
+
+    def _mark_matched(self, payment_id):
+        index, bit = divmod(payment_id, 8)
+        if index >= len(self._matched_ids):
+            self._matched_ids.extend(b'\x00' * (index + 1 - len(self._matched_ids)))
+        self._matched_ids[index] |= 1 << bit
+
+    def _issue(self, issue_type, **details):
+        issue = {'type': issue_type, **details}
+        if self._issue_writer:
+            self._issue_writer(issue)
+        if len(self._summary['issues']) < self.max_issues:
+            self._summary['issues'].append(issue)
+
+
+def main():
+    """Ejecuta la conciliación desde la línea de comandos
+
+    Uso:
+        python -m backend.services.reconciliation_service settlement.csv --format csv \\
+            --from 2025-01-01 --to 2025-01-31 --output issues.jsonl
+    """
+    import argparse
+    from datetime import datetime, timedelta
+
+    parser = argparse.ArgumentParser(description='Reconcile a gateway settlement file against payments')
+    parser.add_argument('file')
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+    parser.add_argument('--from', dest='start_date')
+    parser.add_argument('--to', dest='end_date')
+    parser.add_argument('--output', help='write every issue to this JSONL file')
+    args = parser.parse_args()
+
+    start_date = datetime.strptime(args.start_date, '%Y-%m-%d') if args.start_date else None
+    end_date = datetime.strptime(args.end_date, '%Y-%m-%d') + timedelta(days=1) if args.end_date else None
+
+    output = open(args.output, 'w', encoding='utf-8') if args.output else None
+    writer = (lambda issue: output.write(json.dumps(issue) + '\n')) if output else None
+    try:
+        with io.open(args.file, 'r', encoding='utf-8', newline='') as stream:
+            summary = ReconciliationService().reconcile(stream, args.format, start_date, end_date, writer)
+    finally:
+        if output:
+            output.close()
+        db_session.remove()
+
+    summary.pop('issues')
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
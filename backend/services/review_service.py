@@ -3,38 +3,49 @@ from sqlalchemy import desc, func
 
 from ..models.review import Review
 from ..database.db_config import db_session
+from ..utils.pagination import paginate
+from ..utils.cache import cached, invalidates
+from ..config import ITEMS_PER_PAGE, STATS_CACHE_TIMEOUT, STATS_CACHE_MAX_AGE
 
 class ReviewService:
     """Servicio para gestionar operaciones relacionadas con reseñas"""
 
-    def get_all_reviews(self):
-        """Obtiene todas las reseñas"""
+    def get_all_reviews(self, cursor=None, limit=ITEMS_PER_PAGE, columns=None, profile=None):
+        """Obtiene una página de reseñas (más recientes primero)"""
         try:
-            return Review.query.order_by(desc(Review.date)).all()
+            return paginate(Review.with_profile(Review.query, profile), Review, 'date', cursor, limit, columns)
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener reseñas: {str(e)}")
 
-    def get_review_by_id(self, review_id):
+    def get_review_by_id(self, review_id, profile=None):
         """Obtiene una reseña por su ID"""
         try:
-            return Review.query.filter_by(id=review_id).first()
+            # Sin consulta si ya está cargada en la sesión (identity map)
+            return Review.get(review_id, profile)
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener reseña: {str(e)}")
 
-    def get_package_reviews(self, package_id):
+    def get_reviews_by_ids(self, ids, profile=None):
+        """Obtiene varias reseñas por ID ({id: reseña}) con una sola consulta para las que faltan en la sesión"""
+        try:
+            return Review.get_many(ids, profile)
+        except SQLAlchemyError as e:
+            raise Exception(f"Error al obtener reseñas: {str(e)}")
+
+    def get_package_reviews(self, package_id, profile=None):
         """Obtiene todas las reseñas de un paquete específico"""
         try:
-            return Review.query.filter_by(
+            return Review.with_profile(Review.query, profile).filter_by(
                 package_id=package_id,
                 is_approved=1  # Solo reseñas aprobadas
             ).order_by(desc(Review.date)).all()
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener reseñas del paquete: {str(e)}")
 
-    def get_user_reviews(self, user_id):
+    def get_user_reviews(self, user_id, profile=None):
         """Obtiene todas las reseñas de un usuario específico"""
         try:
-            return Review.query.filter_by(user_id=user_id).order_by(desc(Review.date)).all()
+            return Review.with_profile(Review.query, profile).filter_by(user_id=user_id).order_by(desc(Review.date)).all()
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener reseñas del usuario: {str(e)}")
 
@@ -48,6 +59,7 @@ class ReviewService:
         except SQLAlchemyError as e:
             raise Exception(f"Error al verificar reseña existente: {str(e)}")
 
+    @invalidates('reviews')
     def create_review(self, review):
         """Crea una nueva reseña"""
         try:
@@ -58,6 +70,7 @@ class ReviewService:
             db_session.rollback()
             raise Exception(f"Error al crear reseña: {str(e)}")
 
+    @invalidates('reviews')
     def update_review(self, review):
         """Actualiza una reseña existente"""
         try:
@@ -67,6 +80,7 @@ class ReviewService:
             db_session.rollback()
             raise Exception(f"Error al actualizar reseña: {str(e)}")
 
+    @invalidates('reviews')
     def delete_review(self, review_id):
         """Elimina una reseña"""
         try:
@@ -80,6 +94,7 @@ class ReviewService:
             db_session.rollback()
             raise Exception(f"Error al eliminar reseña: {str(e)}")
 
+    @invalidates('reviews')
     def approve_review(self, review_id):
         """Aprueba una reseña pendiente"""
         try:
@@ -93,6 +108,7 @@ class ReviewService:
             db_session.rollback()
             raise Exception(f"Error al aprobar reseña: {str(e)}")
 
+    @invalidates('reviews')
     def reject_review(self, review_id):
         """Rechaza una reseña pendiente"""
         try:
@@ -106,13 +122,15 @@ class ReviewService:
             db_session.rollback()
             raise Exception(f"Error al rechazar reseña: {str(e)}")
 
-    def get_pending_reviews(self):
-        """Obtiene todas las reseñas pendientes de aprobación"""
+    def get_pending_reviews(self, cursor=None, limit=ITEMS_PER_PAGE, columns=None, profile=None):
+        """Obtiene una página de reseñas pendientes de aprobación"""
         try:
-            return Review.query.filter_by(is_approved=0).order_by(desc(Review.date)).all()
+            return paginate(Review.with_profile(Review.query, profile).filter_by(is_approved=0), Review, 'date', cursor, limit, columns)
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener reseñas pendientes: {str(e)}")
 
+    # Sin la etiqueta 'reviews': las reseñas nuevas invalidan los paquetes mejor valorados, no estas estadísticas
+    @cached(timeout=STATS_CACHE_MAX_AGE, stale_after=STATS_CACHE_TIMEOUT)
     def get_review_stats(self):
         """Obtiene estadísticas sobre las reseñas"""
         try:
@@ -141,17 +159,17 @@ class ReviewService:
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener estadísticas de reseñas: {str(e)}")
 
-    def get_recent_reviews(self, limit=5):
+    def get_recent_reviews(self, limit=5, profile=None):
         """Obtiene las reseñas más recientes (aprobadas)"""
         try:
-            return Review.query.filter_by(is_approved=1).order_by(desc(Review.date)).limit(limit).all()
+            return Review.with_profile(Review.query, profile).filter_by(is_approved=1).order_by(desc(Review.date)).limit(limit).all()
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener reseñas recientes: {str(e)}")
 
-    def get_top_rated_reviews(self, limit=5):
+    def get_top_rated_reviews(self, limit=5, profile=None):
         """Obtiene las reseñas con mejor calificación"""
         try:
-            return Review.query.filter_by(
+            return Review.with_profile(Review.query, profile).filter_by(
                 is_approved=1
             ).order_by(
                 desc(Review.rating), 
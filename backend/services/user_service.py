@@ -1,9 +1,18 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import func, cast, Date
 from werkzeug.security import generate_password_hash
 
 from ..models.user import User
+from ..models.booking import Booking
+from ..models.payment import Payment
 from ..database.db_config import db_session
+from ..services.purge_service import PurgeService
+from ..utils.write_behind import write_behind
+from ..utils.cache import cached, invalidates, invalidate_tags
+from ..config import STATS_CACHE_TIMEOUT, STATS_CACHE_MAX_AGE, PURGE_BACKGROUND_THRESHOLD
+
+purge_service = PurgeService()
 
 class UserService:
     """Servicio para gestionar operaciones relacionadas con usuarios"""
@@ -19,10 +28,18 @@ class UserService:
     def get_user_by_id(self, user_id):
         """Obtiene un usuario por su ID"""
         try:
-            return User.query.filter_by(id=user_id).first()
+            # Sin consulta si ya está cargado en la sesión (identity map)
+            return User.get(user_id)
         except SQLAlchemyError as e:
             raise Exception(f"Error al obtener usuario: {str(e)}")
 
+    def get_users_by_ids(self, ids):
+        """Obtiene varios usuarios por ID ({id: usuario}) con una sola consulta para los que faltan en la sesión"""
+        try:
+            return User.get_many(ids)
+        except SQLAlchemyError as e:
+            raise Exception(f"Error al obtener usuarios: {str(e)}")
+
     def get_user_by_email(self, email):
         """Obtiene un usuario por su correo electrónico"""
         try:
@@ -35,6 +52,7 @@ class UserService:
         try:
             db_session.add(user)
             db_session.commit()
+            self._invalidate_stats()
             return user.id
         except SQLAlchemyError as e:
             db_session.rollback()
@@ -44,20 +62,37 @@ class UserService:
         """Actualiza la información de un usuario existente"""
         try:
             db_session.commit()
+            # El rol o el estado pueden haber cambiado desde el controlador
+            self._invalidate_stats()
             return True
         except SQLAlchemyError as e:
             db_session.rollback()
             raise Exception(f"Error al actualizar usuario: {str(e)}")
 
+    @invalidates('reviews', 'news')  # se borran en cascada con el usuario
     def delete_user(self, user_id):
         """Elimina un usuario del sistema"""
         try:
             user = self.get_user_by_id(user_id)
-            if user:
-                db_session.delete(user)
+            if not user:
+                return False
+            
+            # Usuarios con muchas reservas: se desactivan y se purgan por lotes en segundo plano
+            bookings_count = Booking.query.filter_by(user_id=user_id).count()
+            if bookings_count >= PURGE_BACKGROUND_THRESHOLD:
+                user.is_active = False
                 db_session.commit()
+                self._invalidate_stats()
+                purge_service.start_background_purge(purge_service.purge_user, user.id)
                 return True
-            return False
+            
+            # Los pagos hechos por el usuario no tienen ON DELETE CASCADE (ver models/payment.py)
+            Payment.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+            # Reservas, reseñas y noticias se eliminan con ON DELETE CASCADE (passive_deletes)
+            db_session.delete(user)
+            db_session.commit()
+            self._invalidate_stats()
+            return True
         except SQLAlchemyError as e:
             db_session.rollback()
             raise Exception(f"Error al eliminar usuario: {str(e)}")
@@ -76,17 +111,11 @@ class UserService:
             raise Exception(f"Error al actualizar contraseña: {str(e)}")
 
     def update_last_login(self, user_id):
-        """Actualiza la fecha del último inicio de sesión"""
-        try:
-            user = self.get_user_by_id(user_id)
-            if user:
-                user.last_login = datetime.utcnow()
-                db_session.commit()
-                return True
-            return False
-        except SQLAlchemyError as e:
-            db_session.rollback()
-            raise Exception(f"Error al actualizar último inicio de sesión: {str(e)}")
+        """Registra la fecha del último inicio de sesión (escritura diferida)"""
+        # No se carga ni se hace commit aquí: el buffer agrupa los accesos por usuario
+        # y los vuelca periódicamente en un único UPDATE
+        write_behind.touch(User, 'last_login', int(user_id), datetime.utcnow())
+        return True
 
     def get_vip_users(self):
         """Obtiene todos los usuarios VIP"""
@@ -109,6 +138,7 @@ class UserService:
             if user:
                 user.is_active = False
                 db_session.commit()
+                self._invalidate_stats()
                 return True
             return False
         except SQLAlchemyError as e:
@@ -122,6 +152,7 @@ class UserService:
             if user:
                 user.is_active = True
                 db_session.commit()
+                self._invalidate_stats()
                 return True
             return False
         except SQLAlchemyError as e:
@@ -135,24 +166,75 @@ class UserService:
             if user and new_role in ['admin', 'client', 'vip']:
                 user.role = new_role
                 db_session.commit()
+                self._invalidate_stats()
                 return True
             return False
         except SQLAlchemyError as e:
             db_session.rollback()
             raise Exception(f"Error al cambiar rol de usuario: {str(e)}")
 
+    @cached(tags=('users',), timeout=STATS_CACHE_MAX_AGE, stale_after=STATS_CACHE_TIMEOUT)
     def count_users_by_role(self):
-        """Cuenta usuarios por rol (para estadísticas)"""
+        """Cuenta usuarios por rol y estado (para estadísticas)"""
         try:
-            admin_count = User.query.filter_by(role='admin').count()
-            client_count = User.query.filter_by(role='client').count()
-            vip_count = User.query.filter_by(role='vip').count()
+            # Una sola consulta agrupada por rol y estado
+            rows = db_session.query(
+                User.role,
+                User.is_active,
+                func.count(User.id).label('count')
+            ).group_by(User.role, User.is_active).all()
             
-            return {
-                'admin': admin_count,
-                'client': client_count,
-                'vip': vip_count,
-                'total': admin_count + client_count + vip_count
+            stats = {
+                'admin': 0,
+                'client': 0,
+                'vip': 0,
+                'total': 0,
+                'active': 0,
+                'inactive': 0,
+                'by_role': {role: {'active': 0, 'inactive': 0} for role in ['admin', 'client', 'vip']}
             }
+            
+            for row in rows:
+                state = 'active' if row.is_active else 'inactive'
+                stats['total'] += row.count
+                stats[state] += row.count
+                if row.role in stats['by_role']:
+                    stats[row.role] += row.count
+                    stats['by_role'][row.role][state] += row.count
+            
+            return stats
         except SQLAlchemyError as e:
-            raise Exception(f"Error al contar usuarios por rol: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error al contar usuarios por rol: {str(e)}")
+
+    @cached(tags=('users',), timeout=STATS_CACHE_MAX_AGE, stale_after=STATS_CACHE_TIMEOUT)
+    def count_new_users_by_day(self, start_date, end_date):
+        """Cuenta los usuarios registrados por día en un rango de fechas (inclusive)"""
+        try:
+            day = cast(User.created_at, Date)
+            rows = db_session.query(
+                day.label('day'),
+                func.count(User.id).label('count')
+            ).filter(
+                User.created_at >= datetime.combine(start_date, datetime.min.time()),
+                User.created_at < datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+            ).group_by(day).all()
+            
+            counts = {str(row.day): row.count for row in rows}
+            
+            # Incluir los días sin registros para obtener una serie continua
+            result = []
+            current_date = start_date
+            while current_date <= end_date:
+                result.append({
+                    'date': current_date.isoformat(),
+                    'count': counts.get(current_date.isoformat(), 0)
+                })
+                current_date += timedelta(days=1)
+            
+            return result
+        except SQLAlchemyError as e:
+            raise Exception(f"Error al contar nuevos usuarios por día: {str(e)}")
+
+    def _invalidate_stats(self):
+        """Descarta las estadísticas de usuarios en caché"""
+        invalidate_tags('users')
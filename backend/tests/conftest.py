@@ -0,0 +1,114 @@
+"""Configuración común de las pruebas
+
+Se ejecutan desde la raíz del repositorio con `python -m pytest backend/tests`.
+Por defecto usan SQLite en memoria; TEST_DATABASE_URL apunta a otra base de
+datos (por ejemplo un SQL Server de pruebas) para las pruebas que lo requieren.
+"""
+import os
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import StaticPool
+
+from backend.database.db_config import Base, db_session
+from backend.utils.cache import get_cache
+# Todos los modelos: las relaciones se resuelven por nombre al configurar los mappers
+from backend.models.change_version import ChangeVersion  # noqa: F401
+from backend.models.idempotency_key import IdempotencyKey  # noqa: F401
+from backend.models.user import User
+from backend.models.package import Package
+from backend.models.booking import Booking
+from backend.models.payment import Payment  # noqa: F401
+from backend.models.review import Review  # noqa: F401
+from backend.models.news import News  # noqa: F401
+
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL', 'sqlite://')
+
+
+@pytest.fixture(scope='session')
+def engine():
+    if TEST_DATABASE_URL.startswith('sqlite'):
+        # Una única conexión compartida para que la base en memoria sobreviva entre sesiones
+        engine = create_engine(TEST_DATABASE_URL, connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    else:
+        engine = create_engine(TEST_DATABASE_URL)
+    Base.metadata.create_all(engine)
+    yield engine
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def mssql_only(engine):
+    """Omite la prueba si la base de pruebas no es SQL Server"""
+    if engine.dialect.name != 'mssql':
+        pytest.skip('Requires TEST_DATABASE_URL pointing to SQL Server')
+
+
+@pytest.fixture
+def session(engine):
+    """Sesión de la aplicación ligada a la base de pruebas, con la caché vacía; las tablas se vacían al terminar"""
+    db_session.remove()
+    db_session.configure(bind=engine)
+    get_cache().clear()
+    yield db_session
+    db_session.remove()
+    with engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+
+
+class StatementCounter:
+    """Cuenta las sentencias SQL que se envían a la base de datos"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@pytest.fixture
+def count_statements(engine):
+    return lambda: StatementCounter(engine)
+
+
+@pytest.fixture
+def make_booking(session):
+    """Crea una reserva (y su usuario y paquete si no se indican); retorna la reserva"""
+    counter = {'n': 0}
+
+    def factory(user=None, package=None, price=100.0, travelers=1, status='pending'):
+        counter['n'] += 1
+        n = counter['n']
+        if user is None:
+            user = User(f'Usuario {n}', f'user{n}@example.com', 'secret')
+            session.add(user)
+        if package is None:
+            package = Package(f'Destino {n}', 'Descripción', price, 5)
+            session.add(package)
+        session.flush()
+
+        booking = Booking(user.id, package.id, date.today() + timedelta(days=30), status=status,
+                          number_of_travelers=travelers)
+        # El número generado se basa en el segundo actual y se repetiría dentro de una misma prueba
+        booking.booking_number = f'BKTEST{n:06d}'
+        booking.calculate_total_price(package.price)
+        session.add(booking)
+        session.commit()
+        return booking
+
+    return factory
@@ -0,0 +1,63 @@
+import threading
+
+from sqlalchemy.dialects import mssql, postgresql
+
+from backend.database.db_config import db_session
+from backend.models.booking import Booking
+from backend.services.payment_service import PaymentService, _for_update
+
+PARALLEL_PAYMENTS = 8
+
+
+def _compile(query, dialect):
+    return str(query.statement.compile(dialect=dialect))
+
+
+def test_lock_uses_updlock_hint_on_sql_server(session):
+    sql = _compile(_for_update(Booking.query.filter_by(id=1), Booking), mssql.dialect())
+    assert 'bookings WITH (UPDLOCK, ROWLOCK)' in sql
+
+
+def test_lock_uses_for_update_on_other_engines(session):
+    sql = _compile(_for_update(Booking.query.filter_by(id=1), Booking), postgresql.dialect())
+    assert 'FOR UPDATE' in sql
+    assert 'UPDLOCK' not in sql
+
+
+def _run_parallel(target, count):
+    barrier = threading.Barrier(count)
+    errors = []
+
+    def worker(i):
+        try:
+            barrier.wait()
+            target(i)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            db_session.remove()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def test_parallel_payments_confirm_booking(mssql_only, session, make_booking):
+    booking = make_booking(price=800.0)
+    booking_id, user_id = booking.id, booking.user_id
+    share = booking.total_price / PARALLEL_PAYMENTS
+    session.remove()
+
+    # Sin bloqueo cada pago suma solo lo que ve confirmado y ninguno llega al total
+    errors = _run_parallel(
+        lambda i: PaymentService().process_payment(booking_id, user_id, share, 'credit_card', card_last_digits='4242'),
+        PARALLEL_PAYMENTS
+    )
+    assert errors == []
+
+    booking = db_session.get(Booking, booking_id)
+    assert len(booking.payments) == PARALLEL_PAYMENTS
+    assert booking.status == 'confirmed'
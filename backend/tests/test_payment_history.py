@@ -0,0 +1,53 @@
+from backend.models.payment import Payment
+from backend.services.payment_service import PaymentService
+
+
+def _add_payments(session, make_booking, count):
+    first = make_booking()
+    user = first.user
+    for i in range(count):
+        booking = first if i == 0 else make_booking(user=user)
+        session.add(Payment(booking.id, user.id, booking.total_price, 'credit_card',
+                            transaction_id=f'TX{i}', status='completed'))
+    session.commit()
+    user_id = user.id
+    # Sin objetos en la sesión: cada prueba parte del identity map vacío
+    session.remove()
+    return user_id
+
+
+def _history_statements(count_statements, user_id):
+    with count_statements() as counter:
+        payments = PaymentService().get_user_payments(user_id, profile='detail')
+        rows = [(p.booking.booking_number, p.booking.package.destination, p.user.name) for p in payments]
+    return counter.count, rows
+
+
+def test_user_payment_history_uses_constant_queries(session, make_booking, count_statements):
+    user_id = _add_payments(session, make_booking, 1)
+    single, rows = _history_statements(count_statements, user_id)
+    assert len(rows) == 1
+
+    session.remove()
+    user_id = _add_payments(session, make_booking, 25)
+    many, rows = _history_statements(count_statements, user_id)
+    assert len(rows) == 25
+
+    assert single == 1
+    assert many == single
+
+
+def test_payment_detail_loads_relations_in_one_query(session, make_booking, count_statements):
+    booking = make_booking()
+    payment = Payment(booking.id, booking.user_id, booking.total_price, 'credit_card', status='completed')
+    session.add(payment)
+    session.commit()
+    payment_id = payment.id
+    session.remove()
+
+    with count_statements() as counter:
+        payment = PaymentService().get_payment_by_id(payment_id, profile='detail')
+        assert payment.booking.package.destination
+        assert payment.user.name
+
+    assert counter.count == 1
@@ -0,0 +1,104 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from backend.database.db_config import db_session
+from backend.models.booking import Booking
+from backend.models.payment import Payment
+from backend.services import payment_service as payment_module
+from backend.services.payment_service import PaymentService, PaymentProcessingError
+from backend.utils.payment_gateway import PaymentGateway, GatewayDeclinedError
+
+
+class RecordingGateway(PaymentGateway):
+    """Pasarela de prueba que registra las llamadas"""
+
+    def __init__(self, decline=False):
+        self.decline = decline
+        self.charges = []
+        self.refunds = []
+
+    def charge(self, amount, currency=None, card_last_digits=None, reference=None):
+        self.charges.append(reference)
+        if self.decline:
+            raise GatewayDeclinedError('Card declined')
+        return f'tx-{reference}'
+
+    def refund(self, transaction_id, amount, reference=None):
+        self.refunds.append((transaction_id, reference))
+        return f'rf-{reference}'
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    gateway = RecordingGateway()
+    monkeypatch.setattr(payment_module, 'get_payment_gateway', lambda: gateway)
+    return gateway
+
+
+def _statuses(booking_id):
+    db_session.remove()
+    return [payment.status for payment in Payment.query.filter_by(booking_id=booking_id).all()]
+
+
+def test_charge_uses_reference_of_pending_payment(session, make_booking, gateway):
+    booking = make_booking(price=100.0)
+
+    result = PaymentService().process_payment(booking.id, booking.user_id, 100.0, 'credit_card')
+
+    assert gateway.charges == [f"payment-{result['payment_id']}"]
+    assert result['status'] == 'completed'
+    assert result['booking_status'] == 'confirmed'
+    assert _statuses(booking.id) == ['completed']
+
+
+def test_declined_charge_marks_payment_failed(session, make_booking, gateway):
+    booking = make_booking()
+    booking_id = booking.id
+    gateway.decline = True
+
+    with pytest.raises(GatewayDeclinedError):
+        PaymentService().process_payment(booking_id, booking.user_id, 50.0, 'credit_card')
+
+    assert _statuses(booking_id) == ['failed']
+
+
+def test_database_error_after_charge_voids_it(session, make_booking, gateway, monkeypatch):
+    booking = make_booking()
+    booking_id = booking.id
+
+    def broken_lock(self, booking_id):
+        raise OperationalError('SELECT', {}, Exception('connection lost'))
+
+    monkeypatch.setattr(PaymentService, '_lock_booking', broken_lock)
+
+    with pytest.raises(PaymentProcessingError) as error:
+        PaymentService().process_payment(booking_id, booking.user_id, 50.0, 'credit_card')
+
+    assert error.value.charged
+    reference = gateway.charges[0]
+    assert gateway.refunds == [(f'tx-{reference}', reference.replace('payment-', 'void-'))]
+    assert _statuses(booking_id) == ['failed']
+
+
+def test_refund_reverts_confirmed_booking(session, make_booking, gateway):
+    booking = make_booking(price=100.0)
+    booking_id = booking.id
+    result = PaymentService().process_payment(booking_id, booking.user_id, 100.0, 'credit_card')
+
+    assert PaymentService().refund_payment(result['payment_id'])
+
+    db_session.remove()
+    assert db_session.get(Booking, booking_id).status == 'pending'
+    assert _statuses(booking_id) == ['refunded']
+
+
+def test_batch_refund_reverts_confirmed_booking(session, make_booking, gateway):
+    booking = make_booking(price=100.0)
+    booking_id = booking.id
+    result = PaymentService().process_payment(booking_id, booking.user_id, 100.0, 'credit_card')
+
+    results = PaymentService().refund_payments(payment_ids=[result['payment_id']])
+
+    assert [item['status'] for item in results] == ['refunded']
+    db_session.remove()
+    assert db_session.get(Booking, booking_id).status == 'pending'
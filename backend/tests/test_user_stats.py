@@ -0,0 +1,18 @@
+from backend.models.user import User
+from backend.services.user_service import UserService
+
+
+def test_role_counts_refresh_after_user_writes(session):
+    service = UserService()
+    user_id = service.create_user(User('Ana', 'ana@example.com', 'secret'))
+    assert service.count_users_by_role()['client'] == 1
+
+    assert service.change_user_role(user_id, 'vip')
+    stats = service.count_users_by_role()
+    assert (stats['client'], stats['vip']) == (0, 1)
+
+    assert service.deactivate_user(user_id)
+    assert service.count_users_by_role()['inactive'] == 1
+
+    assert service.delete_user(user_id)
+    assert service.count_users_by_role()['total'] == 0
@@ -0,0 +1,608 @@
+import hashlib
+import inspect
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import g, has_request_context
+
+from .singleflight import SingleFlight
+from ..database.db_config import db_session
+from ..config import (
+    CACHE_TYPE, CACHE_DEFAULT_TIMEOUT, CACHE_THRESHOLD, CACHE_DIR, CACHE_REDIS_URL, CACHE_LOCAL_TIMEOUT,
+    SINGLEFLIGHT_CROSS_PROCESS, SINGLEFLIGHT_LOCK_TIMEOUT, SINGLEFLIGHT_WAIT_TIMEOUT, SINGLEFLIGHT_POLL_INTERVAL
+)
+
+logger = logging.getLogger(__name__)
+
+class BaseCache:
+    """Interfaz común de los backends de caché de servicios
+
+    Además de get/set, cada backend guarda una versión por etiqueta: las
+    claves incluyen la versión de sus etiquetas, así que invalidar una
+    etiqueta es solo incrementar su versión (las entradas viejas dejan de
+    ser accesibles y terminan desalojadas o expiradas).
+    """
+
+    backend = 'base'
+    shared = False  # si los demás procesos ven las mismas entradas
+
+    def __init__(self, default_timeout=CACHE_DEFAULT_TIMEOUT):
+        self.default_timeout = default_timeout
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+
+    def _count(self, hits=0, misses=0, evictions=0, coalesced=0):
+        with self._stats_lock:
+            self.hits += hits
+            self.misses += misses
+            self.evictions += evictions
+            self.coalesced += coalesced
+
+    def lookup(self, key):
+        """Busca una clave sin contar estadísticas; retorna (encontrada, valor)"""
+        raise NotImplementedError
+
+    def exists(self, key):
+        """Indica si la clave existe, sin contar estadísticas ni copiar su valor"""
+        return self.lookup(key)[0]
+
+    def get(self, key):
+        """Retorna el valor de una clave o None si no está (cuenta acierto/fallo)"""
+        found, value = self.lookup(key)
+        self._count(hits=int(found), misses=int(not found))
+        return value
+
+    def set(self, key, value, timeout=None):
+        """Guarda un valor; timeout 0 significa sin expiración"""
+        raise NotImplementedError
+
+    def add(self, key, value, timeout=None):
+        """Guarda un valor solo si la clave no existe; retorna True si lo guardó"""
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def tag_versions(self, tags):
+        """Retorna la versión actual de cada etiqueta, o None si no se pueden leer"""
+        raise NotImplementedError
+
+    def invalidate_tags(self, *tags):
+        """Invalida todas las entradas que dependen de alguna de las etiquetas"""
+        raise NotImplementedError
+
+    def _expires_at(self, timeout):
+        timeout = self.default_timeout if timeout is None else timeout
+        return time.time() + timeout if timeout else 0
+
+    def stats(self):
+        """Retorna los contadores de aciertos, fallos y desalojos"""
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': self.backend,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'coalesced': self.coalesced,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else 0
+            }
+
+
+class NullCache(BaseCache):
+    """Caché desactivada: todas las búsquedas son fallos"""
+
+    backend = 'null'
+
+    def lookup(self, key):
+        return False, None
+
+    def set(self, key, value, timeout=None):
+        pass
+
+    def add(self, key, value, timeout=None):
+        return True
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+    def tag_versions(self, tags):
+        return [0] * len(tags)
+
+    def invalidate_tags(self, *tags):
+        pass
+
+
+class LRUCache(BaseCache):
+    """Caché en memoria del proceso con expiración y desalojo LRU al superar max_entries"""
+
+    backend = 'simple'
+
+    def __init__(self, max_entries=CACHE_THRESHOLD, default_timeout=CACHE_DEFAULT_TIMEOUT):
+        super().__init__(default_timeout)
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # clave -> (valor, expira), de menos a más reciente
+        self._tags = {}
+        self._lock = threading.RLock()
+
+    def lookup(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            value, expires_at = entry
+            if expires_at and expires_at <= time.time():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, timeout=None):
+        evicted = 0
+        with self._lock:
+            self._data[key] = (value, self._expires_at(timeout))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                evicted += 1
+        if evicted:
+            self._count(evictions=evicted)
+
+    def add(self, key, value, timeout=None):
+        with self._lock:
+            found, _ = self.lookup(key)
+            if not found:
+                self.set(key, value, timeout)
+            return not found
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def tag_versions(self, tags):
+        with self._lock:
+            return [self._tags.get(tag, 0) for tag in tags]
+
+    def invalidate_tags(self, *tags):
+        with self._lock:
+            for tag in tags:
+                self._tags[tag] = self._tags.get(tag, 0) + 1
+
+
+class FileSystemCache(BaseCache):
+    """Caché en disco compartida por los procesos de una misma máquina
+
+    Cada entrada es un archivo con (expira, valor) serializado con pickle; se
+    escribe en un temporal y se renombra para que ningún proceso lea un
+    archivo a medio escribir. Al superar el umbral se borran primero las
+    entradas expiradas y después las más antiguas.
+    """
+
+    backend = 'filesystem'
+    shared = True
+
+    def __init__(self, directory=CACHE_DIR, threshold=CACHE_THRESHOLD, default_timeout=CACHE_DEFAULT_TIMEOUT):
+        super().__init__(default_timeout)
+        self.directory = directory
+        self.threshold = threshold
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key, suffix='.cache'):
+        return os.path.join(self.directory, hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest() + suffix)
+
+    def _read(self, path):
+        try:
+            with open(path, 'rb') as f:
+                expires_at, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return False, None
+        if expires_at and expires_at <= time.time():
+            self._remove(path)
+            return False, None
+        return True, value
+
+    def _write(self, path, value, expires_at):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((expires_at, value), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError:
+            self._remove(tmp_path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _prune(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.cache'):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    pass  # otro proceso la borró entre medias
+        if len(entries) < self.threshold:
+            return
+
+        # Las expiradas se borran al leerlas; del resto se desalojan las más antiguas
+        # hasta quedar en el 80% del umbral, para no repetir la limpieza en cada escritura
+        remaining = sorted((mtime, path) for mtime, path in entries if self._read(path)[0])
+        excess = len(remaining) - self.threshold * 4 // 5
+        if excess > 0:
+            for _, path in remaining[:excess]:
+                self._remove(path)
+            self._count(evictions=excess)
+
+    def lookup(self, key):
+        return self._read(self._path(key))
+
+    def set(self, key, value, timeout=None):
+        self._prune()
+        self._write(self._path(key), value, self._expires_at(timeout))
+
+    def add(self, key, value, timeout=None):
+        path = self._path(key)
+        self._read(path)  # borra la entrada si ya expiró
+        try:
+            # O_EXCL: solo un proceso puede crear el archivo
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((self._expires_at(timeout), value), f, pickle.HIGHEST_PROTOCOL)
+        return True
+
+    def delete(self, key):
+        self._remove(self._path(key))
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.cache'):
+                self._remove(entry.path)
+
+    def tag_versions(self, tags):
+        return [self._read(self._path(f'tag:{tag}', '.tag'))[1] or 0 for tag in tags]
+
+    def invalidate_tags(self, *tags):
+        # Una marca de tiempo en nanosegundos como versión: no hace falta leer y sumar entre procesos
+        version = time.time_ns()
+        for tag in tags:
+            self._write(self._path(f'tag:{tag}', '.tag'), version, 0)
+
+
+class SharedCache(BaseCache):
+    """Caché compartida entre procesos y máquinas en Redis, con una copia local delante
+
+    Las versiones de las etiquetas se leen siempre de Redis (un MGET), así que
+    una invalidación se ve al momento en todos los procesos; los valores se
+    guardan además unos segundos en un LRU local para no transferirlos y
+    deserializarlos en cada acierto. Si Redis no responde, la búsqueda se trata
+    como un fallo y el método se ejecuta contra la base de datos.
+    """
+
+    backend = 'redis'
+    shared = True
+
+    def __init__(self, url=CACHE_REDIS_URL, default_timeout=CACHE_DEFAULT_TIMEOUT, local=None, prefix='cache:'):
+        super().__init__(default_timeout)
+        import redis  # dependencia opcional
+        self._errors = redis.RedisError
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+        self.local = local if local is not None else LRUCache(default_timeout=CACHE_LOCAL_TIMEOUT)
+
+    def lookup(self, key):
+        found, value = self.local.lookup(key)
+        if found:
+            return found, value
+        try:
+            raw = self._client.get(self._prefix + key)
+        except self._errors:
+            raw = None
+        if raw is None:
+            return False, None
+        value = pickle.loads(raw)
+        self.local.set(key, value)
+        return True, value
+
+    def exists(self, key):
+        # Directamente en Redis: los bloqueos no deben quedar copiados en el LRU local
+        try:
+            return bool(self._client.exists(self._prefix + key))
+        except self._errors:
+            return False
+
+    def set(self, key, value, timeout=None):
+        timeout = self.default_timeout if timeout is None else timeout
+        try:
+            self._client.set(self._prefix + key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ex=timeout or None)
+        except self._errors:
+            return
+        self.local.set(key, value)
+
+    def add(self, key, value, timeout=None):
+        timeout = self.default_timeout if timeout is None else timeout
+        try:
+            return bool(self._client.set(
+                self._prefix + key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ex=timeout or None, nx=True
+            ))
+        except self._errors:
+            return False
+
+    def delete(self, key):
+        self.local.delete(key)
+        try:
+            self._client.delete(self._prefix + key)
+        except self._errors:
+            pass
+
+    def clear(self):
+        self.local.clear()
+        try:
+            keys = list(self._client.scan_iter(match=self._prefix + '*'))
+            if keys:
+                self._client.delete(*keys)
+        except self._errors:
+            pass
+
+    def tag_versions(self, tags):
+        if not tags:
+            return []
+        try:
+            values = self._client.mget([f'{self._prefix}tag:{tag}' for tag in tags])
+        except self._errors:
+            return None
+        return [int(value or 0) for value in values]
+
+    def invalidate_tags(self, *tags):
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for tag in tags:
+                pipe.incr(f'{self._prefix}tag:{tag}')
+            pipe.execute()
+        except self._errors as e:
+            logger.error(f"Error invalidating cache tags {tags}: {str(e)}")
+
+    def stats(self):
+        stats = super().stats()
+        # Los desalojos del LRU local; los de Redis los decide el servidor (maxmemory-policy)
+        stats['evictions'] = self.local.evictions
+        try:
+            stats['shared_evictions'] = self._client.info('stats').get('evicted_keys', 0)
+        except self._errors:
+            pass
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def create_cache(cache_type=CACHE_TYPE):
+    """Crea el backend indicado por CACHE_TYPE"""
+    if cache_type in ('simple', 'lru'):
+        return LRUCache()
+    if cache_type == 'filesystem':
+        return FileSystemCache()
+    if cache_type == 'redis':
+        try:
+            return SharedCache()
+        except ImportError:
+            # Sin el paquete redis (p. ej. en desarrollo) se usa el LRU del proceso en su lugar
+            logger.warning("CACHE_TYPE is 'redis' but the redis package is not installed; using the in-process cache")
+            return LRUCache()
+    if cache_type == 'null':
+        return NullCache()
+    raise ValueError(f"Unknown CACHE_TYPE '{cache_type}'")
+
+
+def get_cache():
+    """Retorna la caché de servicios del proceso (creada la primera vez según CACHE_TYPE)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = create_cache()
+    return _cache
+
+
+def make_key(name, params, versions):
+    """Clave de caché: nombre legible y hash de los argumentos y las versiones de las etiquetas"""
+    digest = hashlib.blake2b(repr((params, versions)).encode('utf-8'), digest_size=16).hexdigest()
+    return f'{name}:{digest}'
+
+
+_flights = SingleFlight()
+
+def _wait_for(cache, key, lock_key):
+    """Espera a que otro proceso guarde la clave; retorna su entrada, o None si se agota el tiempo o suelta el bloqueo sin guardarla"""
+    deadline = time.monotonic() + SINGLEFLIGHT_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(SINGLEFLIGHT_POLL_INTERVAL)
+        found, entry = cache.lookup(key)
+        if found:
+            return entry
+        if not cache.exists(lock_key):
+            return None
+    return None
+
+
+def _compute(cache, key, f, args, kwargs, model, timeout):
+    """Ejecuta el método y guarda el resultado
+
+    Con SINGLEFLIGHT_CROSS_PROCESS y un backend compartido, un bloqueo en la
+    propia caché hace que solo un proceso calcule la clave: los demás esperan
+    a que aparezca el valor (y lo calculan ellos si no llega a tiempo).
+
+    Returns:
+        tuple: (resultado, entrada guardada (calculado_en, valor) o None)
+    """
+    lock_key = f'lock:{key}'
+    locked = False
+    if SINGLEFLIGHT_CROSS_PROCESS and cache.shared:
+        locked = cache.add(lock_key, True, SINGLEFLIGHT_LOCK_TIMEOUT)
+        if not locked:
+            entry = _wait_for(cache, key, lock_key)
+            if entry is not None:
+                cache._count(coalesced=1)
+                return None, entry
+
+    try:
+        result = f(*args, **kwargs)
+        entry = None
+        if result is not None:
+            # Se guarda con la hora del cálculo (reloj de pared: la comparten todos los procesos)
+            entry = (time.time(), [obj.id for obj in result] if model is not None else result)
+            cache.set(key, entry, timeout)
+        return result, entry
+    finally:
+        if locked:
+            cache.delete(lock_key)
+
+
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+def _refresh_in_background(cache, key, f, args, kwargs, model, timeout):
+    """Recalcula una entrada vencida en un hilo aparte (una sola vez por clave en el proceso)"""
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def run():
+        try:
+            _compute(cache, key, f, args, kwargs, model, timeout)
+        except Exception as e:
+            # Hilo sin contexto de aplicación: current_app no está disponible
+            logger.exception(f"Error refreshing cache entry {key}: {str(e)}")
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(key)
+            db_session.remove()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def _record_age(age):
+    # La edad de los datos servidos en la petición (la mayor si hay varios) va en la cabecera Age
+    if has_request_context():
+        g.data_age = max(g.get('data_age', 0), age)
+
+
+def cached(tags=(), timeout=None, model=None, stale_after=None):
+    """Decorador que cachea el resultado de un método de lectura de un servicio
+
+    Los argumentos se normalizan con la firma del método (get_x(5) y
+    get_x(limit=5) comparten entrada) y los resultados None no se guardan.
+    Ante un fallo, las llamadas concurrentes con la misma clave se coalescen:
+    solo una ejecuta el método y las demás comparten su resultado.
+
+    Con stale_after (stale-while-revalidate), una entrada con más de
+    stale_after segundos se sigue sirviendo al momento mientras un hilo la
+    recalcula; timeout es entonces el límite duro a partir del cual ya no se
+    sirve. La edad de los datos se informa en la cabecera Age (ver init_cache).
+
+    Args:
+        tags (tuple): Etiquetas de las que depende el resultado (ver invalidates)
+        timeout (int, optional): Segundos de vida (por defecto CACHE_DEFAULT_TIMEOUT)
+        model: Si el método retorna una lista de objetos de este modelo, solo se
+            guardan sus ids y en cada acierto se recargan en la sesión actual con
+            model.get_many() (una consulta por clave primaria, con el perfil
+            `profile` del método si lo tiene)
+        stale_after (int, optional): Segundos tras los que la entrada se recalcula en segundo plano
+    """
+    tags = tuple(tags)
+
+    def decorator(f):
+        signature = inspect.signature(f)
+        name = f.__qualname__
+
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            cache = get_cache()
+            versions = cache.tag_versions(tags)
+            if versions is None:
+                return f(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = [(arg, value) for arg, value in bound.arguments.items() if arg != 'self']
+            key = make_key(name, params, versions)
+
+            entry = cache.get(key)
+            if entry is None:
+                (result, entry), shared = _flights.do(
+                    key, lambda: _compute(cache, key, f, args, kwargs, model, timeout)
+                )
+                if shared:
+                    cache._count(coalesced=1)
+                elif result is not None or entry is None:
+                    # Quien calculó el resultado lo usa tal cual
+                    if stale_after is not None:
+                        _record_age(0)
+                    return result
+
+            computed_at, value = entry
+            if stale_after is not None:
+                age = max(time.time() - computed_at, 0)
+                _record_age(age)
+                if age > stale_after:
+                    _refresh_in_background(cache, key, f, args, kwargs, model, timeout)
+
+            if model is None:
+                return value
+            # Los objetos de otra sesión (otro hilo o petición) no se comparten: se recargan por id
+            objs = model.get_many(value, bound.arguments.get('profile'))
+            return [objs[row_id] for row_id in value if row_id in objs]
+
+        return decorated
+    return decorator
+
+
+def invalidate_tags(*tags):
+    """Invalida las entradas de la caché de servicios que dependen de las etiquetas"""
+    get_cache().invalidate_tags(*tags)
+
+
+def invalidates(*tags):
+    """Decorador para métodos de escritura: invalida las etiquetas cuando el método termina sin error"""
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            result = f(*args, **kwargs)
+            invalidate_tags(*tags)
+            return result
+        return decorated
+    return decorator
+
+
+def init_cache(app):
+    """Añade la cabecera Age a las respuestas servidas con datos de la caché con stale_after"""
+    @app.after_request
+    def add_age_header(response):
+        age = g.get('data_age')
+        if age is not None:
+            response.headers['Age'] = str(int(age))
+        return response
@@ -0,0 +1,116 @@
+from datetime import datetime
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from ..database.db_config import db_session
+from ..models.change_version import ChangeVersion
+
+# Tablas con versión de cambios -> columnas cuyos cambios no alteran las respuestas públicas
+VERSIONED_TABLES = {
+    'packages': set(),
+    'news': {'views_count'},
+    'reviews': set(),
+    'users': {'email', 'password', 'role', 'profile_image', 'last_login', 'is_active'}
+}
+
+# Tablas que la base de datos vacía con ON DELETE CASCADE sin pasar por la sesión
+DELETE_CASCADES = {
+    'packages': {'reviews'},
+    'users': {'reviews', 'news'}
+}
+
+def _table_name(obj):
+    return getattr(obj, '__tablename__', None)
+
+
+def _has_relevant_changes(obj, ignored):
+    state = obj._sa_instance_state
+    return any(
+        state.attrs[prop.key].history.has_changes()
+        for prop in state.mapper.column_attrs
+        if prop.key not in ignored
+    )
+
+
+def _deleted(table):
+    return {table} | DELETE_CASCADES.get(table, set())
+
+
+def changed_tables(session):
+    """Tablas versionadas afectadas por el flush en curso (altas, bajas y cambios relevantes)"""
+    tables = set()
+    for obj in session.new:
+        if _table_name(obj) in VERSIONED_TABLES:
+            tables.add(_table_name(obj))
+    for obj in session.deleted:
+        if _table_name(obj) in VERSIONED_TABLES:
+            tables |= _deleted(_table_name(obj))
+    for obj in session.dirty:
+        table = _table_name(obj)
+        if table in VERSIONED_TABLES and table not in tables and _has_relevant_changes(obj, VERSIONED_TABLES[table]):
+            tables.add(table)
+    return tables
+
+
+def bump_versions(connection, tables):
+    """Incrementa la versión de las tablas dentro de la transacción del cambio"""
+    now = datetime.utcnow()
+    table = ChangeVersion.__table__
+    # Siempre en el mismo orden para que dos transacciones no se bloqueen entre sí
+    for name in sorted(tables):
+        result = connection.execute(
+            update(table)
+            .where(table.c.table_name == name)
+            .values(version=table.c.version + 1, changed_at=now)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(table_name=name, version=1, changed_at=now))
+
+
+def get_versions(tables):
+    """Retorna {tabla: (versión, fecha del último cambio)} con una sola consulta"""
+    rows = db_session.execute(
+        select(ChangeVersion.table_name, ChangeVersion.version, ChangeVersion.changed_at)
+        .where(ChangeVersion.table_name.in_(list(tables)))
+    )
+    return {row.table_name: (row.version, row.changed_at) for row in rows}
+
+
+def _after_flush(session, flush_context):
+    tables = changed_tables(session)
+    if tables:
+        bump_versions(session.connection(), tables)
+
+
+def _do_orm_execute(orm_execute_state):
+    # UPDATE/DELETE masivos (query.update(), query.delete(), update(...))
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    # Escrituras tipo "touch" (vistas, último acceso) que no cambian el contenido
+    if orm_execute_state.execution_options.get('skip_change_version'):
+        return
+
+    table = getattr(orm_execute_state.statement.table, 'name', None)
+    if table not in VERSIONED_TABLES:
+        return
+    tables = _deleted(table) if orm_execute_state.is_delete else {table}
+    bump_versions(orm_execute_state.session.connection(), tables)
+
+
+def init_change_tracking():
+    """Registra los eventos de sesión y crea las filas de versión que falten"""
+    if not event.contains(db_session, 'after_flush', _after_flush):
+        event.listen(db_session, 'after_flush', _after_flush)
+        event.listen(db_session, 'do_orm_execute', _do_orm_execute)
+
+    try:
+        existing = set(get_versions(VERSIONED_TABLES))
+        for name in VERSIONED_TABLES:
+            if name not in existing:
+                db_session.add(ChangeVersion(name))
+        db_session.commit()
+    except IntegrityError:
+        # Otro proceso las creó a la vez
+        db_session.rollback()
+    finally:
+        db_session.remove()
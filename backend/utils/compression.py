@@ -0,0 +1,167 @@
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from werkzeug.http import parse_accept_header
+from werkzeug.wrappers import Response
+
+from ..config import (
+    COMPRESSION_MIN_SIZE, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY, COMPRESSION_CACHE_MAX_BYTES
+)
+
+try:
+    import brotli
+except ImportError:  # dependencia opcional: sin brotli solo se usa gzip
+    brotli = None
+
+# Tipos que vale la pena comprimir (los PDF e imágenes ya están comprimidos)
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/msgpack', 'application/x-ndjson',
+    'text/csv', 'text/html', 'text/plain', 'text/css', 'application/javascript'
+}
+
+def _supported_encodings():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def negotiate_encoding(accept_encoding):
+    """Elige la codificación según Accept-Encoding (brotli antes que gzip a igual calidad)"""
+    if not accept_encoding:
+        return None
+    accept = parse_accept_header(accept_encoding)
+    return accept.best_match(_supported_encodings())
+
+
+def compress(data, encoding):
+    """Comprime un cuerpo completo"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=COMPRESSION_BROTLI_QUALITY)
+    compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: formato gzip
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(chunks, encoding):
+    """Comprime una respuesta en streaming, enviando cada fragmento en cuanto se produce"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+class PrecompressedCache:
+    """Caché LRU de cuerpos ya comprimidos, limitada por tamaño total en bytes
+
+    La clave es (codificación, ETag) cuando la respuesta tiene ETag fuerte o
+    (codificación, hash del cuerpo) si no; calcular el hash es mucho más
+    barato que volver a comprimir.
+    """
+
+    def __init__(self, max_bytes=COMPRESSION_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def set(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+class CompressionMiddleware:
+    """Middleware WSGI que comprime las respuestas con gzip o brotli
+
+    Se aplica sobre app.wsgi_app, después de toda la lógica de Flask
+    (negociación JSON/MessagePack, manejadores de error, etc.):
+    - respuestas con Content-Length por debajo de min_size: sin comprimir;
+    - respuestas completas: se comprimen una vez y se guardan en la caché;
+    - respuestas en streaming (sin Content-Length): se comprimen por fragmentos.
+    """
+
+    def __init__(self, app, min_size=COMPRESSION_MIN_SIZE, cache=None):
+        self.app = app
+        self.min_size = min_size
+        self.cache = cache if cache is not None else PrecompressedCache()
+
+    def __call__(self, environ, start_response):
+        encoding = negotiate_encoding(environ.get('HTTP_ACCEPT_ENCODING'))
+        if encoding is None or environ.get('REQUEST_METHOD') == 'HEAD':
+            return self.app(environ, start_response)
+
+        response = Response.from_app(self.app, environ)
+        if self._should_compress(response):
+            self._compress_response(response, encoding)
+        response.vary.add('Accept-Encoding')
+        return response(environ, start_response)
+
+    def _should_compress(self, response):
+        if response.status_code < 200 or response.status_code in (204, 206, 304):
+            return False
+        if 'Content-Encoding' in response.headers or 'Content-Range' in response.headers:
+            return False
+        if 'no-transform' in response.headers.get('Cache-Control', ''):
+            return False
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return False
+        length = response.headers.get('Content-Length')
+        return length is None or int(length) >= self.min_size
+
+    def _compress_response(self, response, encoding):
+        # El iterable original debe cerrarse igualmente (stream_with_context libera ahí el contexto)
+        original = response.response
+        if hasattr(original, 'close'):
+            response.call_on_close(original.close)
+
+        if response.headers.get('Content-Length') is None:
+            # Streaming: se comprime sobre la marcha y sin Content-Length
+            response.response = compress_stream(response.iter_encoded(), encoding)
+        else:
+            data = response.get_data()
+            etag, weak = response.get_etag()
+            key = (encoding, etag if etag and not weak else hashlib.blake2b(data, digest_size=16).digest())
+            compressed = self.cache.get(key)
+            if compressed is None:
+                compressed = compress(data, encoding)
+                self.cache.set(key, compressed)
+            response.set_data(compressed)
+
+        response.headers['Content-Encoding'] = encoding
+        # La representación comprimida no es idéntica byte a byte: el ETag pasa a ser débil
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+
+
+def init_compression(app):
+    """Activa la compresión de respuestas en la aplicación"""
+    app.wsgi_app = CompressionMiddleware(app.wsgi_app)
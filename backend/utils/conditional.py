@@ -0,0 +1,68 @@
+import hashlib
+from datetime import timezone
+from functools import wraps
+from flask import request, make_response
+
+from .change_tracking import get_versions
+from .msgpack_support import wants_msgpack
+
+def _make_etag(tables, versions):
+    # La misma URL con otra versión de datos o en otro formato (JSON/MessagePack) es otra representación
+    parts = [request.full_path, 'msgpack' if wants_msgpack() else 'json']
+    parts.extend(f"{table}:{versions.get(table, (0, None))[0]}" for table in tables)
+    return hashlib.blake2b('|'.join(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _last_modified(versions):
+    dates = [changed_at for _, changed_at in versions.values() if changed_at is not None]
+    if not dates:
+        return None
+    return max(dates).replace(microsecond=0, tzinfo=timezone.utc)
+
+
+def _is_not_modified(etag, last_modified):
+    # If-None-Match tiene prioridad; la comparación es débil porque la compresión debilita el ETag
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def conditional_get(tables, cache_control):
+    """Decorador de GET condicional basado en la versión de las tablas de las que depende la respuesta
+
+    El ETag y Last-Modified salen solo de la tabla change_versions, así que
+    If-None-Match/If-Modified-Since se responden con 304 sin consultar ni
+    serializar los datos.
+
+    Args:
+        tables (list): Tablas cuyos cambios alteran la respuesta
+        cache_control (str): Valor de la cabecera Cache-Control
+    """
+    tables = sorted(tables)
+
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            # Las versiones se leen antes que los datos: si cambian entre medias, el ETag queda viejo y no se reutiliza
+            versions = get_versions(tables)
+            etag = _make_etag(tables, versions)
+            last_modified = _last_modified(versions)
+
+            if _is_not_modified(etag, last_modified):
+                response = make_response('', 304)
+                response.vary.add('Accept')
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = cache_control
+            return response
+
+        return decorated
+    return decorator
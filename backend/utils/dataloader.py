@@ -0,0 +1,60 @@
+from flask import g, has_app_context
+
+class DataLoader:
+    """Cargador por lotes de un tipo de entidad
+
+    Reúne los ids pedidos y los resuelve con una sola consulta IN (...) en
+    lugar de una carga perezosa por objeto. Lo ya cargado se recuerda durante
+    el resto de la petición (los ids inexistentes se guardan como None).
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._cache = {}
+
+    def load_many(self, ids):
+        """Retorna {id: objeto} para los ids indicados, consultando solo los que faltan"""
+        ids = {row_id for row_id in ids if row_id is not None}
+        missing = [row_id for row_id in ids if row_id not in self._cache]
+
+        if missing:
+            # Identity map primero y una consulta IN (...) para el resto
+            found = self.model.get_many(missing)
+            for row_id in missing:
+                self._cache[row_id] = found.get(row_id)
+
+        return {row_id: self._cache[row_id] for row_id in ids}
+
+    def load(self, row_id):
+        """Retorna un objeto por id (None si no existe)"""
+        if row_id is None:
+            return None
+        if row_id not in self._cache:
+            self.load_many([row_id])
+        return self._cache[row_id]
+
+    def prime(self, ids):
+        """Carga por adelantado los ids que se van a pedir con load()"""
+        self.load_many(ids)
+
+
+def get_loader(model):
+    """Retorna el cargador del modelo para la petición actual (en flask.g)"""
+    if not has_app_context():
+        return DataLoader(model)
+
+    loaders = g.setdefault('_dataloaders', {})
+    if model not in loaders:
+        loaders[model] = DataLoader(model)
+    return loaders[model]
+
+
+def load_related(model, items, attribute):
+    """Carga en una consulta los objetos referenciados por `attribute` en items
+
+    Ejemplo: users = load_related(User, reviews, 'user_id'); users[review.user_id].name
+
+    Returns:
+        dict: {id: objeto}
+    """
+    return get_loader(model).load_many(getattr(item, attribute) for item in items)
@@ -0,0 +1,98 @@
+import hashlib
+import json
+from functools import wraps
+from flask import request, jsonify, make_response, g
+
+from ..services.idempotency_service import IdempotencyService
+from .msgpack_support import msgpack, MSGPACK_MIMETYPE
+
+idempotency_service = IdempotencyService()
+
+def allow_retry():
+    """Marca el error de la petición en curso como reintentable: ocurrió antes de cualquier efecto
+
+    La respuesta no se guarda y la Idempotency-Key queda libre para reintentar,
+    sea cual sea el código de estado. Con release_server_errors=False es la única
+    forma de que un error del servidor libere la clave.
+    """
+    g.idempotency_retry = True
+
+
+def idempotent(endpoint, release_server_errors=True):
+    """Decorator que hace idempotente un POST mediante la cabecera Idempotency-Key
+
+    Si la clave ya se usó, se devuelve la respuesta original sin volver a
+    ejecutar la operación; si la petición original sigue en curso, se espera
+    a que termine. Debe aplicarse debajo de token_required.
+
+    Args:
+        endpoint (str): Nombre lógico de la operación (las claves son por usuario y operación)
+        release_server_errors (bool): Si un error 5xx libera la clave para reintentar. Debe ser
+            False cuando la operación puede tener efectos externos (un cobro) antes de fallar;
+            la vista llama a allow_retry() en los errores que sabe anteriores a esos efectos
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(current_user, *args, **kwargs):
+            key = request.headers.get('Idempotency-Key')
+            if not key:
+                return f(current_user, *args, **kwargs)
+
+            if len(key) > 255:
+                return jsonify({'message': 'Idempotency-Key is too long!'}), 400
+
+            request_hash = hashlib.sha256(request.get_data()).hexdigest()
+            record, created = idempotency_service.reserve(key, current_user.id, endpoint, request_hash)
+
+            if not created:
+                if record is None:
+                    return jsonify({'message': 'Request with this Idempotency-Key failed, please retry!'}), 409
+                if record.request_hash != request_hash:
+                    return jsonify({'message': 'Idempotency-Key was already used with a different request!'}), 422
+                if record.status != 'completed':
+                    record = idempotency_service.wait_for_completion(record.id)
+                if record is None or record.status != 'completed':
+                    return jsonify({'message': 'A request with this Idempotency-Key is still in progress!'}), 409
+                return _replay(record)
+
+            try:
+                response = make_response(f(current_user, *args, **kwargs))
+            except Exception:
+                if release_server_errors or g.get('idempotency_retry'):
+                    idempotency_service.release(record.id)
+                else:
+                    # El efecto pudo ocurrir: un reintento con la misma clave no debe repetirlo
+                    error = make_response(jsonify({'message': 'Internal server error!'}), 500)
+                    idempotency_service.complete(record.id, 500, error.get_data(as_text=True), error.mimetype)
+                raise
+
+            # Los errores sin efectos no se memorizan: el cliente puede reintentar
+            if g.get('idempotency_retry') or (response.status_code >= 500 and release_server_errors):
+                idempotency_service.release(record.id)
+            else:
+                body, mimetype = _stored_body(response)
+                idempotency_service.complete(record.id, response.status_code, body, mimetype)
+            return response
+
+        return decorated
+    return decorator
+
+
+def _stored_body(response):
+    """Cuerpo y tipo a guardar; las respuestas MessagePack se guardan como JSON
+
+    Al repetirlas, la negociación de contenido las vuelve a convertir según
+    la cabecera Accept de la nueva petición.
+    """
+    if response.mimetype == MSGPACK_MIMETYPE:
+        obj = msgpack.unpackb(response.get_data(), raw=False, strict_map_key=False)
+        return json.dumps(obj), 'application/json'
+    return response.get_data(as_text=True), response.mimetype
+
+
+def _replay(record):
+    """Construye la respuesta almacenada de una petición ya procesada"""
+    response = make_response(record.response_body, record.response_status)
+    response.mimetype = record.response_mimetype or 'application/json'
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
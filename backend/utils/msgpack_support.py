@@ -0,0 +1,98 @@
+import json
+from flask import Request, request, has_request_context
+from werkzeug.exceptions import BadRequest, UnsupportedMediaType
+
+from .json_provider import OrjsonProvider
+
+try:
+    import msgpack
+except ImportError:  # dependencia opcional: sin msgpack todas las respuestas son JSON
+    msgpack = None
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+JSON_MIMETYPE = 'application/json'
+
+def wants_msgpack():
+    """Indica si el cliente de la petición actual prefiere MessagePack (cabecera Accept)"""
+    if msgpack is None or not has_request_context():
+        return False
+    return request.accept_mimetypes.best_match([JSON_MIMETYPE, MSGPACK_MIMETYPE]) == MSGPACK_MIMETYPE
+
+
+def packb(obj, default):
+    """Serializa a MessagePack; los tipos desconocidos pasan por `default` (igual que en JSON)"""
+    return msgpack.packb(obj, default=default, use_bin_type=True, datetime=False)
+
+
+class MsgpackNegotiatingProvider(OrjsonProvider):
+    """Proveedor JSON que responde en MessagePack si el cliente lo pide con Accept
+
+    jsonify() pasa por aquí, de modo que la respuesta se codifica una sola vez
+    en el formato pedido, con los mismos datos que la versión JSON.
+    """
+
+    def response(self, *args, **kwargs):
+        if not wants_msgpack():
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(packb(obj, self.default), mimetype=MSGPACK_MIMETYPE)
+
+
+class MsgpackRequest(Request):
+    """Petición que también acepta cuerpos MessagePack en get_json()
+
+    Las vistas siguen usando request.get_json(); si el Content-Type es
+    application/msgpack el cuerpo se decodifica con msgpack.
+    """
+
+    _msgpack_cache = None
+
+    def get_json(self, force=False, silent=False, cache=True):
+        if self.mimetype != MSGPACK_MIMETYPE:
+            return super().get_json(force=force, silent=silent, cache=cache)
+
+        if msgpack is None:
+            if silent:
+                return None
+            raise UnsupportedMediaType('MessagePack request bodies are not supported!')
+
+        if cache and self._msgpack_cache is not None:
+            return self._msgpack_cache
+
+        try:
+            data = msgpack.unpackb(self.get_data(cache=cache), raw=False, strict_map_key=False)
+        except Exception:
+            if silent:
+                return None
+            raise BadRequest('Failed to decode MessagePack body!')
+
+        if cache:
+            self._msgpack_cache = data
+        return data
+
+
+def init_msgpack(app):
+    """Activa la negociación JSON/MessagePack en todas las rutas de la aplicación"""
+    app.json = MsgpackNegotiatingProvider(app)
+    app.request_class = MsgpackRequest
+
+    @app.after_request
+    def negotiate_content(response):
+        if response.mimetype not in (JSON_MIMETYPE, MSGPACK_MIMETYPE):
+            return response
+
+        # Las cachés intermedias deben distinguir la respuesta según Accept
+        response.vary.add('Accept')
+
+        # Respuestas JSON construidas sin jsonify (p. ej. repeticiones idempotentes)
+        if (response.mimetype == JSON_MIMETYPE and not response.is_streamed
+                and not response.direct_passthrough and wants_msgpack()):
+            try:
+                obj = json.loads(response.get_data())
+            except ValueError:
+                return response
+            response.set_data(packb(obj, app.json.default))
+            response.mimetype = MSGPACK_MIMETYPE
+
+        return response
@@ -0,0 +1,205 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_, select, case
+from sqlalchemy.orm import load_only
+
+from ..database.db_config import db_session
+from ..config import ITEMS_PER_PAGE, MAX_ITEMS_PER_PAGE
+
+class Page:
+    """Página de resultados obtenida con paginación por cursor (keyset)"""
+
+    def __init__(self, items, next_cursor, limit):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.limit = limit
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def to_dict(self):
+        """Metadatos de paginación para incluir en la respuesta"""
+        return {
+            'limit': self.limit,
+            'next_cursor': self.next_cursor,
+            'has_more': self.next_cursor is not None
+        }
+
+
+def encode_cursor(sort_value, row_id):
+    """Codifica la posición (valor de orden, id) como un cursor opaco"""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decodifica un cursor opaco; lanza ValueError si no es válido"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if sort_value is not None:
+            sort_value = datetime.fromisoformat(sort_value)
+        return sort_value, int(row_id)
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError('Invalid cursor!')
+
+
+def get_page_args(args):
+    """Lee cursor, limit y fields de los parámetros de la petición
+
+    Args:
+        args: Parámetros de la petición (request.args)
+
+    Returns:
+        tuple: (cursor, limit, fields) donde fields es una lista o None
+    """
+    cursor = args.get('cursor') or None
+    limit = args.get('limit', ITEMS_PER_PAGE, type=int)
+    if limit is None or limit < 1:
+        raise ValueError('Invalid limit!')
+    limit = min(limit, MAX_ITEMS_PER_PAGE)
+
+    fields = args.get('fields')
+    fields = [field.strip() for field in fields.split(',') if field.strip()] if fields else None
+    return cursor, limit, fields
+
+
+def resolve_fields(fields, field_map):
+    """Valida los campos pedidos y retorna las columnas necesarias para cargarlos
+
+    Args:
+        fields (list): Campos pedidos por el cliente, o None para todos
+        field_map (dict): Campo de salida -> (columnas necesarias, función de valor)
+
+    Returns:
+        tuple: (campos de salida, nombres de columnas a cargar)
+    """
+    if not fields:
+        fields = list(field_map)
+    unknown = [field for field in fields if field not in field_map]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    columns = []
+    for field in fields:
+        for column in field_map[field][0]:
+            if column not in columns:
+                columns.append(column)
+    return fields, columns
+
+
+def serialize_fields(obj, fields, field_map):
+    """Construye el diccionario de salida solo con los campos pedidos"""
+    return {field: field_map[field][1](obj) for field in fields}
+
+
+def keyset_order(sort_column, id_column):
+    """Orden descendente por (columna de orden, id) con los NULL al final
+
+    SQL Server no admite NULLS LAST y cada motor ordena los NULL de forma
+    distinta, así que se ordena antes por un CASE explícito; la condición de
+    keyset_condition depende de este orden.
+    """
+    return [case((sort_column.is_(None), 1), else_=0), sort_column.desc(), id_column.desc()]
+
+
+def keyset_condition(sort_column, id_column, sort_value, last_id):
+    """Filas posteriores a la posición (sort_value, last_id) en el orden de keyset_order
+
+    Una comparación con NULL nunca es verdadera: las filas con la columna de
+    orden a NULL se incluyen explícitamente tras todas las demás.
+    """
+    if sort_value is None:
+        return and_(sort_column.is_(None), id_column < last_id)
+    return or_(
+        sort_column < sort_value,
+        and_(sort_column == sort_value, id_column < last_id),
+        sort_column.is_(None)
+    )
+
+
+def paginate(query, model, sort_attr, cursor=None, limit=ITEMS_PER_PAGE, columns=None):
+    """Aplica paginación por cursor sobre (sort_attr, id) en orden descendente
+
+    Args:
+        query: Consulta base (ya filtrada)
+        model: Modelo consultado
+        sort_attr (str): Columna de orden (created_at, publish_date, payment_date, ...)
+        cursor (str, optional): Cursor devuelto por la página anterior
+        limit (int): Tamaño de página
+        columns (list, optional): Columnas a cargar con load_only; el resto no se lee
+
+    Returns:
+        Page: Elementos de la página y cursor para la siguiente
+    """
+    sort_column = getattr(model, sort_attr)
+    id_column = model.id
+
+    if columns is not None:
+        # El id y la columna de orden son necesarios para construir el cursor
+        needed = ['id', sort_attr] + [column for column in columns if column not in ('id', sort_attr)]
+        query = query.options(load_only(*[getattr(model, column) for column in needed]))
+
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor)
+        query = query.filter(keyset_condition(sort_column, id_column, sort_value, last_id))
+
+    items = query.order_by(*keyset_order(sort_column, id_column)).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, sort_attr), last.id)
+
+    return Page(items, next_cursor, limit)
+
+
+def paginate_rows(model, sort_attr, columns, cursor=None, limit=ITEMS_PER_PAGE, where=None):
+    """Igual que paginate, pero lee solo las columnas pedidas como filas (tuplas)
+
+    No se construyen instancias del modelo: las filas se serializan
+    directamente (por ejemplo con ModelSerializer.rows).
+
+    Args:
+        model: Modelo consultado
+        sort_attr (str): Columna de orden
+        columns (list): Nombres de las columnas a leer
+        cursor (str, optional): Cursor devuelto por la página anterior
+        limit (int): Tamaño de página
+        where (list, optional): Condiciones de filtrado
+
+    Returns:
+        Page: Filas de la página y cursor para la siguiente
+    """
+    sort_column = getattr(model, sort_attr)
+    id_column = model.id
+
+    # El id y la columna de orden son necesarios para construir el cursor
+    needed = ['id', sort_attr] + [column for column in columns if column not in ('id', sort_attr)]
+    stmt = select(*[getattr(model, column) for column in needed])
+
+    for condition in where or []:
+        stmt = stmt.where(condition)
+
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor)
+        stmt = stmt.where(keyset_condition(sort_column, id_column, sort_value, last_id))
+
+    rows = db_session.execute(
+        stmt.order_by(*keyset_order(sort_column, id_column)).limit(limit + 1)
+    ).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_attr), last.id)
+
+    return Page(rows, next_cursor, limit)
@@ -0,0 +1,243 @@
+import http.client
+import json
+import queue
+import random
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+from ..config import (
+    PAYMENT_GATEWAY, PAYMENT_GATEWAY_URL, PAYMENT_GATEWAY_API_KEY, PAYMENT_GATEWAY_TIMEOUT,
+    PAYMENT_GATEWAY_MAX_RETRIES, PAYMENT_GATEWAY_POOL_SIZE,
+    PAYMENT_GATEWAY_BREAKER_THRESHOLD, PAYMENT_GATEWAY_BREAKER_RESET, DEFAULT_CURRENCY
+)
+
+class GatewayError(Exception):
+    """Error devuelto por la pasarela de pagos o de comunicación con ella"""
+
+    def __init__(self, message, retryable=False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class GatewayDeclinedError(GatewayError):
+    """La pasarela rechazó la operación (tarjeta rechazada, fondos insuficientes, etc.)"""
+
+
+class GatewayUnavailableError(GatewayError):
+    """La pasarela no está disponible (circuito abierto o sin conexiones libres)"""
+
+
+class CircuitBreaker:
+    """Circuit breaker: tras varios fallos seguidos rechaza llamadas durante un tiempo
+
+    Estados: closed (normal), open (falla de inmediato) y half_open (deja pasar
+    una llamada de prueba; si va bien se cierra, si falla se vuelve a abrir).
+    """
+
+    def __init__(self, failure_threshold=PAYMENT_GATEWAY_BREAKER_THRESHOLD, reset_timeout=PAYMENT_GATEWAY_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Indica si se puede realizar una llamada"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+
+class ConnectionPool:
+    """Pool de conexiones HTTP keep-alive hacia un único host"""
+
+    def __init__(self, base_url, size=PAYMENT_GATEWAY_POOL_SIZE, timeout=PAYMENT_GATEWAY_TIMEOUT):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip('/')
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=size)
+        for _ in range(size):
+            self._pool.put(None)  # las conexiones se abren bajo demanda
+
+    def request(self, method, path, body=None, headers=None, timeout=None):
+        """Realiza una petición y retorna (status, cuerpo)"""
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            # Sin conexiones libres no se espera más que el timeout de la llamada
+            conn = self._pool.get(timeout=timeout)
+        except queue.Empty:
+            raise GatewayUnavailableError('No free connections to the payment gateway')
+
+        try:
+            if conn is None:
+                conn = self._connect(timeout)
+            else:
+                conn.timeout = timeout
+                if conn.sock:
+                    conn.sock.settimeout(timeout)
+            conn.request(method, self.base_path + path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            data = response.read()
+            if response.will_close:
+                conn.close()
+            return response.status, data
+        except Exception:
+            # Una conexión con error no se reutiliza
+            if conn is not None:
+                conn.close()
+            conn = None
+            raise
+        finally:
+            self._pool.put(conn)
+
+    def _connect(self, timeout):
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.host, self.port, timeout=timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+
+
+class PaymentGateway:
+    """Interfaz común de las pasarelas de pago"""
+
+    def charge(self, amount, currency=DEFAULT_CURRENCY, card_last_digits=None, reference=None):
+        """Realiza un cobro y retorna el id de transacción"""
+        raise NotImplementedError
+
+    def refund(self, transaction_id, amount, reference=None):
+        """Reembolsa un cobro y retorna el id de la operación de reembolso"""
+        raise NotImplementedError
+
+
+class SimulatedGateway(PaymentGateway):
+    """Pasarela simulada: todos los cobros y reembolsos se aprueban"""
+
+    def charge(self, amount, currency=DEFAULT_CURRENCY, card_last_digits=None, reference=None):
+        return str(uuid.uuid4())
+
+    def refund(self, transaction_id, amount, reference=None):
+        return str(uuid.uuid4())
+
+
+class HTTPGateway(PaymentGateway):
+    """Cliente de una pasarela HTTP/JSON con pool de conexiones, timeouts,
+    reintentos con jitter y circuit breaker"""
+
+    def __init__(self, base_url=PAYMENT_GATEWAY_URL, api_key=PAYMENT_GATEWAY_API_KEY,
+                 timeout=PAYMENT_GATEWAY_TIMEOUT, max_retries=PAYMENT_GATEWAY_MAX_RETRIES,
+                 pool_size=PAYMENT_GATEWAY_POOL_SIZE, breaker=None):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.pool = ConnectionPool(base_url, size=pool_size, timeout=timeout)
+        self.breaker = breaker or CircuitBreaker()
+
+    def charge(self, amount, currency=DEFAULT_CURRENCY, card_last_digits=None, reference=None):
+        result = self._call('/charges', {
+            'amount': amount,
+            'currency': currency,
+            'card_last_digits': card_last_digits,
+            'reference': reference
+        }, reference)
+        return result['transaction_id']
+
+    def refund(self, transaction_id, amount, reference=None):
+        result = self._call('/refunds', {
+            'transaction_id': transaction_id,
+            'amount': amount,
+            'reference': reference
+        }, reference)
+        return result['refund_id']
+
+    def _call(self, path, payload, reference=None):
+        """POST con reintentos; la misma Idempotency-Key en todos los intentos evita cobros dobles"""
+        if not self.breaker.allow():
+            raise GatewayUnavailableError('Payment gateway temporarily unavailable')
+
+        body = json.dumps(payload)
+        headers = {
+            'Content-Type': 'application/json',
+            'Authorization': f'Bearer {self.api_key}',
+            'Idempotency-Key': reference or str(uuid.uuid4()),
+            'Connection': 'keep-alive'
+        }
+
+        attempt = 0
+        while True:
+            try:
+                result = self._send(path, body, headers)
+                self.breaker.record_success()
+                return result
+            except GatewayDeclinedError:
+                # Un rechazo es una respuesta válida: la pasarela está sana
+                self.breaker.record_success()
+                raise
+            except GatewayUnavailableError:
+                # Sin conexiones libres: la pasarela está saturada
+                self.breaker.record_failure()
+                raise
+            except GatewayError as e:
+                if not e.retryable or attempt >= self.max_retries:
+                    self.breaker.record_failure()
+                    raise
+            attempt += 1
+            # Backoff exponencial con jitter completo
+            time.sleep(random.uniform(0, 0.1 * (2 ** attempt)))
+
+    def _send(self, path, body, headers):
+        try:
+            status, data = self.pool.request('POST', path, body=body, headers=headers, timeout=self.timeout)
+        except GatewayError:
+            raise
+        except (OSError, http.client.HTTPException) as e:
+            raise GatewayError(f'Payment gateway connection error: {str(e)}', retryable=True)
+
+        try:
+            result = json.loads(data or b'{}')
+        except ValueError:
+            result = {}
+
+        if status >= 500 or status == 429:
+            raise GatewayError(f'Payment gateway error ({status})', retryable=True)
+        if status >= 400:
+            raise GatewayDeclinedError(result.get('message', f'Payment declined ({status})'))
+        return result
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+def get_payment_gateway():
+    """Retorna la pasarela configurada en PAYMENT_GATEWAY (compartida por el proceso)"""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = HTTPGateway() if PAYMENT_GATEWAY == 'http' else SimulatedGateway()
+    return _gateway
@@ -184,18 +184,19 @@ class PDFGenerator:
         
         return filepath
     
-    def generate_payment_receipt(self, payment):
+    def generate_payment_receipt(self, receipt):
         """
         Genera un recibo de pago en formato PDF
         
         Args:
-            payment: Objeto de pago con toda la información necesaria
+            receipt (dict): Datos del recibo (PaymentService.get_receipt_data), con los
+                totales de la reserva ya calculados
             
         Returns:
             str: Ruta al archivo PDF generado
         """
         # Nombre del archivo
-        filename = f"payment_receipt_{payment.id}.pdf"
+        filename = f"payment_receipt_{receipt['payment_id']}.pdf"
         filepath = os.path.join(self.output_dir, filename)
         
         # Crear el documento
@@ -214,7 +215,7 @@ class PDFGenerator:
             elements.append(Spacer(1, 0.25*inch))
         
         # Información del recibo
-        receipt_number = f"RCP-{payment.id}"
+        receipt_number = receipt['receipt_number']
         elements.append(Paragraph(f"Recibo Nº: {receipt_number}", self.styles['Subtitle']))
         elements.append(Paragraph(f"Fecha de emisión: {datetime.now().strftime('%d/%m/%Y %H:%M')}", self.styles['Normal']))
         elements.append(Spacer(1, 0.2*inch))
@@ -222,8 +223,8 @@ class PDFGenerator:
         # Datos del cliente
         elements.append(Paragraph("DATOS DEL CLIENTE", self.styles['Subtitle']))
         client_data = [
-            ["Nombre:", payment.user.name],
-            ["Email:", payment.user.email]
+            ["Nombre:", receipt['user_name'] or "N/A"],
+            ["Email:", receipt['user_email'] or "N/A"]
         ]
         table = Table(client_data, colWidths=[2*inch, 4*inch])
         table.setStyle(TableStyle([
@@ -234,13 +235,12 @@ class PDFGenerator:
         elements.append(Spacer(1, 0.2*inch))
         
         # Detalles de la reserva
-        booking = payment.booking
         elements.append(Paragraph("DETALLES DE LA RESERVA", self.styles['Subtitle']))
         booking_data = [
-            ["Número de reserva:", booking.booking_number],
-            ["Destino:", booking.package.destination],
-            ["Fecha de viaje:", booking.travel_date.strftime('%d/%m/%Y')],
-            ["Número de viajeros:", str(booking.number_of_travelers)]
+            ["Número de reserva:", receipt['booking_number'] or "N/A"],
+            ["Destino:", receipt['destination'] or "N/A"],
+            ["Fecha de viaje:", receipt['travel_date'].strftime('%d/%m/%Y') if receipt['travel_date'] else "N/A"],
+            ["Número de viajeros:", str(receipt['number_of_travelers'])]
         ]
         table = Table(booking_data, colWidths=[2*inch, 4*inch])
         table.setStyle(TableStyle([
@@ -253,16 +253,16 @@ class PDFGenerator:
         # Detalles del pago
         elements.append(Paragraph("DETALLES DEL PAGO", self.styles['Subtitle']))
         payment_data = [
-            ["ID de transacción:", payment.transaction_id or "N/A"],
-            ["Método de pago:", payment.payment_method],
-            ["Fecha de pago:", payment.payment_date.strftime('%d/%m/%Y %H:%M')],
-            ["Estado:", payment.status.upper()],
-            ["Monto pagado:", f"${payment.amount:.2f}"]
+            ["ID de transacción:", receipt['transaction_id'] or "N/A"],
+            ["Método de pago:", receipt['payment_method']],
+            ["Fecha de pago:", receipt['payment_date'].strftime('%d/%m/%Y %H:%M')],
+            ["Estado:", receipt['status'].upper()],
+            ["Monto pagado:", f"${receipt['amount']:.2f}"]
         ]
         
         # Agregar últimos 4 dígitos de la tarjeta si están disponibles
-        if payment.card_last_digits:
-            payment_data.insert(2, ["Últimos 4 dígitos:", payment.card_last_digits])
+        if receipt['card_last_digits']:
+            payment_data.insert(2, ["Últimos 4 dígitos:", receipt['card_last_digits']])
         
         table = Table(payment_data, colWidths=[2*inch, 4*inch])
         table.setStyle(TableStyle([
@@ -276,15 +276,10 @@ class PDFGenerator:
         
         # Resumen de la reserva
         elements.append(Paragraph("RESUMEN FINANCIERO DE LA RESERVA", self.styles['Subtitle']))
-        # Obtener el total pagado y pendiente
-        from ..services.payment_service import PaymentService
-        payment_service = PaymentService()
-        payment_status = payment_service.check_booking_payment_status(booking.id)
-        
         summary_data = [
-            ["Total de la reserva:", f"${booking.total_price:.2f}"],
-            ["Total pagado:", f"${payment_status['total_paid']:.2f}"],
-            ["Saldo pendiente:", f"${payment_status['pending_amount']:.2f}"]
+            ["Total de la reserva:", f"${(receipt['total_price'] or 0):.2f}"],
+            ["Total pagado:", f"${receipt['total_paid']:.2f}"],
+            ["Saldo pendiente:", f"${receipt['pending_amount']:.2f}"]
         ]
         table = Table(summary_data, colWidths=[2*inch, 4*inch])
         table.setStyle(TableStyle([
@@ -296,10 +291,10 @@ class PDFGenerator:
         
         # Información adicional
         elements.append(Paragraph("INFORMACIÓN ADICIONAL", self.styles['Subtitle']))
-        if payment_status['is_fully_paid']:
+        if receipt['is_fully_paid']:
             elements.append(Paragraph("La reserva ha sido pagada en su totalidad.", self.styles['Normal']))
         else:
-            elements.append(Paragraph(f"Aún queda un saldo pendiente de ${payment_status['pending_amount']:.2f}", self.styles['Normal']))
+            elements.append(Paragraph(f"Aún queda un saldo pendiente de ${receipt['pending_amount']:.2f}", self.styles['Normal']))
             elements.append(Paragraph("Por favor, complete el pago antes de la fecha de viaje.", self.styles['Normal']))
         
         elements.append(Spacer(1, 0.2*inch))
@@ -345,7 +340,7 @@ def generate_booking_pdf(booking):
     pdf_generator = PDFGenerator()
     return pdf_generator.generate_booking_pdf(booking)
 
-def generate_payment_receipt(payment):
+def generate_payment_receipt(receipt):
     """Función de conveniencia para generar recibo de pago"""
     pdf_generator = PDFGenerator()
-    return pdf_generator.generate_payment_receipt(payment)
\ No newline at end of file
+    return pdf_generator.generate_payment_receipt(receipt)
\ No newline at end of file
@@ -0,0 +1,151 @@
+from datetime import date, datetime
+from operator import attrgetter, itemgetter
+from sqlalchemy import Date, DateTime, inspect
+
+class ModelSerializer:
+    """Serializador de un modelo compilado una sola vez a partir de sus columnas
+
+    Al crearlo se decide, columna por columna, qué conversión necesita cada
+    valor (fechas a ISO o a un formato fijo, textos separados por comas a
+    listas); serializar es después leer los valores y aplicar solo esas
+    conversiones. Sirve tanto para instancias ORM como para filas (tuplas)
+    de session.execute(select(...)), sin construir objetos del modelo.
+
+    Args:
+        model: Modelo SQLAlchemy
+        columns (list, optional): Columnas a serializar (por defecto todas)
+        list_columns (iterable): Columnas de texto separado por comas que se devuelven como lista
+        formats (dict): Columna de fecha -> formato strftime (por defecto ISO 8601)
+        computed (dict): Campo -> (columnas necesarias, función que recibe el objeto o la fila)
+    """
+
+    def __init__(self, model, columns=None, list_columns=(), formats=None, computed=None):
+        self.model = model
+        mapper_columns = {attr.key: attr.columns[0] for attr in inspect(model).column_attrs}
+        self.columns = list(columns) if columns is not None else list(mapper_columns)
+        self.list_columns = set(list_columns)
+        self.formats = formats or {}
+        self.computed = computed or {}
+
+        unknown = [column for column in self.columns if column not in mapper_columns]
+        if unknown:
+            raise ValueError(f"Unknown columns for {model.__name__}: {', '.join(unknown)}")
+
+        self._types = {name: mapper_columns[name].type for name in self.columns}
+        self._subsets = {}
+        self._compile()
+
+    def _compile(self):
+        self._converters = []
+        for name in self.columns:
+            converter = self._converter_for(name)
+            if converter is not None:
+                self._converters.append((name, converter))
+
+        # Un attrgetter con varios nombres devuelve una tupla en una sola llamada
+        self._getter = _tuple_getter(attrgetter, self.columns)
+
+    def _converter_for(self, name):
+        if name in self.list_columns:
+            return _split_list
+        column_type = self._types[name]
+        if isinstance(column_type, (DateTime, Date)):
+            fmt = self.formats.get(name)
+            if fmt:
+                return lambda value: value.strftime(fmt) if value is not None else None
+            return _isoformat
+        return None
+
+    @property
+    def fields(self):
+        """Nombres de los campos de salida"""
+        return self.columns + list(self.computed)
+
+    @property
+    def column_names(self):
+        """Columnas que hay que leer de la base de datos para estos campos"""
+        needed = list(self.columns)
+        for columns, _ in self.computed.values():
+            for column in columns:
+                if column not in needed:
+                    needed.append(column)
+        return needed
+
+    def only(self, fields):
+        """Serializador con un subconjunto de campos (compilado una vez y reutilizado)
+
+        Args:
+            fields (list): Campos pedidos, o None para todos
+
+        Raises:
+            ValueError: Si se pide un campo desconocido
+        """
+        if not fields:
+            return self
+
+        # El orden de los campos no cambia el serializador
+        key = tuple(sorted(set(fields)))
+        subset = self._subsets.get(key)
+        if subset is None:
+            unknown = [field for field in fields if field not in self.columns and field not in self.computed]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+            subset = ModelSerializer(
+                self.model,
+                columns=[field for field in key if field in self.columns],
+                list_columns=self.list_columns & set(key),
+                formats=self.formats,
+                computed={field: self.computed[field] for field in key if field in self.computed}
+            )
+            if len(self._subsets) < 256:  # combinaciones pedidas por los clientes
+                self._subsets[key] = subset
+        return subset
+
+    def _build(self, values, source):
+        data = dict(zip(self.columns, values))
+        for name, converter in self._converters:
+            data[name] = converter(data[name])
+        for name, (_, value) in self.computed.items():
+            data[name] = value(source)
+        return data
+
+    def __call__(self, obj):
+        """Serializa una instancia ORM"""
+        return self._build(self._getter(obj), obj)
+
+    def many(self, objs):
+        """Serializa una lista de instancias ORM"""
+        getter = self._getter
+        return [self._build(getter(obj), obj) for obj in objs]
+
+    def rows(self, rows):
+        """Serializa filas de session.execute(select(...)) con las columnas por nombre
+
+        La posición de cada columna se calcula una vez con la primera fila.
+        """
+        rows = list(rows)
+        if not rows:
+            return []
+
+        getter = _tuple_getter(itemgetter, [rows[0]._fields.index(name) for name in self.columns])
+        return [self._build(getter(row), row) for row in rows]
+
+
+def _tuple_getter(make_getter, keys):
+    """attrgetter/itemgetter que siempre retorna una tupla, incluso con una sola clave"""
+    if len(keys) > 1:
+        return make_getter(*keys)
+    if keys:
+        getter = make_getter(keys[0])
+        return lambda source: (getter(source),)
+    return lambda source: ()
+
+
+def _isoformat(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _split_list(value):
+    return value.split(',') if value else []
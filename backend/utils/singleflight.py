@@ -0,0 +1,57 @@
+import threading
+
+from ..config import SINGLEFLIGHT_WAIT_TIMEOUT
+
+class _Call:
+    """Cálculo en curso para una clave, compartido por el hilo que lo ejecuta y los que esperan"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalescencia de llamadas concurrentes con la misma clave dentro de un proceso
+
+    Si varios hilos piden a la vez la misma clave, solo el primero ejecuta la
+    función; los demás esperan y reciben su resultado (o su excepción). Si el
+    primero tarda más de wait_timeout, los que esperan la ejecutan ellos mismos
+    para no quedar bloqueados indefinidamente.
+    """
+
+    def __init__(self, wait_timeout=SINGLEFLIGHT_WAIT_TIMEOUT):
+        self.wait_timeout = wait_timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Ejecuta fn() una sola vez por clave entre las llamadas concurrentes
+
+        Returns:
+            tuple: (resultado, compartido); compartido es True si el resultado
+            lo calculó otro hilo
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if call.done.wait(self.wait_timeout):
+                if call.error is not None:
+                    raise call.error
+                return call.result, True
+            return fn(), False
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
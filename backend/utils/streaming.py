@@ -0,0 +1,103 @@
+import csv
+import io
+import json
+from flask import Response, stream_with_context
+from sqlalchemy.orm import load_only
+
+from ..config import STREAM_BATCH_SIZE
+
+def is_stream_requested(args):
+    """Indica si el cliente pidió la respuesta en modo streaming (?stream=true)"""
+    return args.get('stream', 'false').lower() in ('true', '1', 't')
+
+
+def iterate_query(query, model, columns=None, batch_size=STREAM_BATCH_SIZE):
+    """Itera una consulta por lotes con yield_per y cursor del lado del servidor
+
+    Args:
+        query: Consulta a recorrer (ya filtrada y ordenada)
+        model: Modelo consultado
+        columns (list, optional): Columnas a cargar con load_only
+        batch_size (int): Filas por lote leídas de la base de datos
+
+    Returns:
+        Iterador de objetos del modelo; solo un lote vive en memoria a la vez
+    """
+    if columns is not None:
+        needed = ['id'] + [column for column in columns if column != 'id']
+        query = query.options(load_only(*[getattr(model, column) for column in needed]))
+    return query.execution_options(stream_results=True).yield_per(batch_size)
+
+
+def stream_json_array(key, items, serialize, chunk_size=STREAM_BATCH_SIZE):
+    """Genera un documento {"key": [...]} por fragmentos, serializando elemento a elemento"""
+    yield '{' + json.dumps(key) + ':['
+    buffer = []
+    first = True
+    for item in items:
+        encoded = json.dumps(serialize(item), separators=(',', ':'), default=str)
+        buffer.append(encoded if first else ',' + encoded)
+        first = False
+        if len(buffer) >= chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+    yield ']}'
+
+
+def json_stream_response(key, items, serialize):
+    """Retorna una respuesta JSON enviada por fragmentos (Transfer-Encoding: chunked)"""
+    return Response(
+        stream_with_context(stream_json_array(key, items, serialize)),
+        mimetype='application/json'
+    )
+
+
+def stream_csv(rows, columns, chunk_size=STREAM_BATCH_SIZE):
+    """Genera un CSV por fragmentos a partir de filas tipo diccionario"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow([_csv_value(row[column]) for column in columns])
+        count += 1
+        if count >= chunk_size:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+            count = 0
+    yield output.getvalue()
+
+
+def stream_ndjson(rows, columns, chunk_size=STREAM_BATCH_SIZE):
+    """Genera NDJSON (un objeto JSON por línea) por fragmentos a partir de filas tipo diccionario"""
+    buffer = []
+    for row in rows:
+        buffer.append(json.dumps({column: row[column] for column in columns}, separators=(',', ':'), default=_json_default))
+        if len(buffer) >= chunk_size:
+            yield '\n'.join(buffer) + '\n'
+            buffer = []
+    if buffer:
+        yield '\n'.join(buffer) + '\n'
+
+
+# Caracteres con los que Excel/LibreOffice interpretan una celda como fórmula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    # Textos introducidos por usuarios (nombre, email): se neutralizan para evitar inyección de fórmulas
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _json_default(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
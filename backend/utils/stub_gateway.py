@@ -0,0 +1,98 @@
+"""Pasarela de pagos local para pruebas
+
+Uso:
+    python -m backend.utils.stub_gateway --port 8099 --latency 0.2 --error-rate 0.1
+
+Expone POST /charges y POST /refunds con el mismo contrato que espera
+HTTPGateway. La latencia y la tasa de errores 503 son configurables para
+probar timeouts, reintentos y el circuit breaker.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class StubGatewayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    # Configuración compartida por el servidor
+    latency = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+    decline_rate = 0.0
+
+    # Respuestas por Idempotency-Key, para que los reintentos no cobren dos veces
+    _responses = {}
+    _lock = threading.Lock()
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        key = self.headers.get('Idempotency-Key')
+
+        time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+        if random.random() < self.error_rate:
+            return self._send(503, {'message': 'Gateway temporarily unavailable'})
+
+        with self._lock:
+            if key and key in self._responses:
+                status, body = self._responses[key]
+                return self._send(status, body)
+
+        if self.path == '/charges':
+            if random.random() < self.decline_rate:
+                status, body = 402, {'message': 'Card declined'}
+            else:
+                status, body = 200, {'transaction_id': str(uuid.uuid4()), 'amount': payload.get('amount')}
+        elif self.path == '/refunds':
+            status, body = 200, {'refund_id': str(uuid.uuid4()), 'transaction_id': payload.get('transaction_id')}
+        else:
+            status, body = 404, {'message': 'Not found'}
+
+        if key:
+            with self._lock:
+                self._responses[key] = (status, body)
+        return self._send(status, body)
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run(host='127.0.0.1', port=8099, latency=0.0, jitter=0.0, error_rate=0.0, decline_rate=0.0):
+    """Arranca la pasarela de prueba (bloquea hasta interrumpir)"""
+    StubGatewayHandler.latency = latency
+    StubGatewayHandler.jitter = jitter
+    StubGatewayHandler.error_rate = error_rate
+    StubGatewayHandler.decline_rate = decline_rate
+    server = ThreadingHTTPServer((host, port), StubGatewayHandler)
+    print(f"Stub payment gateway listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Stub payment gateway')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random +/- seconds on top of latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    parser.add_argument('--decline-rate', type=float, default=0.0, help='fraction of charges declined with 402')
+    args = parser.parse_args()
+    run(args.host, args.port, args.latency, args.jitter, args.error_rate, args.decline_rate)
@@ -0,0 +1,209 @@
+import threading
+import time
+from functools import wraps
+from flask import request, jsonify, current_app
+
+from .idempotency import allow_retry
+from ..config import VELOCITY_ENABLED, VELOCITY_RULES, VELOCITY_STORE, VELOCITY_REDIS_URL
+
+class VelocityRule:
+    """Regla de velocidad: más de `limit` intentos en `window` segundos -> acción
+
+    Se define como texto "dimensión:límite/ventana:acción", por ejemplo
+    "card:5/300:block" (más de 5 intentos con la misma tarjeta en 5 minutos se bloquean).
+    Dimensiones: user, card, ip. Acciones: block, flag.
+    """
+
+    DIMENSIONS = ('user', 'card', 'ip')
+    ACTIONS = ('block', 'flag')
+
+    def __init__(self, dimension, limit, window, action):
+        if dimension not in self.DIMENSIONS or action not in self.ACTIONS:
+            raise ValueError(f"Invalid velocity rule: {dimension}:{limit}/{window}:{action}")
+        self.dimension = dimension
+        self.limit = int(limit)
+        self.window = int(window)
+        self.action = action
+
+    @classmethod
+    def parse(cls, text):
+        dimension, threshold, action = text.strip().split(':')
+        limit, window = threshold.split('/')
+        return cls(dimension, limit, window, action)
+
+    def __repr__(self):
+        return f"{self.dimension}:{self.limit}/{self.window}:{self.action}"
+
+
+class MemoryVelocityStore:
+    """Contadores de ventana deslizante en memoria del proceso
+
+    Cada clave guarda solo dos contadores (ventana actual y anterior); el total
+    se aproxima ponderando la ventana anterior por la parte que sigue dentro
+    del intervalo. Memoria constante por clave y sin consultas a la base de datos.
+    """
+
+    def __init__(self, sweep_interval=60):
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._sweep_interval = sweep_interval
+        self._last_sweep = time.time()
+
+    def hit(self, key, window):
+        """Registra un intento y retorna los intentos estimados en la ventana"""
+        now = time.time()
+        bucket = int(now // window) * window
+        with self._lock:
+            state = self._counters.get((key, window))
+            if state is None or state[0] < bucket - window:
+                state = [bucket, 0, 0]
+            elif state[0] < bucket:
+                state = [bucket, state[2], 0]
+            state[2] += 1
+            self._counters[(key, window)] = state
+
+            if now - self._last_sweep >= self._sweep_interval:
+                self._sweep(now)
+
+            return state[1] * (window - (now - bucket)) / window + state[2]
+
+    def _sweep(self, now):
+        # Descartar claves sin actividad en las dos últimas ventanas
+        self._counters = {
+            (key, window): state for (key, window), state in self._counters.items()
+            if state[0] >= now - 2 * window
+        }
+        self._last_sweep = now
+
+
+class RedisVelocityStore:
+    """Contadores de ventana deslizante compartidos entre procesos (requiere redis)"""
+
+    def __init__(self, url=VELOCITY_REDIS_URL, prefix='velocity:'):
+        import redis  # dependencia opcional
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def hit(self, key, window):
+        now = time.time()
+        bucket = int(now // window) * window
+        current_key = f"{self._prefix}{key}:{window}:{bucket}"
+        previous_key = f"{self._prefix}{key}:{window}:{bucket - window}"
+
+        # Una sola ida y vuelta: incrementar, fijar expiración y leer la ventana anterior
+        pipe = self._client.pipeline(transaction=False)
+        pipe.incr(current_key)
+        pipe.expire(current_key, 2 * window)
+        pipe.get(previous_key)
+        current, _, previous = pipe.execute()
+
+        return int(previous or 0) * (window - (now - bucket)) / window + int(current)
+
+
+class VelocityDecision:
+    """Resultado de una comprobación: allow, flag o block"""
+
+    def __init__(self, action='allow', rule=None, count=0):
+        self.action = action
+        self.rule = rule
+        self.count = count
+
+    @property
+    def blocked(self):
+        return self.action == 'block'
+
+    @property
+    def flagged(self):
+        return self.action == 'flag'
+
+
+class VelocityChecker:
+    """Comprobación previa a la autorización de un pago"""
+
+    def __init__(self, rules=None, store=None):
+        self.rules = rules if rules is not None else [VelocityRule.parse(rule) for rule in VELOCITY_RULES.split(',') if rule.strip()]
+        self.store = store or MemoryVelocityStore()
+
+    def check(self, user_id=None, card_last_digits=None, ip_address=None):
+        """Registra el intento y aplica las reglas
+
+        Returns:
+            VelocityDecision: la acción más grave de las reglas superadas
+        """
+        values = {'user': user_id, 'card': card_last_digits, 'ip': ip_address}
+
+        # Un solo incremento por dimensión y ventana aunque varias reglas las compartan
+        counts = {}
+        for rule in self.rules:
+            value = values.get(rule.dimension)
+            if value in (None, '') or (rule.dimension, rule.window) in counts:
+                continue
+            counts[(rule.dimension, rule.window)] = self.store.hit(f"{rule.dimension}:{value}", rule.window)
+
+        decision = VelocityDecision()
+        for rule in self.rules:
+            count = counts.get((rule.dimension, rule.window), 0)
+            if count <= rule.limit:
+                continue
+            if rule.action == 'block':
+                return VelocityDecision('block', rule, count)
+            if not decision.flagged:
+                decision = VelocityDecision('flag', rule, count)
+        return decision
+
+
+_checker = None
+_checker_lock = threading.Lock()
+
+def get_velocity_checker():
+    """Retorna el comprobador configurado en VELOCITY_STORE (compartido por el proceso)"""
+    global _checker
+    if _checker is None:
+        with _checker_lock:
+            if _checker is None:
+                store = RedisVelocityStore() if VELOCITY_STORE == 'redis' else MemoryVelocityStore()
+                _checker = VelocityChecker(store=store)
+    return _checker
+
+
+def velocity_check(f):
+    """Decorator que aplica las reglas de velocidad antes de procesar un pago
+
+    Debe aplicarse debajo de token_required e idempotent, para que las
+    repeticiones de una Idempotency-Key no cuenten como nuevos intentos. Un
+    intento bloqueado libera su clave, que se puede reintentar pasada la ventana.
+    La IP del cliente es request.remote_addr: detrás de un proxy inverso hay que
+    configurar PROXY_FIX_X_FOR.
+    """
+    @wraps(f)
+    def decorated(current_user, *args, **kwargs):
+        if not VELOCITY_ENABLED:
+            return f(current_user, *args, **kwargs)
+
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            data = {}
+        card_last_digits = data.get('card_last_digits')
+        if not card_last_digits and data.get('card_number'):
+            card_last_digits = str(data.get('card_number')).replace(' ', '')[-4:]
+
+        decision = get_velocity_checker().check(current_user.id, card_last_digits, request.remote_addr)
+
+        if decision.blocked:
+            current_app.logger.warning(
+                f"Payment blocked by velocity rule {decision.rule} (user {current_user.id}, ip {request.remote_addr})"
+            )
+            # El intento no llegó a procesarse
+            allow_retry()
+            response = jsonify({'message': 'Too many payment attempts, please try again later!'})
+            response.headers['Retry-After'] = str(decision.rule.window)
+            return response, 429
+
+        if decision.flagged:
+            current_app.logger.warning(
+                f"Payment flagged by velocity rule {decision.rule} (user {current_user.id}, ip {request.remote_addr})"
+            )
+
+        return f(current_user, *args, **kwargs)
+
+    return decorated
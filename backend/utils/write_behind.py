@@ -0,0 +1,158 @@
+import atexit
+import logging
+import threading
+from sqlalchemy import case, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from ..config import WRITE_BEHIND_FLUSH_INTERVAL, WRITE_BEHIND_MAX_PENDING
+from ..database.db_config import db_session
+
+logger = logging.getLogger(__name__)
+
+# Cada fila usa 3 parámetros (IN y los dos del CASE); SQL Server admite unos 2100 por consulta
+FLUSH_CHUNK_SIZE = 600
+
+class WriteBehindBuffer:
+    """Buffer de escritura diferida para actualizaciones tipo "touch"
+
+    Acumula en memoria los valores pendientes por (modelo, columna, id) y los
+    vuelca periódicamente con un único UPDATE por columna, en lugar de hacer
+    una carga, actualización y commit por cada petición.
+
+    El volcado se hace siempre en el hilo del temporizador y con una sesión
+    propia: nunca confirma ni cierra la sesión de la petición en curso.
+    """
+
+    def __init__(self, flush_interval=WRITE_BEHIND_FLUSH_INTERVAL, max_pending=WRITE_BEHIND_MAX_PENDING):
+        """Inicializa el buffer con el intervalo de volcado y el máximo de filas pendientes"""
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._touches = {}  # (modelo, columna) -> {id: valor}, gana el último valor
+        self._increments = {}  # (modelo, columna) -> {id: incremento acumulado}
+        self._timer = None
+
+    def touch(self, model, column, row_id, value):
+        """Registra un nuevo valor para una columna; solo se conserva el último por fila"""
+        with self._lock:
+            self._touches.setdefault((model, column), {})[row_id] = value
+            self._schedule_for_pending()
+
+    def increment(self, model, column, row_id, amount=1):
+        """Registra un incremento para una columna numérica; los incrementos se suman"""
+        with self._lock:
+            counters = self._increments.setdefault((model, column), {})
+            counters[row_id] = counters.get(row_id, 0) + amount
+            self._schedule_for_pending()
+
+    def pending_value(self, model, column, row_id, default=None):
+        """Retorna el valor pendiente de volcar para una fila, si existe"""
+        with self._lock:
+            return self._touches.get((model, column), {}).get(row_id, default)
+
+    def pending_increment(self, model, column, row_id):
+        """Retorna el incremento pendiente de volcar para una fila"""
+        with self._lock:
+            return self._increments.get((model, column), {}).get(row_id, 0)
+
+    def flush(self):
+        """Vuelca todas las escrituras pendientes con un UPDATE por columna"""
+        with self._flush_lock:
+            with self._lock:
+                touches, self._touches = self._touches, {}
+                increments, self._increments = self._increments, {}
+                if self._timer:
+                    self._timer.cancel()
+                    self._timer = None
+
+            if not touches and not increments:
+                return 0
+
+            statements = []
+            for (model, column), values in touches.items():
+                pk = model.__table__.c.id
+                for chunk in _chunks(values):
+                    statements.append(
+                        update(model.__table__)
+                        .where(pk.in_(list(chunk)))
+                        .values({column: case(chunk, value=pk)})
+                    )
+            for (model, column), amounts in increments.items():
+                pk = model.__table__.c.id
+                col = model.__table__.c[column]
+                for chunk in _chunks(amounts):
+                    statements.append(
+                        update(model.__table__)
+                        .where(pk.in_(list(chunk)))
+                        .values({column: col + case(chunk, value=pk, else_=0)})
+                    )
+
+            # Sesión propia: no se mezcla con lo pendiente en la sesión de ninguna petición
+            session = Session(bind=db_session.get_bind())
+            try:
+                # Son escrituras tipo "touch": no cambian la versión de la tabla (ETags)
+                for statement in statements:
+                    session.execute(statement, execution_options={'skip_change_version': True})
+                session.commit()
+            except SQLAlchemyError as e:
+                session.rollback()
+                self._requeue(touches, increments)
+                raise Exception(f"Error al volcar escrituras diferidas: {str(e)}")
+            finally:
+                session.close()
+
+            return sum(len(v) for v in touches.values()) + sum(len(v) for v in increments.values())
+
+    def _requeue(self, touches, increments):
+        """Reincorpora al buffer las escrituras de un volcado fallido sin pisar valores más nuevos"""
+        with self._lock:
+            for key, values in touches.items():
+                current = self._touches.setdefault(key, {})
+                for row_id, value in values.items():
+                    current.setdefault(row_id, value)
+            for key, amounts in increments.items():
+                current = self._increments.setdefault(key, {})
+                for row_id, amount in amounts.items():
+                    current[row_id] = current.get(row_id, 0) + amount
+            self._schedule()
+
+    def _pending_count(self):
+        return sum(len(v) for v in self._touches.values()) + sum(len(v) for v in self._increments.values())
+
+    def _schedule(self, delay=None):
+        # Debe llamarse con self._lock adquirido
+        delay = self.flush_interval if delay is None else delay
+        if self._timer is not None and self._timer.interval > delay:
+            # Adelantar el volcado ya programado
+            self._timer.cancel()
+            self._timer = None
+        if self._timer is None:
+            self._timer = threading.Timer(delay, self._flush_quietly)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _schedule_for_pending(self):
+        # Con el buffer lleno se vuelca ya, pero en el hilo del temporizador y no en el de la petición
+        self._schedule(0 if self._pending_count() >= self.max_pending else None)
+
+    def _flush_quietly(self):
+        try:
+            self.flush()
+        except Exception as e:
+            logger.exception(f"Error in write-behind flush: {str(e)}")
+
+
+def _chunks(values):
+    """Divide un dict {id: valor} en dicts de como mucho FLUSH_CHUNK_SIZE filas"""
+    items = list(values.items())
+    for start in range(0, len(items), FLUSH_CHUNK_SIZE):
+        yield dict(items[start:start + FLUSH_CHUNK_SIZE])
+
+
+# Instancia compartida por los servicios del proceso
+write_behind = WriteBehindBuffer()
+
+# Volcar lo pendiente al terminar el proceso
+atexit.register(write_behind._flush_quietly)
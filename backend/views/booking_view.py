@@ -5,13 +5,15 @@ from ..controllers.booking_controller import (
     update_booking_status, delete_booking, check_availability
 )
 from ..controllers import token_required, role_required
+from ..utils.idempotency import idempotent
 
 # Crear el Blueprint para las rutas de reservas
 booking_bp = Blueprint('bookings', __name__, url_prefix='/api/bookings')
 
-# Ruta para crear una nueva reserva
+# Ruta para crear una nueva reserva (admite cabecera Idempotency-Key)
 @booking_bp.route('', methods=['POST'])
 @token_required
+@idempotent('create_booking')
 def add_booking(current_user):
     return create_booking(current_user)
 
@@ -93,7 +95,7 @@ def generate_confirmation_pdf(current_user, booking_id):
     
     try:
         booking_service = BookingService()
-        booking = booking_service.get_booking_by_id(booking_id)
+        booking = booking_service.get_booking_by_id(booking_id, profile='detail')
         
         # Verificar permisos
         if not booking or (booking.user_id != current_user.id and current_user.role != 'admin'):
@@ -1,23 +1,46 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from datetime import datetime, timedelta
 from ..controllers import token_required, role_required
+from ..utils.idempotency import idempotent, allow_retry
+from ..utils.velocity import velocity_check
+from ..utils.payment_gateway import GatewayError, GatewayDeclinedError, GatewayUnavailableError
+from ..utils.pagination import get_page_args, resolve_fields, serialize_fields
+from ..utils.streaming import is_stream_requested, json_stream_response, stream_csv, stream_ndjson
 
 # Crear el Blueprint para las rutas de pagos
 payment_bp = Blueprint('payments', __name__, url_prefix='/api/payments')
 
-# Ruta para procesar un nuevo pago
+# Campos del listado de pagos: campo -> (columnas necesarias, valor)
+PAYMENT_LIST_FIELDS = {
+    'id': (['id'], lambda payment: payment.id),
+    'booking_id': (['booking_id'], lambda payment: payment.booking_id),
+    'user_id': (['user_id'], lambda payment: payment.user_id),
+    'user_name': (['user_id'], lambda payment: payment.user.name),
+    'amount': (['amount'], lambda payment: payment.amount),
+    'payment_method': (['payment_method'], lambda payment: payment.payment_method),
+    'transaction_id': (['transaction_id'], lambda payment: payment.transaction_id),
+    'status': (['status'], lambda payment: payment.status),
+    'payment_date': (['payment_date'], lambda payment: payment.payment_date.strftime('%Y-%m-%d %H:%M:%S'))
+}
+
+# Ruta para procesar un nuevo pago (admite cabecera Idempotency-Key)
 @payment_bp.route('', methods=['POST'])
 @token_required
+@idempotent('process_payment', release_server_errors=False)
+@velocity_check
 def process_payment(current_user):
     data = request.get_json()
     
     # Validar datos de entrada
-    if not data or not data.get('booking_id') or not data.get('amount') or not data.get('payment_method'):
+    if not isinstance(data, dict) or not data.get('booking_id') or not data.get('amount') or not data.get('payment_method'):
         return jsonify({'message': 'Missing required fields!'}), 400
     
     # Esta función debería estar en el controlador, pero la incluimos aquí como ejemplo
-    from ..services.payment_service import PaymentService
+    from ..services.payment_service import PaymentService, PaymentProcessingError
     from ..services.booking_service import BookingService
     
+    # Solo los errores anteriores al cobro liberan la Idempotency-Key para reintentar
+    charging = False
     try:
         booking_service = BookingService()
         payment_service = PaymentService()
@@ -36,6 +59,7 @@ def process_payment(current_user):
             return jsonify({'message': 'Cannot pay for a cancelled booking!'}), 400
         
         # Procesar el pago
+        charging = True
         result = payment_service.process_payment(
             booking_id=data.get('booking_id'),
             user_id=current_user.id,
@@ -52,10 +76,25 @@ def process_payment(current_user):
             'status': result['status'],
             'booking_status': result['booking_status']
         }), 201
+    except GatewayDeclinedError as e:
+        return jsonify({'message': str(e)}), 402
+    except GatewayUnavailableError as e:
+        # La pasarela no llegó a recibir el cobro
+        allow_retry()
+        return jsonify({'message': str(e)}), 503
+    except GatewayError as e:
+        # Sin respuesta clara de la pasarela: el pago queda pendiente hasta la conciliación
+        return jsonify({'message': str(e)}), 502
+    except PaymentProcessingError as e:
+        if not e.charged:
+            allow_retry()
+        return jsonify({'message': str(e)}), 500
     except Exception as e:
+        if not charging:
+            allow_retry()
         return jsonify({'message': str(e)}), 500
 
-# Ruta para obtener todos los pagos (solo admin)
+# Ruta para obtener todos los pagos (solo admin, paginado o en streaming con ?stream=true)
 @payment_bp.route('', methods=['GET'])
 @token_required
 @role_required(['admin'])
@@ -64,24 +103,95 @@ def get_all_payments(current_user):
     from ..services.payment_service import PaymentService
     
     try:
+        cursor, limit, fields = get_page_args(request.args)
+        fields, columns = resolve_fields(fields, PAYMENT_LIST_FIELDS)
+        
         payment_service = PaymentService()
-        payments = payment_service.get_all_payments()
+        
+        # Modo streaming para exportaciones: memoria constante sin importar el número de filas
+        if is_stream_requested(request.args):
+            payments = payment_service.iter_all_payments(columns, profile='list' if 'user_name' in fields else None)
+            return json_stream_response(
+                'payments', payments,
+                lambda payment: serialize_fields(payment, fields, PAYMENT_LIST_FIELDS)
+            )
+        
+        payments = payment_service.get_all_payments(cursor, limit, columns, profile='list' if 'user_name' in fields else None)
         
         result = []
         for payment in payments:
-            result.append({
-                'id': payment.id,
-                'booking_id': payment.booking_id,
-                'user_id': payment.user_id,
-                'user_name': payment.user.name,
-                'amount': payment.amount,
-                'payment_method': payment.payment_method,
-                'transaction_id': payment.transaction_id,
-                'status': payment.status,
-                'payment_date': payment.payment_date.strftime('%Y-%m-%d %H:%M:%S')
-            })
+            result.append(serialize_fields(payment, fields, PAYMENT_LIST_FIELDS))
         
-        return jsonify({'payments': result})
+        return jsonify({'payments': result, 'pagination': payments.to_dict()})
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+# Ruta para exportar pagos para conciliación (solo admin): CSV o NDJSON en streaming
+@payment_bp.route('/export', methods=['GET'])
+@token_required
+@role_required(['admin'])
+def export_payments(current_user):
+    export_format = request.args.get('format', 'csv').lower()
+    from_str = request.args.get('from')
+    to_str = request.args.get('to')
+    
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({'message': 'Invalid format! Use csv or ndjson'}), 400
+    
+    try:
+        start_date = datetime.strptime(from_str, '%Y-%m-%d') if from_str else None
+        # La fecha final es inclusiva
+        end_date = datetime.strptime(to_str, '%Y-%m-%d') + timedelta(days=1) if to_str else None
+    except ValueError:
+        return jsonify({'message': 'Invalid date format! Use YYYY-MM-DD'}), 400
+    
+    # Esta función debería estar en el controlador, pero la incluimos aquí como ejemplo
+    from ..services.payment_service import PaymentService
+    
+    payment_service = PaymentService()
+    rows = payment_service.iter_payment_export_rows(start_date, end_date)
+    columns = PaymentService.EXPORT_COLUMNS
+    
+    if export_format == 'csv':
+        body, mimetype = stream_csv(rows, columns), 'text/csv'
+    else:
+        body, mimetype = stream_ndjson(rows, columns), 'application/x-ndjson'
+    
+    filename = f"payments_{from_str or 'all'}_{to_str or 'all'}.{export_format}"
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+# Ruta para obtener estadísticas de pagos (solo admin)
+@payment_bp.route('/stats', methods=['GET'])
+@token_required
+@role_required(['admin'])
+def get_payment_statistics(current_user):
+    start_date_str = request.args.get('start_date')
+    end_date_str = request.args.get('end_date')
+    interval = request.args.get('interval', 'day')
+    
+    if interval not in ('day', 'week', 'month'):
+        return jsonify({'message': 'Invalid interval! Use day, week or month'}), 400
+    
+    try:
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d') if start_date_str else None
+        # La fecha final es inclusiva
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d') + timedelta(days=1) if end_date_str else None
+        
+        # Esta función debería estar en el controlador, pero la incluimos aquí como ejemplo
+        from ..services.payment_service import PaymentService
+        
+        payment_service = PaymentService()
+        stats = payment_service.get_payment_stats(start_date, end_date, interval)
+        
+        return jsonify(stats)
+    except ValueError:
+        return jsonify({'message': 'Invalid date format! Use YYYY-MM-DD'}), 400
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
@@ -140,13 +250,16 @@ def get_my_payments(current_user):
     
     try:
         payment_service = PaymentService()
-        payments = payment_service.get_user_payments(current_user.id)
+        # Reserva y paquete llegan en la misma consulta: el número de consultas no crece con el historial
+        payments = payment_service.get_user_payments(current_user.id, profile='detail')
         
         result = []
         for payment in payments:
             result.append({
                 'id': payment.id,
                 'booking_id': payment.booking_id,
+                'package_destination': payment.booking.package.destination,
+                'travel_date': payment.booking.travel_date.strftime('%Y-%m-%d'),
                 'amount': payment.amount,
                 'payment_method': payment.payment_method,
                 'transaction_id': payment.transaction_id,
@@ -174,6 +287,90 @@ def refund_payment(current_user, payment_id):
             return jsonify({'message': 'Payment refunded successfully!'})
         else:
             return jsonify({'message': 'Cannot refund this payment!'}), 400
+    except GatewayDeclinedError as e:
+        return jsonify({'message': str(e)}), 402
+    except GatewayUnavailableError as e:
+        return jsonify({'message': str(e)}), 503
+    except GatewayError as e:
+        return jsonify({'message': str(e)}), 502
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+# Ruta para reembolsar muchos pagos a la vez (solo admin)
+# Cuerpo: {"payment_ids": [...]} o {"package_id": X, "travel_date": "YYYY-MM-DD", "cancel_bookings": true}
+@payment_bp.route('/refunds', methods=['POST'])
+@token_required
+@role_required(['admin'])
+@idempotent('batch_refund')
+def refund_payments(current_user):
+    data = request.get_json()
+    
+    if not data or (not data.get('payment_ids') and not (data.get('package_id') and data.get('travel_date'))):
+        return jsonify({'message': 'Provide payment_ids or package_id and travel_date!'}), 400
+    
+    travel_date = None
+    if not data.get('payment_ids'):
+        try:
+            travel_date = datetime.strptime(data.get('travel_date'), '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'message': 'Invalid date format! Use YYYY-MM-DD'}), 400
+    
+    # Esta función debería estar en el controlador, pero la incluimos aquí como ejemplo
+    from ..services.payment_service import PaymentService
+    
+    try:
+        payment_service = PaymentService()
+        results = payment_service.refund_payments(
+            payment_ids=data.get('payment_ids'),
+            package_id=data.get('package_id'),
+            travel_date=travel_date,
+            cancel_bookings=bool(data.get('cancel_bookings', False))
+        )
+        
+        refunded = sum(1 for result in results if result['status'] == 'refunded')
+        return jsonify({
+            'message': f'{refunded} of {len(results)} payments refunded',
+            'refunded': refunded,
+            'results': results
+        })
+    except (TypeError, ValueError):
+        return jsonify({'message': 'payment_ids must be a list of ids!'}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+# Ruta para conciliar el archivo de liquidación de la pasarela (solo admin)
+# Multipart con el archivo en "file"; parámetros opcionales format (csv/jsonl), start_date y end_date
+@payment_bp.route('/reconcile', methods=['POST'])
+@token_required
+@role_required(['admin'])
+def reconcile_payments(current_user):
+    upload = request.files.get('file')
+    if not upload:
+        return jsonify({'message': 'Settlement file is required!'}), 400
+    
+    file_format = request.form.get('format') or ('jsonl' if upload.filename.endswith(('.jsonl', '.ndjson')) else 'csv')
+    if file_format not in ('csv', 'jsonl'):
+        return jsonify({'message': 'Invalid format! Use csv or jsonl'}), 400
+    
+    try:
+        start_date_str = request.form.get('start_date')
+        end_date_str = request.form.get('end_date')
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d') if start_date_str else None
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d') + timedelta(days=1) if end_date_str else None
+    except ValueError:
+        return jsonify({'message': 'Invalid date format! Use YYYY-MM-DD'}), 400
+    
+    # Esta función debería estar en el controlador, pero la incluimos aquí como ejemplo
+    import io
+    from ..services.reconciliation_service import ReconciliationService
+    
+    try:
+        # El archivo se lee en streaming, sin cargarlo entero en memoria
+        stream = io.TextIOWrapper(upload.stream, encoding='utf-8', newline='')
+        summary = ReconciliationService().reconcile(stream, file_format, start_date, end_date)
+        return jsonify(summary)
+    except UnicodeDecodeError:
+        return jsonify({'message': 'Settlement file must be UTF-8!'}), 400
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
@@ -186,17 +383,18 @@ def generate_payment_receipt(current_user, payment_id):
     
     try:
         payment_service = PaymentService()
-        payment = payment_service.get_payment_by_id(payment_id)
+        # Todos los datos del recibo en una sola consulta
+        receipt = payment_service.get_receipt_data(payment_id)
         
-        if not payment:
+        if not receipt:
             return jsonify({'message': 'Payment not found!'}), 404
         
         # Solo el usuario que realizó el pago o un admin puede ver el recibo
-        if payment.user_id != current_user.id and current_user.role != 'admin':
+        if receipt['user_id'] != current_user.id and current_user.role != 'admin':
             return jsonify({'message': 'Unauthorized to view this receipt!'}), 403
         
         # Generar datos del recibo
-        receipt_data = payment_service.generate_payment_receipt(payment_id)
+        receipt_data = payment_service.generate_payment_receipt(payment_id, receipt)
         
         if not receipt_data:
             return jsonify({'message': 'Error generating receipt!'}), 500
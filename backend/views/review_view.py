@@ -5,10 +5,60 @@ from ..controllers.review_controller import (
     get_recent_reviews, get_top_rated_reviews
 )
 from ..controllers import token_required, role_required
+from ..utils.pagination import get_page_args, resolve_fields, serialize_fields
+from ..utils.dataloader import get_loader, load_related
+from ..models.user import User
+from ..models.package import Package
 
 # Crear el Blueprint para las rutas de reseñas
 review_bp = Blueprint('reviews', __name__, url_prefix='/api/reviews')
 
+# Campos de los listados de reseñas (admin): campo -> (columnas necesarias, valor)
+REVIEW_LIST_FIELDS = {
+    'id': (['id'], lambda review: review.id),
+    'user_id': (['user_id'], lambda review: review.user_id),
+    'user_name': (['user_id'], lambda review: get_loader(User).load(review.user_id).name),
+    'package_id': (['package_id'], lambda review: review.package_id),
+    'package_destination': (['package_id'], lambda review: get_loader(Package).load(review.package_id).destination),
+    'comment': (['comment'], lambda review: review.comment),
+    'rating': (['rating'], lambda review: review.rating),
+    'date': (['date'], lambda review: review.date.strftime('%Y-%m-%d')),
+    'is_approved': (['is_approved'], lambda review: review.is_approved)
+}
+
+def _prime_review_relations(reviews, fields):
+    """Carga en lote los usuarios y paquetes que necesitan los campos pedidos"""
+    if 'user_name' in fields:
+        get_loader(User).prime(review.user_id for review in reviews)
+    if 'package_destination' in fields:
+        get_loader(Package).prime(review.package_id for review in reviews)
+
+# Ruta para obtener todas las reseñas (solo admin, paginado, con selección de campos)
+@review_bp.route('', methods=['GET'])
+@token_required
+@role_required(['admin'])
+def get_all_reviews(current_user):
+    # Esta función debería estar en el controlador, pero la incluimos aquí como ejemplo
+    from ..services.review_service import ReviewService
+    
+    try:
+        cursor, limit, fields = get_page_args(request.args)
+        fields, columns = resolve_fields(fields, REVIEW_LIST_FIELDS)
+        
+        review_service = ReviewService()
+        reviews = review_service.get_all_reviews(cursor, limit, columns)
+        _prime_review_relations(reviews, fields)
+        
+        result = []
+        for review in reviews:
+            result.append(serialize_fields(review, fields, REVIEW_LIST_FIELDS))
+        
+        return jsonify({'reviews': result, 'pagination': reviews.to_dict()})
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
 # Ruta para crear una nueva reseña
 @review_bp.route('', methods=['POST'])
 @token_required
@@ -55,13 +105,15 @@ def get_recent():
     try:
         review_service = ReviewService()
         reviews = review_service.get_recent_reviews(limit)
+        users = load_related(User, reviews, 'user_id')
+        packages = load_related(Package, reviews, 'package_id')
         
         result = []
         for review in reviews:
             result.append({
                 'id': review.id,
-                'user_name': review.user.name,
-                'package_destination': review.package.destination,
+                'user_name': users[review.user_id].name,
+                'package_destination': packages[review.package_id].destination,
                 'comment': review.comment[:100] + '...' if len(review.comment) > 100 else review.comment,
                 'rating': review.rating,
                 'date': review.date.strftime('%Y-%m-%d')
@@ -115,7 +167,7 @@ def reject_review(current_user, review_id):
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
-# Ruta para obtener reseñas pendientes de aprobación (solo admin)
+# Ruta para obtener reseñas pendientes de aprobación (solo admin, paginado)
 @review_bp.route('/pending', methods=['GET'])
 @token_required
 @role_required(['admin'])
@@ -124,22 +176,19 @@ def get_pending_reviews(current_user):
     from ..services.review_service import ReviewService
     
     try:
+        cursor, limit, fields = get_page_args(request.args)
+        fields, columns = resolve_fields(fields, REVIEW_LIST_FIELDS)
+        
         review_service = ReviewService()
-        reviews = review_service.get_pending_reviews()
+        reviews = review_service.get_pending_reviews(cursor, limit, columns)
+        _prime_review_relations(reviews, fields)
         
         result = []
         for review in reviews:
-            result.append({
-                'id': review.id,
-                'user_id': review.user_id,
-                'user_name': review.user.name,
-                'package_id': review.package_id,
-                'package_destination': review.package.destination,
-                'comment': review.comment,
-                'rating': review.rating,
-                'date': review.date.strftime('%Y-%m-%d')
-            })
+            result.append(serialize_fields(review, fields, REVIEW_LIST_FIELDS))
         
-        return jsonify({'pending_reviews': result})
+        return jsonify({'pending_reviews': result, 'pagination': reviews.to_dict()})
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': str(e)}), 500
\ No newline at end of file
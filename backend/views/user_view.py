@@ -79,4 +79,36 @@ def change_password(current_user):
     current_user.password = generate_password_hash(data.get('new_password'))
     user_service.update_user(current_user)
     
-    return jsonify({'message': 'Password updated successfully!'})
\ No newline at end of file
+    return jsonify({'message': 'Password updated successfully!'})
+
+# Ruta para obtener estadísticas de usuarios (solo admin)
+@user_bp.route('/stats', methods=['GET'])
+@token_required
+@role_required(['admin'])
+def get_user_statistics(current_user):
+    start_date_str = request.args.get('start_date')
+    end_date_str = request.args.get('end_date')
+    
+    try:
+        # Esta función debería estar en el controlador, pero la incluimos aquí como ejemplo
+        from datetime import datetime, timedelta
+        from ..services.user_service import UserService
+        
+        user_service = UserService()
+        stats = user_service.count_users_by_role()
+        
+        # Por defecto, los nuevos usuarios de los últimos 30 días
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date() if end_date_str else datetime.utcnow().date()
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date() if start_date_str else end_date - timedelta(days=29)
+        
+        if start_date > end_date:
+            return jsonify({'message': 'start_date must be before end_date!'}), 400
+        
+        return jsonify({
+            'users_by_role': stats,
+            'new_users_by_day': user_service.count_new_users_by_day(start_date, end_date)
+        })
+    except ValueError:
+        return jsonify({'message': 'Invalid date format! Use YYYY-MM-DD'}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500